@@ -1,408 +1,590 @@
 # app_pages/analise.py
 # -*- coding: utf-8 -*-
-import re
+from concurrent.futures import Future
 import numpy as np
 import pandas as pd
 import streamlit as st
 import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
 import seaborn as sns
-from scipy import stats
 
-from core.data import carregar_df, correlacao_pearson
+from core.data import localizar_fonte, ler_amostra, ler_fonte, fingerprint_df, relatorio_memoria, COMPACTAR
+from core.agregados import cubo_agregado, top_n, nota_topk, serie_temporal, GRANULARIDADES, DIM_DIARIO
+from core.derivados import converter_tipos, derivar_colunas
+from core.esquema import has, perfil_esquema, colunas_mapeadas
+from core.dataset import eh_dataset, intervalo_datas, valores_distintos
+from core.incremental import carregar_incremental, vigiar_fonte, INCREMENTAL
+from core.streaming import cubo_streaming, eh_csv, tamanho_mb, STREAM_MIN_MB
+from core.secoes import secao_lazy
+from core.precalculo import agendar, esperar, PRECALC
+from core.filtros import construir_indice, selecionar, rotulo_filtros
+from core.figuras import pyplot_cache
+from core.charts import exibir_grafico, barras, pizza, linha, histograma, box_resumo, BACKENDS, BACKEND_GRAFICOS
+from core.spans import span
+from core.resultados import cache_disco
+from core.resumos import resumos_boxplot
+from core.momentos import momentos_cubo, welch_t, anova_f, pearson
+from core.bootstrap import bootstrap_grupos
+from core.dispersao import densidade_2d, amostra_indices, reta_minimos_quadrados, DISPERSAO_MAX_PONTOS
 
 sns.set_theme(style="whitegrid")
 
 # =========================
-# Auto‑mapeamento (sinônimos)
+# Seções (uma função por aba)
 # =========================
-def _norm(s: str) -> str:
-    return re.sub(r"[^a-z0-9_]+", " ", s.lower().strip())
-
-def _find_by_patterns(columns, patterns):
-    norm_cols = {c: _norm(c) for c in columns}
-    # match exato
-    for c, nc in norm_cols.items():
-        for p in patterns:
-            if re.fullmatch(p, nc):
-                return c
-    # contém
-    for c, nc in norm_cols.items():
-        for p in patterns:
-            if re.search(p, nc):
-                return c
-    return None
-
-ROLE_SYNONYMS = {
-    # Vendas
-    "data_pedido":      [r"^date$", r"order[\s_]*date", r"data[\s_]*pedido"],
-    "valor_pedido":     [r"^amount$", r"valor[\s_]*pedido", r"order[\s_]*amount", r"total[\s_]*order"],
-    "categoria":        [r"^category$", r"categoria"],
-    "produto":          [r"^product$", r"product[\s_]*name", r"style", r"produto", r"descri[cç][aã]o", r"descricao"],
-    "tipo_cliente":     [r"^b2b$", r"tipo[\s_]*cliente", r"customer[\s_]*type"],
-    "regiao":           [r"ship[\s_]*state", r"ship[\s_]*city", r"estado", r"cidade", r"regi[aã]o", r"uf"],
-    "quantidade":       [r"^qty$", r"quantity", r"quantidade"],
-    # Cancel/Entregas
-    "status_pedido":    [r"^status$", r"order[\s_]*status", r"situa[cç][aã]o"],
-    "tipo_envio":       [r"^fulfil.*by$", r"^fulfilled[\s_]*by$", r"^fulfillment$", r"^fulfilment$", r"tipo[\s_]*envio"],
-    "courier_status":   [r"^courier[\s_]*status$", r"ship[\s_]*service[\s_]*level", r"nível[\s_]*servi[cç]o"],
-    # Produtos
-    "tamanho":          [r"^size$", r"tamanho"],
-    "valor_unitario":   [r"unit[\s_]*price", r"valor[\s_]*unit[aá]rio", r"pre[cç]o[\s_]*unit[aá]rio"],
-    # Promoção
-    "tem_promocao":     [r"promotion[\s_]*id", r"promo[cç][aã]o", r"has[\s_]*promo", r"applied[\s_]*promo"],
-    # Entrega real (se existir)
-    "data_entrega":     [r"deliv[\s_]*date", r"data[\s_]*entrega"]
-}
-
-def automap(df_local: pd.DataFrame) -> dict:
-    m = {}
-    cols = df_local.columns.tolist()
-    for role, pats in ROLE_SYNONYMS.items():
-        m[role] = _find_by_patterns(cols, pats)
-    return m
-
-def has(colmap, key, df):
-    return key in colmap and colmap[key] in df.columns and colmap[key] is not None
+# Testes estatísticos a partir dos momentos do cubo (n, média, M2): nada relê as linhas.
+def _teste_t(cubo, papel):
+    """Welch t do ticket entre os dois primeiros grupos de `papel`. (a, b, t, p) ou None."""
+    m = momentos_cubo(cubo, papel)
+    if len(m) < 2:
+        return None
+    res = welch_t(m.iloc[0], m.iloc[1])
+    return None if res is None else (m.index[0], m.index[1], *res)
+
+@st.cache_data(show_spinner="Reamostrando (bootstrap)...", max_entries=16)
+@cache_disco
+def _bootstrap(_dfx, fingerprint, colmap, dim, n_reamostras, conf):
+    """IC bootstrap da média/mediana do ticket por grupo de `dim` (semente fixa)."""
+    return bootstrap_grupos(_dfx[colmap["valor_pedido"]], _dfx[colmap[dim]], n_reamostras, conf, seed=0)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+@cache_disco
+def _resumos_box(_dfx, fingerprint, colmap, _cubo, dim, grupos=None):
+    """Resumos de boxplot do ticket por `dim` (uma ordenação por base + mapeamento + grupos)."""
+    return resumos_boxplot(_dfx, colmap, _cubo, dim, grupos=None if grupos is None else list(grupos))
+
+def _anova_top8(cubo):
+    """ANOVA do ticket entre as 8 categorias de maior volume. (F, p) ou None."""
+    top = top_n(cubo, "categoria", "pedidos", 8).index
+    return anova_f(momentos_cubo(cubo, "categoria").reindex(top).dropna())
+
+def _pontos_dispersao(dfx, colmap):
+    """Qty x valor: todos os pontos se couberem, senão densidade 2D + amostra dos de fora."""
+    x = pd.to_numeric(dfx[colmap["quantidade"]], errors="coerce").to_numpy(dtype="float64")
+    y = pd.to_numeric(dfx[colmap["valor_pedido"]], errors="coerce").to_numpy(dtype="float64")
+    mask = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[mask], y[mask]
+    if len(x) <= DISPERSAO_MAX_PONTOS:
+        return {"n": len(x), "x": x, "y": y}
+    H, ex, ey, fora = densidade_2d(x, y)
+    idx = amostra_indices(fora)
+    return {"n": len(x), "H": H, "ex": ex, "ey": ey, "x": x[idx], "y": y[idx]}
+
+def _precalcular(df, dfx, colmap, cubo) -> dict:
+    """
+    Agenda (uma vez por base + mapeamento) as análises que releem linhas e
+    devolve {nome: Future}; o resto das seções sai direto do cubo.
+    """
+    fp = fingerprint_df(df)
+    base = (fp, tuple(sorted(colmap.items())))
+    tarefas = {}
+    if has(colmap, "valor_pedido", df):
+        for dim in ["tipo_cliente", "tipo_envio"]:
+            if has(colmap, dim, df):
+                tarefas[f"box_{dim}"] = agendar(base + ("box", dim), _resumos_box, dfx, fp, colmap, cubo, dim)
+        if has(colmap, "categoria", df):
+            top = tuple(top_n(cubo, "categoria", "pedidos", 8).index)
+            tarefas["box_categoria"] = agendar(base + ("box", "categoria", top),
+                                               _resumos_box, dfx, fp, colmap, cubo, "categoria", top)
+    if has(colmap, "quantidade", df) and has(colmap, "valor_pedido", df):
+        tarefas["dispersao"] = agendar(base + ("dispersao",), _pontos_dispersao, dfx, colmap)
+    return tarefas
+
+def _nota_topk(cubo, dim, coluna, serie):
+    """Limites de erro do ranking quando a dimensão está resumida (core.sketches)."""
+    nota = nota_topk(cubo, dim, coluna, serie.index)
+    if nota:
+        st.caption(nota)
+
+ROTULO_PROMO = {True: "Com Promoção", False: "Sem Promoção"}
+# Métricas da série temporal: rótulo -> (coluna do cubo, rótulo do eixo, escala)
+METRICAS_TEMPO = {"Pedidos": ("pedidos", "Nº de pedidos", 1),
+                  "Vendas (R$)": ("valor_pedido_soma", "Vendas (R$)", 1),
+                  "Ticket médio (R$)": ("valor_pedido_media", "Ticket médio (R$)", 1),
+                  "% cancelado": ("_cancel_media", "% cancelado", 100)}
+QUEBRAVEIS = ("pedidos", "valor_pedido_soma")  # aditivas: têm rollup diário por grupo
+
+def _serie_tempo(df, colmap, cubo, fp):
+    """Série temporal do rollup diário: granularidade, período, métrica e quebra por dimensão."""
+    dias = cubo["dia"].index
+    if dias.empty:
+        return
+    metricas = [m for m, (c, _, _) in METRICAS_TEMPO.items() if c in cubo["dia"].columns]
+    c1, c2, c3 = st.columns(3)
+    gran = c1.select_slider("Granularidade", list(GRANULARIDADES), value="Mês", key="tempo_gran")
+    metrica = c2.selectbox("Métrica", metricas, key="tempo_metrica")
+    coluna, rotulo_y, escala = METRICAS_TEMPO[metrica]
+    dims = [d for d in DIM_DIARIO if d in cubo.get("_diario", {}) and has(colmap, d, df)]
+    quebra = c3.selectbox("Quebrar por", ["—"] + dims, key="tempo_dim",
+                          disabled=coluna not in QUEBRAVEIS or not dims)
+    quebra = None if quebra == "—" or coluna not in QUEBRAVEIS else quebra
+    ini, fim = dias.min().date(), dias.max().date()
+    sel = st.date_input("Período", value=(ini, fim), min_value=ini, max_value=fim, key="tempo_periodo")
+    if isinstance(sel, (tuple, list)) and len(sel) == 2:
+        ini, fim = sel
+    g = serie_temporal(cubo, GRANULARIDADES[gran], coluna, ini, fim, dim=quebra)
+    if g.empty:
+        st.info("Sem pedidos no período escolhido.")
+        return
+    exibir_grafico(linha(escala * g, f"{metrica} por {gran.lower()}", gran, rotulo_y), fp, colmap, "vendas_mes",
+                   gran=gran, metrica=metrica, quebra=quebra, ini=str(ini), fim=str(fim))
+
+
+# --------------------- 1) VENDAS ---------------------
+def _aba_vendas(df, dfx, colmap, cubo):
+    st.subheader("Vendas")
+    fp = fingerprint_df(df)
+
+    # Evolução no tempo (rollup diário do cubo: granularidade/período sem reler linhas)
+    if has(colmap, "data_pedido", df):
+        st.markdown("**Volume de pedidos no tempo (sazonalidade)**")
+        _serie_tempo(df, colmap, cubo, fp)
+    else:
+        st.info("Sem coluna de data do pedido.")
+
+    # Ticket médio por categoria/produto
+    if has(colmap, "valor_pedido", df) and (has(colmap, "categoria", df) or has(colmap, "produto", df)):
+        alvo = colmap["categoria"] if has(colmap, "categoria", df) else colmap["produto"]
+        st.markdown(f"**Ticket médio por {'categoria' if has(colmap,'categoria',df) else 'produto'}**")
+        dim = "categoria" if has(colmap, "categoria", df) else "produto"
+        tkm = top_n(cubo, dim, "valor_pedido_media", 15)
+        exibir_grafico(barras(tkm, "Top 15", "Ticket médio (R$)", alvo, figsize=(7,4)),
+                       fp, colmap, "ticket_medio", dim=dim, n=15)
+        _nota_topk(cubo, dim, "valor_pedido_media", tkm)
+
+    # Produtos/Categorias mais vendidos
+    if has(colmap, "produto", df):
+        st.markdown("**Produtos mais vendidos (contagem)**")
+        vc = top_n(cubo, "produto", "pedidos", 15)
+        exibir_grafico(barras(vc, "Top 15", "Pedidos", "Produto", figsize=(7,4)), fp, colmap, "top_produtos", n=15)
+        _nota_topk(cubo, "produto", "pedidos", vc)
+
+    if has(colmap, "categoria", df):
+        st.markdown("**Categorias mais vendidas (contagem)**")
+        vc = top_n(cubo, "categoria", "pedidos", 15)
+        exibir_grafico(barras(vc, "Top 15", "Pedidos", "Categoria", figsize=(7,4)),
+                       fp, colmap, "top_categorias", n=15)
+
+    # Regiões mais lucrativas
+    if has(colmap, "regiao", df) and has(colmap, "valor_pedido", df):
+        st.markdown("**Regiões mais lucrativas (soma de vendas)**")
+        gr = top_n(cubo, "regiao", "valor_pedido_soma", 15)
+        exibir_grafico(barras(gr, "Top 15", "Vendas (R$)", "Região", figsize=(7,4)),
+                       fp, colmap, "regioes_vendas", n=15)
+        _nota_topk(cubo, "regiao", "valor_pedido_soma", gr)
+
+    # Proporção B2B x B2C
+    if has(colmap, "tipo_cliente", df):
+        st.markdown("**Proporção de vendas B2B x B2C**")
+        cnt = top_n(cubo, "tipo_cliente", "pedidos")
+        exibir_grafico(pizza(cnt, "B2B vs B2C"), fp, colmap, "pizza_tipo_cliente")
+
+# ---------------- 2) CANCELAMENTOS / ENTREGAS ----------------
+def _aba_cancelamentos(df, dfx, colmap, cubo):
+    st.subheader("Cancelamentos e Entregas")
+    fp = fingerprint_df(df)
+    if has(colmap, "status_pedido", df):
+        total = int(cubo["_total"]["pedidos"].iloc[0])
+        n_cancel = int(cubo["_total"]["_cancel_soma"].iloc[0])
+        st.metric("Taxa de cancelamento", f"{(100*n_cancel/total):.2f}%")
+
+        geral = pd.Series([n_cancel, total-n_cancel], index=["Cancelado","Demais"])
+        exibir_grafico(pizza(geral, "Cancelamento (geral)"), fp, colmap, "cancel_geral")
+
+        if has(colmap, "categoria", df):
+            st.markdown("**Índice de cancelamento por categoria**")
+            tab = top_n(cubo, "categoria", "_cancel_media", 15)
+            exibir_grafico(barras(100*tab, "Top 15 categorias por taxa de cancelamento", "% cancelado", "Categoria", figsize=(7,4)),
+                           fp, colmap, "cancel_categoria", n=15)
+
+        if has(colmap, "tamanho", df):
+            st.markdown("**Índice de cancelamento por tamanho (Size)**")
+            tab = top_n(cubo, "tamanho", "_cancel_media")
+            exibir_grafico(barras(100*tab, "Cancelamento por tamanho", "% cancelado", "Size", figsize=(7,4)),
+                           fp, colmap, "cancel_tamanho")
+
+        if has(colmap, "tipo_envio", df):
+            st.markdown("**Cancelamento por tipo de envio (Amazon x Vendedor)**")
+            tab = top_n(cubo, "tipo_envio", "_cancel_media")
+            exibir_grafico(barras(100*tab, "Cancelamento por tipo de envio", "% cancelado", "Responsável pelo envio"),
+                           fp, colmap, "cancel_envio")
+
+        if has(colmap, "courier_status", df):
+            st.markdown("**Distribuição de Courier Status (proxy de tempo de entrega)**")
+            vc = top_n(cubo, "courier_status", "pedidos", 15)
+            exibir_grafico(barras(vc, "Courier Status (Top 15)", "Pedidos", "Courier Status", figsize=(7,4)),
+                           fp, colmap, "courier_status", n=15)
+    else:
+        st.info("Coluna de Status não encontrada para medir cancelamentos.")
+
+# ------------------------ 3) LOGÍSTICA ------------------------
+def _aba_logistica(df, dfx, colmap, cubo):
+    st.subheader("Logística")
+    fp = fingerprint_df(df)
+
+    if has(colmap, "data_pedido", df) and has(colmap, "data_entrega", df):
+        st.markdown("**Tempo entre pedido e entrega (dias)**")
+        dias = cubo["_dias_entrega"].sort_index()
+        media = np.dot(dias.index, dias.values) / dias.sum() if dias.sum() else np.nan
+        st.metric("Tempo médio (dias)", f"{media:.2f}")
+        exibir_grafico(histograma(dias, "Distribuição do tempo de entrega", "dias"), fp, colmap, "dias_entrega")
+    else:
+        st.info("Sem coluna de data de entrega. Se existir, nomeie como 'Delivered Date' ou similar.")
+
+    if has(colmap, "tipo_envio", df) and has(colmap, "status_pedido", df):
+        st.markdown("**Performance por tipo de envio (entregue vs cancelado)**")
+        tab = (cubo["tipo_envio"][["_entregue_media", "_cancel_media"]]
+               .set_axis(["_entregue", "_cancel"], axis=1).sort_values("_entregue", ascending=False))
+        exibir_grafico(barras(tab, "Entregue vs Cancelado por tipo de envio", rotulo_y="taxa média"),
+                       fp, colmap, "envio_entregue_cancel")
+
+    if has(colmap, "regiao", df) and has(colmap, "status_pedido", df):
+        st.markdown("**Regiões com maior taxa de cancelamento**")
+        tab = top_n(cubo, "regiao", "_cancel_media", 15)
+        exibir_grafico(barras(100*tab, "Top 15 regiões por taxa de cancelamento", "% cancelado", "Região", figsize=(7,4)),
+                       fp, colmap, "cancel_regiao", n=15)
+        _nota_topk(cubo, "regiao", "_cancel_media", tab)
+
+    if has(colmap, "tipo_envio", df) and has(colmap, "status_pedido", df):
+        st.markdown("**Taxa de entrega por responsável (Fulfilled By)**")
+        tab = top_n(cubo, "tipo_envio", "_entregue_media")
+        exibir_grafico(barras(100*tab, "Entrega por responsável", "% entregue", "Responsável pelo envio"),
+                       fp, colmap, "entrega_envio")
+
+# ------------------------- 4) PROMOÇÕES ------------------------
+def _aba_promocoes(df, dfx, colmap, cubo):
+    st.subheader("Promoções")
+    fp = fingerprint_df(df)
+    if has(colmap, "tem_promocao", df):
+        promo = cubo["_has_promo"].sort_index()
+
+        if has(colmap, "valor_pedido", df):
+            st.markdown("**Ticket médio: com x sem promoção**")
+            tab = promo["valor_pedido_media"].rename(ROTULO_PROMO)
+            exibir_grafico(barras(tab, "Ticket médio", "", "Ticket médio (R$)", horizontal=False),
+                           fp, colmap, "promo_ticket")
+
+        if has(colmap, "quantidade", df):
+            st.markdown("**Quantidade média por pedido (Qty)**")
+            tab = promo["quantidade_media"].rename(ROTULO_PROMO)
+            exibir_grafico(barras(tab, "Quantidade média", "", "Qty médio", horizontal=False),
+                           fp, colmap, "promo_qty")
+
+        if has(colmap, "status_pedido", df):
+            st.markdown("**Taxa de cancelamento: com x sem promoção**")
+            tab = promo["_cancel_media"].rename(ROTULO_PROMO)
+            exibir_grafico(barras(100*tab, "Cancelamento por promoção", "", "% cancelado", horizontal=False),
+                           fp, colmap, "promo_cancel")
+    else:
+        st.info("Coluna de promoção não encontrada.")
+
+# -------------------------- 5) PRODUTOS --------------------------
+def _aba_produtos(df, dfx, colmap, cubo):
+    st.subheader("Produtos")
+    fp = fingerprint_df(df)
+
+    if has(colmap, "tamanho", df):
+        st.markdown("**Tamanhos (Size) mais comprados**")
+        vc = top_n(cubo, "tamanho", "pedidos", 15)
+        exibir_grafico(barras(vc, "Top 15 Sizes", "Pedidos", "Size", figsize=(7,4)), fp, colmap, "top_tamanhos", n=15)
+
+    if has(colmap, "valor_unitario", df) and has(colmap, "produto", df):
+        st.markdown("**Produtos com maior valor unitário médio**")
+        tab = top_n(cubo, "produto", "valor_unitario_media", 15)
+        exibir_grafico(barras(tab, "Top 15", "Valor unitário médio (R$)", "Produto", figsize=(7,4)),
+                       fp, colmap, "valor_unitario_produto", n=15)
+        _nota_topk(cubo, "produto", "valor_unitario_media", tab)
+
+    if has(colmap, "quantidade", df) and has(colmap, "valor_pedido", df):
+        st.markdown("**Correlação: Quantidade (Qty) x Valor do Pedido (R$)**")
+        fut = _precalcular(df, dfx, colmap, cubo)["dispersao"]
+        if not esperar(fut, texto="Preparando a dispersão"):
+            return
+        pts = fut.result()
+        # tendência pelas somas do cubo (exata mesmo no modo streaming)
+        est = cubo["_dispersao"]
+        coef = reta_minimos_quadrados(est)
+        densidade = "H" in pts
+        outliers = densidade and st.checkbox("Mostrar amostra de outliers", value=True, key="disp_outliers")
+        if densidade:
+            st.caption(f"{pts['n']:,} pontos: exibindo densidade (histograma 2D) em vez de cada ponto.")
+        def _fig():
+            fig, ax = plt.subplots()
+            if densidade:
+                m = ax.pcolormesh(pts["ex"], pts["ey"], np.ma.masked_equal(pts["H"].T, 0), cmap="viridis", norm=LogNorm())
+                fig.colorbar(m, ax=ax, label="Pedidos")
+                if outliers:
+                    ax.scatter(pts["x"], pts["y"], s=6, alpha=0.5, color="tab:red", label="outliers (amostra)")
+                    ax.legend(loc="upper left")
+            else:
+                ax.scatter(pts["x"], pts["y"], alpha=0.6)
+            if coef is not None:
+                xr = np.linspace(est["xmin"], est["xmax"], 100)
+                ax.plot(xr, coef[0]*xr + coef[1])
+            ax.set_xlabel("Quantidade (Qty)"); ax.set_ylabel("Valor do Pedido (R$)")
+            ax.set_title("Dispersão com tendência")
+            return fig
+        pyplot_cache(_fig, fp, colmap, "dispersao_qty_valor", densidade=densidade, outliers=outliers)
+
+# ---------------------- 6) ESTATÍSTICA AVANÇADA ----------------------
+def _aba_estatistica(df, dfx, colmap, cubo):
+    st.subheader("Estatística / Avançadas")
+    fp = fingerprint_df(df)
+    tarefas = _precalcular(df, dfx, colmap, cubo)
+
+    if has(colmap, "valor_pedido", df) and has(colmap, "tipo_cliente", df):
+        st.markdown("**Ticket médio — B2B vs B2C**")
+        if esperar(tarefas["box_tipo_cliente"], texto="Resumindo o ticket por tipo de cliente"):
+            box = tarefas["box_tipo_cliente"].result()
+            exibir_grafico(box_resumo(box, "Boxplot — Ticket por grupo", "Tipo de cliente", "Valor do pedido (R$)"),
+                           fp, colmap, "box_tipo_cliente")
+
+        res = _teste_t(cubo, "tipo_cliente")
+        if res is not None:
+            a, b, tstat, pval = res
+            st.write(f"{a} vs {b} — t = {tstat:.4f}, p-valor = {pval:.4g}")
+
+    if has(colmap, "valor_pedido", df) and has(colmap, "tipo_envio", df):
+        st.markdown("**Ticket médio — Amazon vs Vendedor**")
+        if esperar(tarefas["box_tipo_envio"], texto="Resumindo o ticket por tipo de envio"):
+            box = tarefas["box_tipo_envio"].result()
+            exibir_grafico(box_resumo(box, "Boxplot — Ticket por envio", "Responsável pelo envio", "Valor do pedido (R$)"),
+                           fp, colmap, "box_tipo_envio")
+
+        res = _teste_t(cubo, "tipo_envio")
+        if res is not None:
+            a, b, tstat, pval = res
+            st.write(f"{a} vs {b} — t = {tstat:.4f}, p-valor = {pval:.4g}")
+
+    if has(colmap, "quantidade", df) and has(colmap, "valor_pedido", df):
+        st.markdown("**Correlação — Nº Itens (Qty) x Valor do Pedido (R$)**")
+        r_p = pearson(cubo["_dispersao"])
+        if r_p is not None:
+            r, p = r_p
+            st.write(f"r = {r:.4f}, p-valor = {p:.4g}")
+
+    if has(colmap, "valor_pedido", df) and has(colmap, "categoria", df):
+        st.markdown("**ANOVA — Ticket entre categorias (Top 8 por volume)**")
+        if esperar(tarefas["box_categoria"], texto="Resumindo o ticket por categoria"):
+            box = tarefas["box_categoria"].result()
+            exibir_grafico(box_resumo(box, "Boxplot — Ticket por categoria (Top 8)", "Categoria", "Valor do pedido (R$)",
+                                      figsize=(8,4)), fp, colmap, "box_categoria", n=8)
+
+        res = _anova_top8(cubo)
+        if res is not None:
+            fstat, pval = res
+            st.write(f"F = {fstat:.4f}, p-valor = {pval:.4g}")
+
+    dims_boot = [d for d in ["categoria", "regiao", "tipo_envio", "tipo_cliente"] if has(colmap, d, df)]
+    if has(colmap, "valor_pedido", df) and dims_boot:
+        with st.expander("IC por bootstrap — média e mediana do ticket por grupo"):
+            c1, c2, c3 = st.columns(3)
+            dim = c1.selectbox("Agrupar por", dims_boot, key="boot_dim")
+            n_reamostras = c2.select_slider("Reamostras", [1000, 2000, 5000, 10000], value=2000, key="boot_b")
+            conf = c3.select_slider("Confiança", [0.90, 0.95, 0.99], value=0.95, key="boot_conf")
+            if st.toggle("Calcular", key="boot_on"):
+                with span("bootstrap", reamostras=n_reamostras):
+                    tab = _bootstrap(dfx, fp, colmap, dim, n_reamostras, conf).sort_values("n", ascending=False)
+                st.dataframe(tab.round(2))
+                top = tab.head(15).iloc[::-1]
+                def _fig():
+                    fig, ax = plt.subplots(figsize=(7,4))
+                    ax.errorbar(top["media"], top.index.astype(str), fmt="o",
+                                xerr=[top["media"] - top["media_li"], top["media_ls"] - top["media"]], capsize=3)
+                    ax.set_xlabel("Ticket médio (R$)"); ax.set_ylabel(dim)
+                    ax.set_title(f"IC {int(conf*100)}% bootstrap da média (Top 15 por volume)")
+                    return fig
+                pyplot_cache(_fig, fp, colmap, "bootstrap", dim=dim, n_reamostras=n_reamostras, conf=conf)
 
 # =========================
 # Página
 # =========================
+# =========================
+# Filtros de leitura (bases particionadas)
+# =========================
+@st.cache_data(show_spinner=False)
+def _intervalo_dataset(caminho, chave, coluna, formato):
+    return intervalo_datas(caminho, coluna, formato)
+
+@st.cache_data(show_spinner=False)
+def _valores_dataset(caminho, chave, coluna):
+    return valores_distintos(caminho, coluna)
+
+# =========================
+# Filtros globais (barra lateral, todas as seções)
+# =========================
+ROTULOS_FILTRO = {"categoria": "Categoria", "regiao": "Região", "tipo_envio": "Tipo de envio",
+                  "tipo_cliente": "B2B / B2C"}
+
+def _filtros_globais(df, colmap, cubo) -> dict:
+    """Widgets da barra lateral (opções e período vêm do cubo da base inteira); {} = sem filtro."""
+    st.sidebar.markdown("### Filtros")
+    filtros, valores = {}, {}
+    dias = cubo["dia"].index if "dia" in cubo else pd.DatetimeIndex([])
+    if len(dias):
+        ini, fim = dias.min().date(), dias.max().date()
+        sel = st.sidebar.date_input("Período", value=(ini, fim), min_value=ini, max_value=fim, key="f_periodo")
+        if isinstance(sel, (tuple, list)) and len(sel) == 2 and tuple(sel) != (ini, fim):
+            filtros["periodo"] = (sel[0].isoformat(), sel[1].isoformat())
+    for papel, rotulo in ROTULOS_FILTRO.items():
+        if papel in cubo and has(colmap, papel, df):
+            sel = st.sidebar.multiselect(rotulo, top_n(cubo, papel, "pedidos").index.tolist(), key=f"f_{papel}")
+            if sel:
+                valores[papel] = sel
+    if valores:
+        filtros["valores"] = valores
+    return filtros
+
+def _recortar(dfx, colmap, filtros):
+    """
+    Linhas que passam nos filtros (AND de bitmaps do índice da base, core.filtros)
+    e o cubo refeito só com elas; o recorte ganha impressão digital própria.
+    """
+    fp = fingerprint_df(dfx)
+    with span("filtros:indice"):
+        indice = agendar((fp, "indice_filtros"), construir_indice, dfx, colmap).result()
+    with span("filtros:selecionar"):
+        pos = selecionar(indice, filtros)
+    st.sidebar.caption(f"{len(pos):,} de {len(dfx):,} linhas selecionadas.")
+    if not len(pos):
+        st.warning("Nenhuma linha com esses filtros.")
+        st.stop()
+    sub = dfx.iloc[pos]
+    sub.attrs = {"fingerprint": f"{fp}:f{rotulo_filtros(filtros)}"}
+    with span("cubo_agregado:recorte", linhas=len(sub)):
+        cubo = cubo_agregado(sub, fingerprint_df(sub), colmap)
+    return sub, cubo
+
+def _filtros_dataset(fonte, chave, perfil):
+    """Período e categorias empurrados para a leitura das partições; vazio = base inteira."""
+    colmap, filtros = perfil["colmap"], {}
+    with st.expander("Filtros de leitura (base particionada)", expanded=True):
+        col = colmap.get("data_pedido")
+        if col:
+            fmt = perfil["formatos_data"].get(col)
+            intervalo = _intervalo_dataset(fonte, chave, col, fmt)
+            if intervalo:
+                sel = st.date_input("Período", value=intervalo, min_value=intervalo[0],
+                                    max_value=intervalo[1], key="ds_periodo")
+                if isinstance(sel, (tuple, list)) and len(sel) == 2 and tuple(sel) != tuple(intervalo):
+                    filtros["periodo"] = (col, sel[0].isoformat(), sel[1].isoformat(), fmt)
+        col = colmap.get("categoria")
+        if col:
+            vals = st.multiselect("Categorias", _valores_dataset(fonte, chave, col), key="ds_categorias")
+            if vals:
+                filtros["valores"] = {col: tuple(vals)}
+    return filtros
+
 def render():
     st.title("📊 Análise de Dados — CP1")
-
-    # 1) Carregar base
-    df = carregar_df(st)
-    if df is None:
+    st.sidebar.radio("Gráficos", list(BACKENDS), index=list(BACKENDS).index(BACKEND_GRAFICOS),
+                     format_func=BACKENDS.get, key="backend_graficos",
+                     help="Navegador: envia só os números agregados e o Plotly desenha no cliente. "
+                          "Servidor: rasteriza com matplotlib (PNG em cache).")
+
+    # 1) Localizar base (sem ler)
+    with span("localizar_fonte"):
+        fonte, chave = localizar_fonte(st)
+    if fonte is None:
         st.warning("Carregue a base para continuar.")
         st.stop()
 
-    # 2) Auto‑map
-    colmap = automap(df)
-    dfx = df.copy()
-
-    # conversões úteis
-    if has(colmap, "data_pedido", df):
-        dfx[colmap["data_pedido"]] = pd.to_datetime(dfx[colmap["data_pedido"]], errors="coerce")
-    if has(colmap, "data_entrega", df):
-        dfx[colmap["data_entrega"]] = pd.to_datetime(dfx[colmap["data_entrega"]], errors="coerce")
-    if has(colmap, "valor_pedido", df):
-        dfx[colmap["valor_pedido"]] = pd.to_numeric(dfx[colmap["valor_pedido"]], errors="coerce")
-    if has(colmap, "quantidade", df):
-        dfx[colmap["quantidade"]] = pd.to_numeric(dfx[colmap["quantidade"]], errors="coerce")
-    if has(colmap, "valor_unitario", df):
-        dfx[colmap["valor_unitario"]] = pd.to_numeric(dfx[colmap["valor_unitario"]], errors="coerce")
+    streaming = eh_csv(fonte) and st.toggle(
+        "Modo streaming (CSV maior que a memória)", value=tamanho_mb(fonte) >= STREAM_MIN_MB,
+        help="Lê o CSV em blocos e agrega bloco a bloco; gráficos por linha usam uma amostra fixa.")
+
+    # 2) Auto‑map + formatos de data/regras numéricas a partir só do esquema e das
+    #    primeiras linhas (perfil reaproveitado por conjunto de colunas)
+    try:
+        with span("perfil_esquema"):
+            perfil = perfil_esquema(ler_amostra(fonte, chave))
+    except Exception as e:
+        st.error(f"Erro ao ler o arquivo: {e}")
+        st.stop()
+    colmap = perfil["colmap"]
+
+    if streaming:
+        # conversões/derivadas aplicadas em cada bloco
+        with span("leitura:streaming"):
+            cubo, df = cubo_streaming(fonte, chave, colmap, perfil)
+        dfx = df
+        st.caption(f"Streaming: {int(cubo['_total']['pedidos'].iloc[0]):,} linhas agregadas; "
+                   f"gráficos por linha usam amostra de {len(df):,}.")
+    else:
+        compactar = st.toggle("Compactar tipos na carga", value=COMPACTAR,
+                              help="Texto repetido vira `category`, texto booleano vira `boolean` e numéricos são rebaixados.")
+        # só as colunas mapeadas são lidas (e, em bases particionadas, só as partições filtradas)
+        filtros = _filtros_dataset(fonte, chave, perfil) if eh_dataset(fonte) else None
+        # upload gravado em disco nunca cresce: sem atualização incremental
+        incremental = isinstance(fonte, str) and not chave.startswith("upload:") \
+            and (eh_csv(fonte) or eh_dataset(fonte)) and st.toggle(
+            "Atualização incremental", value=INCREMENTAL,
+            help="Guarda a base e os agregados; quando a fonte cresce, lê só as linhas/partições novas e mescla os agregados.")
+        if incremental:
+            with span("leitura:incremental"):
+                dfx, cubo, info = carregar_incremental(fonte, colmap, perfil, compactar, filtros)
+            df = dfx
+            rotulo = {"completo": "carga completa", "incremental": f"+{info['novas']:,} linhas novas",
+                      "inalterado": "sem novidades"}[info["modo"]]
+            st.caption(f"Incremental: {info['linhas']:,} linhas ({rotulo}).")
+            vigiar_fonte(fonte, info["marca"])
+        else:
+            with span("leitura"):
+                df = ler_fonte(fonte, chave, st, compactar=compactar, colunas=colunas_mapeadas(colmap), filtros=filtros)
+            if df is None:
+                st.warning("Carregue a base para continuar.")
+                st.stop()
+
+            # cópia rasa: só as colunas convertidas/derivadas ocupam memória nova
+            dfx = df.copy(deep=False)
+
+            # conversões úteis + colunas derivadas (_cancel, _entregue, _has_promo, _dias_entrega), uma vez só
+            converter_tipos(dfx, colmap, perfil)
+            derivar_colunas(dfx, colmap)
+
+            # agregados por dimensão (uma passada cada, cache por base + mapeamento), em
+            # segundo plano: o mapeamento e a memória aparecem enquanto o cubo é montado
+            with span("cubo_agregado:agendar"):
+                fp = fingerprint_df(df)
+                cubo = agendar((fp, tuple(sorted(colmap.items())), "cubo"), cubo_agregado, dfx, fp, colmap)
+
+            mem = relatorio_memoria(df)
+            if mem is not None:
+                antes, depois = mem["mb_antes"].sum(), mem["mb_depois"].sum()
+                with st.expander(f"Memória da base: {antes:,.1f} MB → {depois:,.1f} MB"):
+                    st.dataframe(mem.style.format({"mb_antes": "{:,.2f}", "mb_depois": "{:,.2f}"}))
 
     st.caption("Mapeamento detectado:")
     st.dataframe(pd.DataFrame([{"papel": k, "coluna": v} for k, v in colmap.items() if v], columns=["papel","coluna"]))
 
-    # 3) Abas (um gráfico por pergunta)
-    aba_v, aba_c, aba_l, aba_promo, aba_prod, aba_stat = st.tabs(
-        ["1) Vendas", "2) Cancelamentos/Entregas", "3) Logística", "4) Promoções", "5) Produtos", "6) Estatística"]
-    )
-
-    # --------------------- 1) VENDAS ---------------------
-    with aba_v:
-        st.subheader("Vendas")
-
-        # Volume por mês
-        if has(colmap, "data_pedido", df):
-            st.markdown("**Volume de pedidos por mês (sazonalidade)**")
-            dd = dfx.dropna(subset=[colmap["data_pedido"]]).copy()
-            dd["mes"] = dd[colmap["data_pedido"]].dt.to_period("M").dt.to_timestamp()
-            g = dd.groupby("mes").size().reset_index(name="pedidos")
-            if not g.empty:
-                fig, ax = plt.subplots()
-                ax.plot(g["mes"], g["pedidos"], marker="o")
-                ax.set_title("Pedidos por mês"); ax.set_xlabel("Mês"); ax.set_ylabel("Nº de pedidos")
-                st.pyplot(fig, clear_figure=True)
-        else:
-            st.info("Sem coluna de data do pedido.")
-
-        # Ticket médio por categoria/produto
-        if has(colmap, "valor_pedido", df) and (has(colmap, "categoria", df) or has(colmap, "produto", df)):
-            alvo = colmap["categoria"] if has(colmap, "categoria", df) else colmap["produto"]
-            st.markdown(f"**Ticket médio por {'categoria' if has(colmap,'categoria',df) else 'produto'}**")
-            tkm = dfx.groupby(alvo)[colmap["valor_pedido"]].mean().sort_values(ascending=False).head(15)
-            fig, ax = plt.subplots(figsize=(7,4))
-            sns.barplot(x=tkm.values, y=tkm.index, ax=ax)
-            ax.set_xlabel("Ticket médio (R$)"); ax.set_ylabel(alvo); ax.set_title("Top 15")
-            st.pyplot(fig, clear_figure=True)
-
-        # Produtos/Categorias mais vendidos
-        if has(colmap, "produto", df):
-            st.markdown("**Produtos mais vendidos (contagem)**")
-            vc = dfx[colmap["produto"]].value_counts().head(15)
-            fig, ax = plt.subplots(figsize=(7,4))
-            sns.barplot(x=vc.values, y=vc.index, ax=ax)
-            ax.set_xlabel("Pedidos"); ax.set_ylabel("Produto"); ax.set_title("Top 15")
-            st.pyplot(fig, clear_figure=True)
-
-        if has(colmap, "categoria", df):
-            st.markdown("**Categorias mais vendidas (contagem)**")
-            vc = dfx[colmap["categoria"]].value_counts().head(15)
-            fig, ax = plt.subplots(figsize=(7,4))
-            sns.barplot(x=vc.values, y=vc.index, ax=ax)
-            ax.set_xlabel("Pedidos"); ax.set_ylabel("Categoria"); ax.set_title("Top 15")
-            st.pyplot(fig, clear_figure=True)  # corrigido: clear_figure
-
-        # Regiões mais lucrativas
-        if has(colmap, "regiao", df) and has(colmap, "valor_pedido", df):
-            st.markdown("**Regiões mais lucrativas (soma de vendas)**")
-            gr = dfx.groupby(colmap["regiao"])[colmap["valor_pedido"]].sum().sort_values(ascending=False).head(15)
-            fig, ax = plt.subplots(figsize=(7,4))
-            sns.barplot(x=gr.values, y=gr.index, ax=ax)
-            ax.set_xlabel("Vendas (R$)"); ax.set_ylabel("Região"); ax.set_title("Top 15")
-            st.pyplot(fig, clear_figure=True)
-
-        # Proporção B2B x B2C
-        if has(colmap, "tipo_cliente", df):
-            st.markdown("**Proporção de vendas B2B x B2C**")
-            cnt = dfx[colmap["tipo_cliente"]].value_counts()
-            fig, ax = plt.subplots()
-            ax.pie(cnt.values, labels=cnt.index, autopct="%1.1f%%", startangle=90)
-            ax.axis("equal"); ax.set_title("B2B vs B2C")
-            st.pyplot(fig, clear_figure=True)
-
-    # ---------------- 2) CANCELAMENTOS / ENTREGAS ----------------
-    with aba_c:
-        st.subheader("Cancelamentos e Entregas")
-        if has(colmap, "status_pedido", df):
-            status_col = colmap["status_pedido"]
-            total = len(dfx)
-            cancel_mask = dfx[status_col].astype(str).str.lower().str.contains("cancel", na=False)
-            n_cancel = int(cancel_mask.sum())
-            st.metric("Taxa de cancelamento", f"{(100*n_cancel/total):.2f}%")
-
-            fig, ax = plt.subplots()
-            ax.pie([n_cancel, total-n_cancel], labels=["Cancelado","Demais"], autopct="%1.1f%%", startangle=90)
-            ax.axis("equal"); ax.set_title("Cancelamento (geral)")
-            st.pyplot(fig, clear_figure=True)
-
-            if has(colmap, "categoria", df):
-                st.markdown("**Índice de cancelamento por categoria**")
-                tmp = dfx.assign(_cancel=cancel_mask.astype(int))
-                tab = tmp.groupby(colmap["categoria"])["_cancel"].mean().sort_values(ascending=False).head(15)
-                fig, ax = plt.subplots(figsize=(7,4))
-                sns.barplot(x=(100*tab.values), y=tab.index, ax=ax)
-                ax.set_xlabel("% cancelado"); ax.set_ylabel("Categoria")
-                ax.set_title("Top 15 categorias por taxa de cancelamento")
-                st.pyplot(fig, clear_figure=True)
-
-            if has(colmap, "tamanho", df):
-                st.markdown("**Índice de cancelamento por tamanho (Size)**")
-                tmp = dfx.assign(_cancel=cancel_mask.astype(int))
-                tab = tmp.groupby(colmap["tamanho"])["_cancel"].mean().sort_values(ascending=False)
-                fig, ax = plt.subplots(figsize=(7,4))
-                sns.barplot(x=(100*tab.values), y=tab.index, ax=ax)
-                ax.set_xlabel("% cancelado"); ax.set_ylabel("Size")
-                ax.set_title("Cancelamento por tamanho")
-                st.pyplot(fig, clear_figure=True)
-
-            if has(colmap, "tipo_envio", df):
-                st.markdown("**Cancelamento por tipo de envio (Amazon x Vendedor)**")
-                tmp = dfx.assign(_cancel=cancel_mask.astype(int))
-                tab = tmp.groupby(colmap["tipo_envio"])["_cancel"].mean().sort_values(ascending=False)
-                fig, ax = plt.subplots()
-                sns.barplot(x=(100*tab.values), y=tab.index, ax=ax)
-                ax.set_xlabel("% cancelado"); ax.set_ylabel("Responsável pelo envio")
-                ax.set_title("Cancelamento por tipo de envio")
-                st.pyplot(fig, clear_figure=True)
-
-            if has(colmap, "courier_status", df):
-                st.markdown("**Distribuição de Courier Status (proxy de tempo de entrega)**")
-                vc = dfx[colmap["courier_status"]].value_counts().head(15)
-                fig, ax = plt.subplots(figsize=(7,4))
-                sns.barplot(x=vc.values, y=vc.index, ax=ax)
-                ax.set_xlabel("Pedidos"); ax.set_ylabel("Courier Status")
-                ax.set_title("Courier Status (Top 15)")
-                st.pyplot(fig, clear_figure=True)
-        else:
-            st.info("Coluna de Status não encontrada para medir cancelamentos.")
-
-    # ------------------------ 3) LOGÍSTICA ------------------------
-    with aba_l:
-        st.subheader("Logística")
-
-        if has(colmap, "data_pedido", df) and has(colmap, "data_entrega", df):
-            st.markdown("**Tempo entre pedido e entrega (dias)**")
-            dd = dfx.dropna(subset=[colmap["data_pedido"], colmap["data_entrega"]]).copy()
-            dd["dias"] = (dd[colmap["data_entrega"]] - dd[colmap["data_pedido"]]).dt.days
-            st.metric("Tempo médio (dias)", f"{dd['dias'].mean():.2f}")
-            fig, ax = plt.subplots()
-            sns.histplot(dd["dias"], kde=True, ax=ax)
-            ax.set_xlabel("dias"); ax.set_title("Distribuição do tempo de entrega")
-            st.pyplot(fig, clear_figure=True)
-        else:
-            st.info("Sem coluna de data de entrega. Se existir, nomeie como 'Delivered Date' ou similar.")
-
-        if has(colmap, "tipo_envio", df) and has(colmap, "status_pedido", df):
-            st.markdown("**Performance por tipo de envio (entregue vs cancelado)**")
-            entreg_mask = dfx[colmap["status_pedido"]].astype(str).str.lower().str.contains("entreg", na=False)
-            cancel_mask = dfx[colmap["status_pedido"]].astype(str).str.lower().str.contains("cancel", na=False)
-            tmp = dfx.assign(_entregue=entreg_mask.astype(int), _cancel=cancel_mask.astype(int))
-            tab = tmp.groupby(colmap["tipo_envio"])[["_entregue","_cancel"]].mean().sort_values("_entregue", ascending=False)
-            fig, ax = plt.subplots()
-            tab.plot(kind="bar", ax=ax)
-            ax.set_ylabel("taxa média"); ax.set_title("Entregue vs Cancelado por tipo de envio")
-            st.pyplot(fig, clear_figure=True)
-
-        if has(colmap, "regiao", df) and has(colmap, "status_pedido", df):
-            st.markdown("**Regiões com maior taxa de cancelamento**")
-            cancel_mask = dfx[colmap["status_pedido"]].astype(str).str.lower().str.contains("cancel", na=False)
-            tmp = dfx.assign(_cancel=cancel_mask.astype(int))
-            tab = tmp.groupby(colmap["regiao"])["_cancel"].mean().sort_values(ascending=False).head(15)
-            fig, ax = plt.subplots(figsize=(7,4))
-            sns.barplot(x=(100*tab.values), y=tab.index, ax=ax)
-            ax.set_xlabel("% cancelado"); ax.set_ylabel("Região")
-            ax.set_title("Top 15 regiões por taxa de cancelamento")
-            st.pyplot(fig, clear_figure=True)
-
-        if has(colmap, "tipo_envio", df) and has(colmap, "status_pedido", df):
-            st.markdown("**Taxa de entrega por responsável (Fulfilled By)**")
-            entreg_mask = dfx[colmap["status_pedido"]].astype(str).str.lower().str.contains("entreg", na=False)
-            tmp = dfx.assign(_entregue=entreg_mask.astype(int))
-            tab = tmp.groupby(colmap["tipo_envio"])["_entregue"].mean().sort_values(ascending=False)
-            fig, ax = plt.subplots()
-            sns.barplot(x=(100*tab.values), y=tab.index, ax=ax)
-            ax.set_xlabel("% entregue"); ax.set_ylabel("Responsável pelo envio")
-            ax.set_title("Entrega por responsável")
-            st.pyplot(fig, clear_figure=True)
-
-    # ------------------------- 4) PROMOÇÕES ------------------------
-    with aba_promo:
-        st.subheader("Promoções")
-        if has(colmap, "tem_promocao", df):
-            promo = dfx[colmap["tem_promocao"]]
-            promo_bool = promo.astype(str).str.strip().str.lower().isin(["1","true","sim","yes","y"]) | promo.notna()
-            dfx["_has_promo"] = promo_bool
-
-            if has(colmap, "valor_pedido", df):
-                st.markdown("**Ticket médio: com x sem promoção**")
-                tab = dfx.groupby("_has_promo")[colmap["valor_pedido"]].mean().rename(
-                    {True:"Com Promoção", False:"Sem Promoção"})
-                fig, ax = plt.subplots()
-                sns.barplot(x=tab.index.map({True:"Com Promoção", False:"Sem Promoção"}), y=tab.values, ax=ax)
-                ax.set_ylabel("Ticket médio (R$)"); ax.set_xlabel(""); ax.set_title("Ticket médio")
-                st.pyplot(fig, clear_figure=True)
-
-            if has(colmap, "quantidade", df):
-                st.markdown("**Quantidade média por pedido (Qty)**")
-                tab = dfx.groupby("_has_promo")[colmap["quantidade"]].mean().rename(
-                    {True:"Com Promoção", False:"Sem Promoção"})
-                fig, ax = plt.subplots()
-                sns.barplot(x=tab.index.map({True:"Com Promoção", False:"Sem Promoção"}), y=tab.values, ax=ax)
-                ax.set_ylabel("Qty médio"); ax.set_xlabel(""); ax.set_title("Quantidade média")
-                st.pyplot(fig, clear_figure=True)
-
-            if has(colmap, "status_pedido", df):
-                st.markdown("**Taxa de cancelamento: com x sem promoção**")
-                cancel_mask = dfx[colmap["status_pedido"]].astype(str).str.lower().str.contains("cancel", na=False)
-                tmp = dfx.assign(_cancel=cancel_mask.astype(int))
-                tab = tmp.groupby("_has_promo")["_cancel"].mean().rename({True:"Com Promoção", False:"Sem Promoção"})
-                fig, ax = plt.subplots()
-                sns.barplot(x=tab.index, y=(100*tab.values), ax=ax)
-                ax.set_ylabel("% cancelado"); ax.set_xlabel(""); ax.set_title("Cancelamento por promoção")
-                st.pyplot(fig, clear_figure=True)
-        else:
-            st.info("Coluna de promoção não encontrada.")
-
-    # -------------------------- 5) PRODUTOS --------------------------
-    with aba_prod:
-        st.subheader("Produtos")
-
-        if has(colmap, "tamanho", df):
-            st.markdown("**Tamanhos (Size) mais comprados**")
-            vc = dfx[colmap["tamanho"]].value_counts().head(15)
-            fig, ax = plt.subplots(figsize=(7,4))
-            sns.barplot(x=vc.values, y=vc.index, ax=ax)
-            ax.set_xlabel("Pedidos"); ax.set_ylabel("Size"); ax.set_title("Top 15 Sizes")
-            st.pyplot(fig, clear_figure=True)
-
-        if has(colmap, "valor_unitario", df) and has(colmap, "produto", df):
-            st.markdown("**Produtos com maior valor unitário médio**")
-            tab = dfx.groupby(colmap["produto"])[colmap["valor_unitario"]].mean().sort_values(ascending=False).head(15)
-            fig, ax = plt.subplots(figsize=(7,4))
-            sns.barplot(x=tab.values, y=tab.index, ax=ax)
-            ax.set_xlabel("Valor unitário médio (R$)"); ax.set_ylabel("Produto"); ax.set_title("Top 15")
-            st.pyplot(fig, clear_figure=True)
-
-        if has(colmap, "quantidade", df) and has(colmap, "valor_pedido", df):
-            st.markdown("**Correlação: Quantidade (Qty) x Valor do Pedido (R$)**")
-            x = pd.to_numeric(dfx[colmap["quantidade"]], errors="coerce")
-            y = pd.to_numeric(dfx[colmap["valor_pedido"]], errors="coerce")
-            mask = x.notna() & y.notna()
-            fig, ax = plt.subplots()
-            ax.scatter(x[mask], y[mask], alpha=0.6)
-            try:
-                coef = np.polyfit(x[mask], y[mask], 1)
-                xr = np.linspace(x[mask].min(), x[mask].max(), 100)
-                ax.plot(xr, coef[0]*xr + coef[1])
-            except Exception:
-                pass
-            ax.set_xlabel("Quantidade (Qty)"); ax.set_ylabel("Valor do Pedido (R$)")
-            ax.set_title("Dispersão com tendência")
-            st.pyplot(fig, clear_figure=True)
-
-    # ---------------------- 6) ESTATÍSTICA AVANÇADA ----------------------
-    with aba_stat:
-        st.subheader("Estatística / Avançadas")
-
-        if has(colmap, "valor_pedido", df) and has(colmap, "tipo_cliente", df):
-            st.markdown("**Ticket médio — B2B vs B2C**")
-            fig, ax = plt.subplots()
-            sns.boxplot(x=dfx[colmap["tipo_cliente"]], y=dfx[colmap["valor_pedido"]], ax=ax)
-            ax.set_xlabel("Tipo de cliente"); ax.set_ylabel("Valor do pedido (R$)")
-            ax.set_title("Boxplot — Ticket por grupo")
-            st.pyplot(fig, clear_figure=True)
-
-            g = dfx[colmap["tipo_cliente"]].astype(str)
-            grupos = g.dropna().unique()
-            if len(grupos) >= 2:
-                a, b = grupos[:2]
-                x1 = pd.to_numeric(dfx.loc[g==a, colmap["valor_pedido"]], errors="coerce").dropna()
-                x2 = pd.to_numeric(dfx.loc[g==b, colmap["valor_pedido"]], errors="coerce").dropna()
-                if len(x1) >= 2 and len(x2) >= 2:
-                    tstat, pval = stats.ttest_ind(x1, x2, equal_var=False)
-                    st.write(f"{a} vs {b} — t = {tstat:.4f}, p-valor = {pval:.4g}")
-
-        if has(colmap, "valor_pedido", df) and has(colmap, "tipo_envio", df):
-            st.markdown("**Ticket médio — Amazon vs Vendedor**")
-            fig, ax = plt.subplots()
-            sns.boxplot(x=dfx[colmap["tipo_envio"]], y=dfx[colmap["valor_pedido"]], ax=ax)
-            ax.set_xlabel("Responsável pelo envio"); ax.set_ylabel("Valor do pedido (R$)")
-            ax.set_title("Boxplot — Ticket por envio")
-            st.pyplot(fig, clear_figure=True)
-
-            g = dfx[colmap["tipo_envio"]].astype(str)
-            grupos = g.dropna().unique()
-            if len(grupos) >= 2:
-                a, b = grupos[:2]
-                x1 = pd.to_numeric(dfx.loc[g==a, colmap["valor_pedido"]], errors="coerce").dropna()
-                x2 = pd.to_numeric(dfx.loc[g==b, colmap["valor_pedido"]], errors="coerce").dropna()
-                if len(x1) >= 2 and len(x2) >= 2:
-                    tstat, pval = stats.ttest_ind(x1, x2, equal_var=False)
-                    st.write(f"{a} vs {b} — t = {tstat:.4f}, p-valor = {pval:.4g}")
-
-        if has(colmap, "quantidade", df) and has(colmap, "valor_pedido", df):
-            st.markdown("**Correlação — Nº Itens (Qty) x Valor do Pedido (R$)**")
-            r_p = correlacao_pearson(dfx[colmap["quantidade"]], dfx[colmap["valor_pedido"]])
-            if r_p is not None:
-                r, p = r_p
-                st.write(f"r = {r:.4f}, p-valor = {p:.4g}")
-
-        if has(colmap, "valor_pedido", df) and has(colmap, "categoria", df):
-            st.markdown("**ANOVA — Ticket entre categorias (Top 8 por volume)**")
-            top = dfx[colmap["categoria"]].value_counts().head(8).index
-            subset = dfx[dfx[colmap["categoria"]].isin(top)]
-            fig, ax = plt.subplots(figsize=(8,4))
-            sns.boxplot(x=subset[colmap["categoria"]], y=subset[colmap["valor_pedido"]], ax=ax)
-            ax.set_xlabel("Categoria"); ax.set_ylabel("Valor do pedido (R$)")
-            ax.set_title("Boxplot — Ticket por categoria (Top 8)")
-            st.pyplot(fig, clear_figure=True)
-
-            grupos = [pd.to_numeric(subset.loc[subset[colmap["categoria"]]==k, colmap["valor_pedido"]],
-                                    errors="coerce").dropna() for k in top]
-            grupos = [g for g in grupos if len(g) >= 2]
-            if len(grupos) >= 2:
-                fstat, pval = stats.f_oneway(*grupos)
-                st.write(f"F = {fstat:.4f}, p-valor = {pval:.4g}")
+    # o resto da página parte do cubo: aviso no lugar das seções até ele ficar pronto
+    if isinstance(cubo, Future):
+        if not esperar(cubo, texto="Montando os agregados"):
+            return
+        cubo = cubo.result()
+
+    # 3) Filtros globais: índice de bitmaps montado em segundo plano; só as linhas escolhidas são reagregadas
+    if streaming:
+        st.sidebar.caption("Filtros globais indisponíveis no modo streaming (a base não fica na memória).")
+    else:
+        if PRECALC:
+            agendar((fingerprint_df(dfx), "indice_filtros"), construir_indice, dfx, colmap)
+        filtros = _filtros_globais(df, colmap, cubo)
+        if filtros:
+            dfx, cubo = _recortar(dfx, colmap, filtros)
+            df = dfx
+
+    # 4) Análises que releem linhas começam já, em segundo plano (core.precalculo)
+    with span("precalculo:agendar"):
+        _precalcular(df, dfx, colmap, cubo)
+
+    # 5) Seções (um gráfico por pergunta) — só a seção escolhida executa
+    secoes = {
+        "1) Vendas": _aba_vendas,
+        "2) Cancelamentos/Entregas": _aba_cancelamentos,
+        "3) Logística": _aba_logistica,
+        "4) Promoções": _aba_promocoes,
+        "5) Produtos": _aba_produtos,
+        "6) Estatística": _aba_estatistica,
+    }
+    secao_lazy(secoes, df, dfx, colmap, cubo)
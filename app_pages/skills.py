@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 from visuals.radar import radar_plotly   # importa do visuals/radar.py
+from core.config import PLOTLY_CONFIG
 
 CSS = """
 section.main > div.block-container h1:first-of-type {
@@ -14,9 +15,10 @@ section.main h2 {
   margin-bottom: 0.6rem;
 }
 """
-st.markdown(f"<style>{CSS}</style>", unsafe_allow_html=True)
 
 def render():
+    # CSS da página emitido a cada render (no import, só apareceria na primeira execução do processo)
+    st.markdown(f"<style>{CSS}</style>", unsafe_allow_html=True)
     st.title("Skills")
 
     with st.sidebar.expander("Aparência (Skills)", expanded=False):
@@ -26,9 +28,6 @@ def render():
         graf_height = st.slider("Altura (px)", 320, 1000, 560, 20)
         mostrar_meta = st.toggle("Mostrar baseline/meta = 80", value=True)
 
-    
-    plotly_cfg = {"displaylogo": False,
-                  "modeBarButtonsToRemove": ["lasso2d","select2d","autoScale2d"]}
 
     skills_dev   = {"HTML5": 80, "CSS": 78, "JavaScript": 76, "Python": 85, "SQL": 80, "Java": 65}
     skills_tools = {"Splunk": 82, "Splunk Cloud": 80, "Grafana": 75, "BigQuery": 70,
@@ -40,16 +39,16 @@ def render():
     st.plotly_chart(radar_plotly("", skills_dev,
                                   rmin=rmin_opt, rmax=rmax_opt,
                                  tema=tema_graf, height=graf_height, width=600),
-                    use_container_width=True, config=plotly_cfg)
+                    use_container_width=True, config=PLOTLY_CONFIG)
 
     st.markdown("## Ferramentas & Plataformas")
     st.plotly_chart(radar_plotly("", skills_tools,
                                   rmin=rmin_opt, rmax=rmax_opt,
                                  tema=tema_graf, height=graf_height, width=600),
-                    use_container_width=True, config=plotly_cfg)
+                    use_container_width=True, config=PLOTLY_CONFIG)
 
     st.markdown("## Soft Skills")
     st.plotly_chart(radar_plotly("", skills_soft,
                                   rmin=rmin_opt, rmax=rmax_opt,
                                  tema=tema_graf, height=graf_height, width=600),
-                    use_container_width=True, config=plotly_cfg)
+                    use_container_width=True, config=PLOTLY_CONFIG)
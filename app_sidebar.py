@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 from core.config import configura_pagina, carrega_css, aparencia_sidebar
-from app_pages import home, formacao, skills, analise
+from core.spans import iniciar_rastro, encerrar_rastro, painel_spans, span, SPANS
+from core.paginas import PAGINAS, carregar_pagina
 
 # ===== Configurações globais =====
 configura_pagina(title="CP1 - Dashboard Profissional", wide=True)
@@ -9,15 +10,15 @@ carrega_css("assets/styles.css")
 
 # ===== Sidebar (roteador) =====
 st.sidebar.markdown("## Navegação")
-pagina = st.sidebar.radio("Ir para:", ["Home", "Formação e Experiência", "Skills", "Análise de Dados"])
+pagina = st.sidebar.radio("Ir para:", list(PAGINAS))
+instrumentar = st.sidebar.toggle("Instrumentação (tempos por trecho)", value=SPANS, key="instrumentar",
+                                 help="Mede carga, conversões, seções e gráficos a cada rerun; grava o rastro em JSONL.")
+iniciar_rastro(instrumentar, pagina=pagina)
 
 
-# ===== Roteamento =====
-if pagina == "Home":
-    home.render()
-elif pagina == "Formação e Experiência":
-    formacao.render()
-elif pagina == "Skills":
-    skills.render()
-else:
-    analise.render()
+# ===== Roteamento (cada página é importada só na primeira visita) =====
+with span(f"import:{pagina}"):
+    modulo = carregar_pagina(pagina)
+modulo.render()
+
+painel_spans(encerrar_rastro())
@@ -0,0 +1,3 @@
+# bench/__init__.py
+# -*- coding: utf-8 -*-
+"""Benchmarks da página de Análise sobre dados sintéticos (ver bench/analise.py)."""
@@ -0,0 +1,260 @@
+# bench/analise.py
+# -*- coding: utf-8 -*-
+"""
+Benchmark da página de Análise sobre dados sintéticos.
+
+    python -m bench.analise                          # 100k, 1M, 10M e 50M linhas
+    python -m bench.analise --linhas 100000 1000000 --saida bench.json
+    python -m bench.analise --comparar antes.json depois.json
+
+Cada tamanho roda num processo próprio (caches e memória isolados). Mede tempo
+de parede e pico de RSS de: geração, leitura (`core.data._ler_df` ou leitura em
+blocos, conforme o modo que a página escolheria), automap, perfil de esquema,
+`ic_media`, `correlacao_pearson` e, via AppTest, cada aba e cada gráfico.
+O backend dos gráficos segue DASH_GRAFICOS (plotly | matplotlib).
+"""
+import os, sys, json, time, shutil, argparse, platform, subprocess, threading, tempfile
+from contextlib import contextmanager
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TAMANHOS = [100_000, 1_000_000, 10_000_000, 50_000_000]
+
+# ----------------------------
+# Medição (tempo de parede + pico de RSS amostrado)
+# ----------------------------
+_PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_mb() -> float:
+    """RSS atual do processo (Linux: /proc/self/statm; senão o pico via getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGINA / 1e6
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+class Medidor:
+    """Acumula etapas {etapa, segundos, rss_pico_mb, rss_delta_mb}; amostra o RSS a cada `intervalo` s."""
+
+    def __init__(self, intervalo=0.01):
+        self.intervalo = intervalo
+        self.etapas = []
+
+    @contextmanager
+    def medir(self, etapa: str, **extra):
+        inicio_rss = rss_mb()
+        pico = [inicio_rss]
+        parar = threading.Event()
+
+        def _amostrar():
+            while not parar.wait(self.intervalo):
+                pico[0] = max(pico[0], rss_mb())
+
+        t = threading.Thread(target=_amostrar, daemon=True)
+        t.start()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seg = time.perf_counter() - t0
+            parar.set(); t.join()
+            pico[0] = max(pico[0], rss_mb())
+            self.etapas.append({"etapa": etapa, "segundos": round(seg, 4),
+                                "rss_pico_mb": round(pico[0], 1),
+                                "rss_delta_mb": round(pico[0] - inicio_rss, 1), **extra})
+
+# ----------------------------
+# Um tamanho (roda no processo filho)
+# ----------------------------
+def _arquivo_dados(dados_dir: str, linhas: int, seed: int, med: Medidor) -> str:
+    from bench.sintetico import escrever_csv
+    caminho = os.path.join(dados_dir, f"sintetico_{linhas}_{seed}.csv")
+    if not os.path.exists(caminho):
+        with med.medir("gerar_dados"):
+            escrever_csv(caminho, linhas, seed)
+    return caminho
+
+
+def _elementos(at) -> int:
+    n, pilha = 0, [at._tree]
+    while pilha:
+        no = pilha.pop()
+        filhos = getattr(no, "children", None)
+        if isinstance(filhos, dict):
+            pilha.extend(filhos.values())
+        n += 1
+    return n
+
+
+def medir_tamanho(linhas: int, dados_dir: str, seed: int = 0, timeout: float = 3600) -> dict:
+    """Todas as etapas para uma base sintética de `linhas` linhas, num diretório de trabalho temporário."""
+    med = Medidor()
+    origem = _arquivo_dados(dados_dir, linhas, seed, med)
+    trabalho = tempfile.mkdtemp(prefix="bench_analise_")
+    os.makedirs(os.path.join(trabalho, "data"))
+    destino = os.path.join(trabalho, "data", "df_selecionado.csv")
+    try:
+        os.symlink(origem, destino)
+    except OSError:
+        shutil.copyfile(origem, destino)
+    shutil.copytree(os.path.join(RAIZ, "assets"), os.path.join(trabalho, "assets"), dirs_exist_ok=True)
+    os.environ.setdefault("DASH_CACHE_DIR", os.path.join(trabalho, ".cache"))
+    # seções medidas por inteiro: sem pré-cálculo em segundo plano (nem avisos de "calculando")
+    os.environ.setdefault("DASH_PRECALC", "0")
+    os.chdir(trabalho)
+    sys.path.insert(0, RAIZ)
+
+    import pandas as pd
+    import streamlit as st
+    from core.colunar import chave_arquivo
+    from core.data import _ler_df, ic_media, correlacao_pearson, COMPACTAR
+    from core.esquema import automap, perfil_esquema, colunas_mapeadas
+    from core.streaming import agregar_em_blocos, STREAM_MIN_MB, tamanho_mb
+
+    caminho = os.path.join("data", "df_selecionado.csv")
+    amostra = pd.read_csv(caminho, nrows=2000)
+    with med.medir("automap"):
+        colmap = automap(amostra)
+    with med.medir("perfil_esquema"):
+        perfil = perfil_esquema(amostra)
+    streaming = tamanho_mb(caminho) >= STREAM_MIN_MB
+    if streaming:
+        with med.medir("leitura_em_blocos"):
+            _, df = agregar_em_blocos(caminho, colmap, perfil=perfil)
+    else:
+        args = (caminho, chave_arquivo(caminho), COMPACTAR, tuple(colunas_mapeadas(colmap)))
+        with med.medir("ler_df_frio"):
+            df = _ler_df(*args)
+        _ler_df.clear()
+        with med.medir("ler_df_cache_colunar"):
+            df = _ler_df(*args)
+    v, q = df[colmap["valor_pedido"]], df[colmap["quantidade"]]
+    with med.medir("ic_media"):
+        ic_media(v)
+    with med.medir("correlacao_pearson"):
+        correlacao_pearson(q, v)
+    del df, v, q
+    st.cache_data.clear()
+
+    # página inteira, sem navegador: cada aba e cada gráfico
+    from streamlit.testing.v1 import AppTest
+    import app_pages.analise as analise
+    originais = {f: getattr(analise, f) for f in ("pyplot_cache", "exibir_grafico")}
+    aba_atual = ["inicio"]
+
+    def _medido(original):
+        def medido(desenho, fingerprint, colmap, nome, **spec):
+            with med.medir(f"grafico:{nome}", aba=aba_atual[0]):
+                return original(desenho, fingerprint, colmap, nome, **spec)
+        return medido
+
+    for f, original in originais.items():
+        setattr(analise, f, _medido(original))
+    at = AppTest.from_file(os.path.join(RAIZ, "app_sidebar.py"), default_timeout=timeout)
+    with med.medir("app_inicio"):
+        at.run()
+    at.sidebar.radio[0].set_value("Análise de Dados")
+    secoes = None
+    aba_atual[0] = "primeira_carga"
+    with med.medir("pagina_primeira_carga"):
+        at.run()
+    excecoes = [str(e.value)[:300] for e in at.exception]
+    radio = [r for r in at.main.radio if r.key == "secao_ativa"]
+    if radio:
+        secoes = radio[0].options
+        for op in secoes:
+            aba_atual[0] = op
+            [r for r in at.main.radio if r.key == "secao_ativa"][0].set_value(op)
+            with med.medir(f"aba:{op}"):
+                at.run()
+            med.etapas[-1]["elementos"] = _elementos(at)
+            excecoes += [str(e.value)[:300] for e in at.exception]
+    for f, original in originais.items():
+        setattr(analise, f, original)
+    shutil.rmtree(trabalho, ignore_errors=True)
+    from core.charts import BACKEND_GRAFICOS
+    return {"linhas": linhas, "arquivo_mb": round(os.path.getsize(origem) / 1e6, 1),
+            "modo": "streaming" if streaming else "memoria", "graficos": BACKEND_GRAFICOS, "secoes": secoes,
+            "excecoes": excecoes, "etapas": med.etapas}
+
+# ----------------------------
+# Orquestração / comparação
+# ----------------------------
+def _ambiente() -> dict:
+    def _versao(mod):
+        try:
+            return __import__(mod).__version__
+        except Exception:
+            return None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                                capture_output=True, text=True, timeout=30).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"commit": commit, "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(), "plataforma": platform.platform(),
+            "cpus": os.cpu_count(), **{m: _versao(m) for m in ("pandas", "numpy", "pyarrow", "streamlit")}}
+
+
+def executar(tamanhos, dados_dir, seed=0, timeout=3600) -> dict:
+    """Roda cada tamanho num processo filho e junta os resultados."""
+    resultados = []
+    for n in tamanhos:
+        cmd = [sys.executable, "-m", "bench.analise", "--um", str(n), "--dados", dados_dir,
+               "--seed", str(seed), "--timeout", str(timeout)]
+        proc = subprocess.run(cmd, cwd=RAIZ, capture_output=True, text=True)
+        linhas = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+        if proc.returncode or not linhas:
+            resultados.append({"linhas": n, "erro": (proc.stderr or proc.stdout)[-2000:]})
+        else:
+            resultados.append(json.loads(linhas[-1]))
+        print(f"{n:>12,} linhas: {'erro' if 'erro' in resultados[-1] else 'ok'}", file=sys.stderr)
+    return {"ambiente": _ambiente(), "resultados": resultados}
+
+
+def comparar(antes: dict, depois: dict):
+    """Tabela etapa a etapa (tempo e pico de RSS) entre duas execuções."""
+    def _indice(res):
+        return {(r["linhas"], e["etapa"] + (f" @{e['aba']}" if "aba" in e else "")): e
+                for r in res["resultados"] for e in r.get("etapas", [])}
+    a, b = _indice(antes), _indice(depois)
+    print(f"{'linhas':>11} {'etapa':<48} {'antes s':>9} {'depois s':>9} {'razão':>6} {'Δ pico MB':>10}")
+    for chave in sorted(set(a) & set(b), key=lambda k: (k[0], k[1])):
+        ea, eb = a[chave], b[chave]
+        razao = eb["segundos"] / ea["segundos"] if ea["segundos"] else float("nan")
+        print(f"{chave[0]:>11,} {chave[1][:48]:<48} {ea['segundos']:>9.3f} {eb['segundos']:>9.3f} "
+              f"{razao:>6.2f} {eb['rss_pico_mb'] - ea['rss_pico_mb']:>10.1f}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--linhas", type=int, nargs="+", default=TAMANHOS)
+    ap.add_argument("--dados", default=os.path.join(tempfile.gettempdir(), "bench_analise_dados"),
+                    help="onde guardar (e reaproveitar) os CSVs sintéticos")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--timeout", type=float, default=3600, help="tempo máximo por execução do AppTest (s)")
+    ap.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    ap.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"))
+    ap.add_argument("--um", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.comparar:
+        with open(args.comparar[0]) as fa, open(args.comparar[1]) as fb:
+            comparar(json.load(fa), json.load(fb))
+        return
+    if args.um is not None:
+        print(json.dumps(medir_tamanho(args.um, args.dados, args.seed, args.timeout), ensure_ascii=False))
+        return
+    res = executar(args.linhas, args.dados, args.seed, args.timeout)
+    texto = json.dumps(res, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
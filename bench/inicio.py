@@ -0,0 +1,94 @@
+# bench/inicio.py
+# -*- coding: utf-8 -*-
+"""
+Tempo de partida a frio do app (modo de medição de startup).
+
+    python -m bench.inicio                      # todas as páginas
+    python -m bench.inicio --paginas Home --repeticoes 5 --saida inicio.json
+
+Para cada página, em processos novos: importa o Streamlit, roda `app_sidebar.py`
+via AppTest (primeira execução = Home), navega até a página e roda de novo.
+Registra tempo e pico de RSS de cada passo e quais bibliotecas pesadas
+(pandas, matplotlib, seaborn, scipy, plotly...) foram importadas por ele.
+"""
+import os, sys, json, argparse, statistics, subprocess
+
+from bench.analise import Medidor, RAIZ, _ambiente
+
+PESADOS = ["numpy", "pandas", "pyarrow", "matplotlib", "seaborn", "scipy", "plotly.graph_objects"]
+
+
+def _carregados() -> list:
+    return [m for m in PESADOS if m in sys.modules]
+
+
+def medir_pagina(pagina: str, timeout: float = 600) -> dict:
+    """Um processo: partida a frio + primeira visita a `pagina`."""
+    med = Medidor()
+    os.chdir(RAIZ)
+    sys.path.insert(0, RAIZ)
+    with med.medir("import_streamlit"):
+        from streamlit.testing.v1 import AppTest
+    antes = set(_carregados())
+    at = AppTest.from_file(os.path.join(RAIZ, "app_sidebar.py"), default_timeout=timeout)
+    with med.medir("primeira_execucao"):
+        at.run()
+    med.etapas[-1]["importou"] = sorted(set(_carregados()) - antes)
+    if pagina != "Home":
+        antes = set(_carregados())
+        at.sidebar.radio[0].set_value(pagina)
+        with med.medir("primeira_visita"):
+            at.run()
+        med.etapas[-1]["importou"] = sorted(set(_carregados()) - antes)
+        with med.medir("segunda_visita"):
+            at.run()
+    return {"pagina": pagina, "excecoes": [str(e.value)[:300] for e in at.exception], "etapas": med.etapas}
+
+
+def executar(paginas, repeticoes=3, timeout=600) -> dict:
+    """Mediana de `repeticoes` processos por página (cada um parte do zero)."""
+    resultados = []
+    for pagina in paginas:
+        rodadas = []
+        for _ in range(repeticoes):
+            proc = subprocess.run([sys.executable, "-m", "bench.inicio", "--um", pagina, "--timeout", str(timeout)],
+                                  cwd=RAIZ, capture_output=True, text=True)
+            linhas = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+            if proc.returncode or not linhas:
+                rodadas = None
+                resultados.append({"pagina": pagina, "erro": (proc.stderr or proc.stdout)[-2000:]})
+                break
+            rodadas.append(json.loads(linhas[-1]))
+        if rodadas:
+            etapas = []
+            for i, e in enumerate(rodadas[0]["etapas"]):
+                seg = [r["etapas"][i]["segundos"] for r in rodadas]
+                etapas.append({**e, "segundos": round(statistics.median(seg), 4), "rodadas": seg})
+            resultados.append({"pagina": pagina, "excecoes": rodadas[0]["excecoes"], "etapas": etapas})
+        print(f"{pagina}: {'erro' if 'erro' in resultados[-1] else 'ok'}", file=sys.stderr)
+    return {"ambiente": _ambiente(), "resultados": resultados}
+
+
+def main(argv=None):
+    from core.paginas import PAGINAS
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--paginas", nargs="+", default=list(PAGINAS), choices=list(PAGINAS))
+    ap.add_argument("--repeticoes", type=int, default=3)
+    ap.add_argument("--timeout", type=float, default=600)
+    ap.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    ap.add_argument("--um", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.um is not None:
+        print(json.dumps(medir_pagina(args.um, args.timeout), ensure_ascii=False))
+        return
+    texto = json.dumps(executar(args.paginas, args.repeticoes, args.timeout), ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# bench/sintetico.py
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+import pandas as pd
+
+# ----------------------------
+# Gerador de vendas sintéticas no formato do "Amazon Sale Report"
+# ----------------------------
+# Colunas com os nomes que o automap (core.esquema.ROLE_SYNONYMS) reconhece;
+# valores e proporções aproximados do relatório original.
+STATUS = ["Shipped", "Shipped - Delivered to Buyer", "Cancelled", "Pending",
+          "Shipped - Returned to Seller", "Shipping", "Shipped - Out for Delivery"]
+P_STATUS = [0.60, 0.22, 0.14, 0.01, 0.015, 0.01, 0.005]
+CATEGORIAS = ["Set", "kurta", "Western Dress", "Top", "Ethnic Dress", "Blouse", "Bottom", "Saree", "Dupatta"]
+P_CATEGORIAS = [0.39, 0.39, 0.12, 0.08, 0.009, 0.007, 0.003, 0.0007, 0.0003]
+TAMANHOS = ["M", "L", "XL", "XXL", "S", "3XL", "XS", "6XL", "5XL", "4XL", "Free"]
+COURIER = ["Shipped", "Unshipped", "Cancelled"]
+ESTADOS = ["MAHARASHTRA", "KARNATAKA", "TELANGANA", "UTTAR PRADESH", "TAMIL NADU",
+           "DELHI", "KERALA", "WEST BENGAL", "ANDHRA PRADESH", "GUJARAT", "HARYANA", "RAJASTHAN"]
+CIDADES = ["BENGALURU", "HYDERABAD", "MUMBAI", "NEW DELHI", "CHENNAI", "PUNE", "KOLKATA",
+           "GURUGRAM", "THANE", "LUCKNOW", "NOIDA", "JAIPUR", "AHMEDABAD", "KOCHI"]
+PROMOS = ["Amazon PLCC Free-Financing Universal Merchant AAT-WNKTBO3K27EJC,Amazon PLCC Free-Financing Universal Merchant AAT-QX3UCCJESKPA2",
+          "IN Core Free Shipping 2015/04/08 23-48-5-108", "VPC-44571-4-5-5 Coupon"]
+INICIO = pd.Timestamp("2022-03-31")
+DIAS = 91
+N_ESTILOS = 1400
+BLOCO = 1_000_000
+# Formatos de data por coluna (o primeiro é o do relatório original) e a fração de
+# linhas escrita nos demais: a base mistura formatos, como exportações reais
+# concatenadas, e o perfil de esquema tem de detectar/cair no parser misto.
+FORMATOS_DATA = {"Date": ["%m-%d-%y", "%Y-%m-%d", "%d %b %Y"],
+                 "Deliv Date": ["%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d"]}
+MISTURA_DATAS = float(os.environ.get("DASH_BENCH_MISTURA_DATAS", "0.05"))
+
+
+def _datas_texto(r, dias, formatos, mistura):
+    """Texto de cada data (índice de dia a partir de INICIO): formato principal ou, em `mistura` das linhas, outro."""
+    datas = INICIO + pd.to_timedelta(np.arange(DIAS + 12), unit="D")
+    # datas pré-formatadas, indexadas por (formato, dia): strftime linha a linha é lento
+    tabela = np.stack([np.asarray(datas.strftime(f), dtype=object) for f in formatos])
+    fmt = np.where(r.random(len(dias)) < mistura, r.integers(1, len(formatos), len(dias)), 0)
+    return tabela[fmt, dias]
+
+
+def gerar_bloco(n: int, inicio: int = 0, seed: int = 0, mistura: float = MISTURA_DATAS) -> pd.DataFrame:
+    """
+    `n` linhas sintéticas (vetorizado); `inicio` numera os pedidos e varia a
+    semente do bloco; `mistura` = fração das datas em formatos alternativos.
+    """
+    r = np.random.default_rng([seed, inicio])
+    dia = r.integers(0, DIAS, n)
+    qty = r.choice([0, 1, 2, 3, 4], n, p=[0.1, 0.85, 0.04, 0.007, 0.003])
+    preco = np.round(r.lognormal(6.4, 0.4, n), 2)
+    amount = np.round(preco * np.maximum(qty, 1), 2)
+    amount[r.random(n) < 0.06] = np.nan
+    status = np.asarray(STATUS)[r.choice(len(STATUS), n, p=P_STATUS)]
+    estilos = np.char.add("JNE", (3000 + np.arange(N_ESTILOS)).astype(str))
+    return pd.DataFrame({
+        "index": np.arange(inicio, inicio + n),
+        "Order ID": "405-" + pd.Series(8_000_000 + np.arange(inicio, inicio + n)).astype(str),
+        "Date": _datas_texto(r, dia, FORMATOS_DATA["Date"], mistura),
+        "Status": status,
+        "Fulfilment": np.where(r.random(n) < 0.7, "Amazon", "Merchant"),
+        "Sales Channel ": "Amazon.in",
+        "ship-service-level": np.where(r.random(n) < 0.68, "Expedited", "Standard"),
+        "Style": estilos[r.integers(0, N_ESTILOS, n)],
+        "Category": np.asarray(CATEGORIAS)[r.choice(len(CATEGORIAS), n, p=P_CATEGORIAS)],
+        "Size": np.asarray(TAMANHOS)[r.integers(0, len(TAMANHOS), n)],
+        "Courier Status": np.where(status == "Cancelled", "Cancelled",
+                                   np.asarray(COURIER)[r.choice(2, n, p=[0.95, 0.05])]),
+        "Qty": qty,
+        "currency": "INR",
+        "Amount": amount,
+        "Unit Price": preco,
+        "ship-city": np.asarray(CIDADES)[r.integers(0, len(CIDADES), n)],
+        "ship-state": np.asarray(ESTADOS)[r.integers(0, len(ESTADOS), n)],
+        "ship-country": "IN",
+        "promotion-ids": np.where(r.random(n) < 0.62, np.asarray(PROMOS)[r.integers(0, len(PROMOS), n)], None),
+        "B2B": r.random(n) < 0.007,
+        "Deliv Date": _datas_texto(r, dia + r.integers(1, 12, n), FORMATOS_DATA["Deliv Date"], mistura),
+    })
+
+
+def escrever_csv(caminho: str, linhas: int, seed: int = 0, bloco: int = BLOCO) -> str:
+    """Grava `linhas` linhas em `caminho`, bloco a bloco (memória limitada a ~1 bloco)."""
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    for ini in range(0, max(linhas, 1), bloco):
+        n = min(bloco, linhas - ini)
+        gerar_bloco(max(n, 0), ini, seed).to_csv(tmp, index=False, mode="w" if ini == 0 else "a", header=ini == 0)
+    os.replace(tmp, caminho)
+    return caminho
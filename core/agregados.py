@@ -0,0 +1,303 @@
+# core/agregados.py
+# -*- coding: utf-8 -*-
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from core.momentos import comomentos, mesclar_comomentos
+from core.resultados import cache_disco
+from core.sketches import podar, preencher, hll_registros, hll_estimativa, TOPK_CAPACIDADE
+from core.spans import instrumentado
+
+# ----------------------------
+# Cubo de agregados (uma passada agrupada por dimensão)
+# ----------------------------
+# Papéis do automap usados como dimensões de agrupamento e como medidas.
+DIMENSOES = ["categoria", "produto", "regiao", "tipo_cliente", "tamanho",
+             "tipo_envio", "courier_status", "_has_promo", "dia"]
+MEDIDAS = ["valor_pedido", "quantidade", "valor_unitario"]
+FLAGS = ["_cancel", "_entregue"]
+# Histogramas por grupo (para quantis aproximados) só nas dimensões de baixa cardinalidade.
+DIM_HIST = ["categoria", "tipo_cliente", "tipo_envio"]
+# Dimensões de cardinalidade alta: tabela resumida (top-K) ao mesclar cubos grandes e contagem de distintos (HLL).
+DIM_TOPK = ["produto", "regiao"]
+# Rollup diário por grupo (pedidos e vendas), para as séries temporais quebradas por dimensão.
+DIM_DIARIO = ["categoria", "tipo_cliente", "tipo_envio"]
+# Granularidades derivadas do rollup diário (códigos de pd.Period).
+GRANULARIDADES = {"Dia": "D", "Semana": "W", "Mês": "M", "Trimestre": "Q"}
+# Bordas fixas (log) de valor_pedido: iguais em todos os blocos, logo mescláveis.
+BORDAS_VALOR = np.concatenate(([-np.inf, 0.0], np.geomspace(1.0, 1e7, 113), [np.inf]))
+# Dimensões agregadas em paralelo (threads) a partir deste número de linhas.
+CUBO_THREADS = int(os.environ.get("DASH_CUBO_THREADS", str(min(16, os.cpu_count() or 1))))
+CUBO_PARALELO_MIN = int(os.environ.get("DASH_CUBO_PARALELO_MIN", "200000"))
+
+
+def _tem(colmap, key, df):
+    return colmap.get(key) is not None and colmap[key] in df.columns
+
+
+def _base_cubo(dfx: pd.DataFrame, colmap: dict) -> pd.DataFrame:
+    """Frame enxuto só com as medidas, flags e chaves necessárias ao cubo (espera `derivar_colunas` já aplicado)."""
+    base = {}
+    for m in MEDIDAS:
+        if _tem(colmap, m, dfx):
+            base[m] = pd.to_numeric(dfx[colmap[m]], errors="coerce").to_numpy(dtype="float64")
+    # colunas derivadas (core.derivados) entram direto como flags/dimensões
+    for c in FLAGS + ["_has_promo"]:
+        if c in dfx.columns:
+            base[c] = dfx[c]
+    for d in DIMENSOES:
+        if _tem(colmap, d, dfx):
+            base[d] = _ordem_de_aparicao(dfx[colmap[d]])
+    if _tem(colmap, "data_pedido", dfx):
+        datas = pd.to_datetime(dfx[colmap["data_pedido"]], errors="coerce")
+        base["dia"] = datas.dt.normalize().to_numpy()
+    return pd.DataFrame(base, index=dfx.index)
+
+
+def _ordem_de_aparicao(serie: pd.Series) -> pd.Series:
+    """
+    Coluna `category` (base compactada) com as categorias na ordem de primeira
+    aparição e sem as não usadas, para o groupby sair na mesma ordem do texto puro.
+    """
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie
+    cod = serie.cat.codes.to_numpy()
+    ordem = pd.unique(cod[cod >= 0])
+    remap = np.full(len(serie.cat.categories), -1, dtype=cod.dtype)
+    remap[ordem] = np.arange(len(ordem))
+    novos = np.where(cod >= 0, remap[cod], -1)
+    return pd.Series(pd.Categorical.from_codes(novos, serie.cat.categories[ordem]), index=serie.index)
+
+
+def _sem_categoria(idx: pd.Index) -> pd.Index:
+    """Índice de grupos com os valores originais (CategoricalIndex -> tipo das categorias)."""
+    if isinstance(idx, pd.MultiIndex):
+        return idx.set_levels([_sem_categoria(lv) for lv in idx.levels])
+    if isinstance(idx, pd.CategoricalIndex):
+        return idx.astype(idx.categories.dtype)
+    return idx
+
+
+def _agrega_dimensao(base: pd.DataFrame, dim: str) -> pd.DataFrame:
+    """
+    Uma única passada `groupby` por dimensão: pedidos, somas e contagens, mais
+    M2 = Σ(x - média)² das medidas (variância por Welford no pandas).
+    """
+    valores = [c for c in MEDIDAS + FLAGS if c in base.columns]
+    medidas = [c for c in MEDIDAS if c in base.columns]
+    g = base.groupby(dim, sort=False, observed=True)
+    out = pd.DataFrame({"pedidos": g.size()})
+    if valores:
+        tab = g[valores].agg({c: ["sum", "count", "var"] if c in medidas else ["sum", "count"] for c in valores})
+        for c in valores:
+            out[f"{c}_soma"] = tab[(c, "sum")]
+            out[f"{c}_n"] = tab[(c, "count")]
+        for c in medidas:
+            out[f"{c}_m2"] = (tab[(c, "var")] * (tab[(c, "count")] - 1)).fillna(0.0)
+    out.index = _sem_categoria(out.index).rename(dim)
+    return _com_medias(out)
+
+
+def _com_medias(tab: pd.DataFrame) -> pd.DataFrame:
+    """(Re)calcula as colunas `_media` a partir das somas e contagens aditivas."""
+    for c in MEDIDAS + FLAGS:
+        if f"{c}_soma" in tab.columns:
+            tab[f"{c}_media"] = tab[f"{c}_soma"] / tab[f"{c}_n"].replace(0, np.nan)
+    return tab
+
+
+def _hist_grupos(base: pd.DataFrame, dim: str) -> pd.Series:
+    """Histograma de `valor_pedido` por grupo (formato longo: (grupo, bin) -> contagem)."""
+    v = base["valor_pedido"].to_numpy()
+    ok = ~np.isnan(v)
+    bins = np.searchsorted(BORDAS_VALOR, v[ok], side="right") - 1
+    chaves = pd.DataFrame({dim: base[dim][ok].reset_index(drop=True), "bin": bins})
+    h = chaves.groupby([dim, "bin"], sort=False, observed=True).size()
+    h.index = _sem_categoria(h.index)
+    return h
+
+
+def _diario_grupos(base: pd.DataFrame, dim: str) -> pd.DataFrame:
+    """Pedidos e soma de `valor_pedido` por (dia, grupo de `dim`)."""
+    g = base.groupby(["dia", dim], sort=False, observed=True)
+    out = pd.DataFrame({"pedidos": g.size()})
+    if "valor_pedido" in base.columns:
+        out["valor_pedido_soma"] = g["valor_pedido"].sum()
+    out.index = _sem_categoria(out.index)
+    return out
+
+
+@instrumentado()
+def construir_cubo(dfx: pd.DataFrame, colmap: dict) -> dict:
+    """
+    Cubo (sem cache) de uma base ou de um bloco dela. Todas as entradas são
+    aditivas, então cubos de blocos diferentes podem ser somados com `mesclar_cubos`.
+    """
+    base = _base_cubo(dfx, colmap).assign(_total=True)
+    dims = [d for d in DIMENSOES + ["_total"] if d in base.columns]
+    hists = [d for d in DIM_HIST if d in base.columns] if "valor_pedido" in base.columns else []
+    diarios = [d for d in DIM_DIARIO if d in base.columns] if "dia" in base.columns else []
+    # cada groupby é independente: em bases grandes, uma thread por dimensão (mesma ordem de saída)
+    tarefas = ([(_agrega_dimensao, d) for d in dims] + [(_hist_grupos, d) for d in hists]
+               + [(_diario_grupos, d) for d in diarios])
+    n = min(CUBO_THREADS, len(tarefas)) if len(base) >= CUBO_PARALELO_MIN else 1
+    if n > 1:
+        with ThreadPoolExecutor(max_workers=n) as ex:
+            res = list(ex.map(lambda t: t[0](base, t[1]), tarefas))
+    else:
+        res = [f(base, d) for f, d in tarefas]
+    # tabelas exatas aqui: o resumo top-K só entra ao mesclar blocos/partições (mesclar_cubos)
+    cubo = dict(zip(dims, res[:len(dims)]))
+    if any(d in base.columns for d in DIM_TOPK):
+        cubo["_distintos"] = {d: hll_registros(base[d]) for d in DIM_TOPK if d in base.columns}
+    if "valor_pedido" in base.columns:
+        cubo["_hist_valor"] = dict(zip(hists, res[len(dims):len(dims) + len(hists)]))
+    if diarios:
+        cubo["_diario"] = dict(zip(diarios, res[len(dims) + len(hists):]))
+    if "_dias_entrega" in dfx.columns:
+        cubo["_dias_entrega"] = dfx["_dias_entrega"].value_counts(sort=False)
+    if "quantidade" in base.columns and "valor_pedido" in base.columns:
+        cubo["_dispersao"] = comomentos(base["quantidade"], base["valor_pedido"])
+    return cubo
+
+
+def _soma_series(a: pd.Series, b: pd.Series) -> pd.Series:
+    return pd.concat([a, b]).groupby(level=list(range(a.index.nlevels)), sort=False).sum()
+
+
+@instrumentado()
+def mesclar_cubos(a: dict, b: dict) -> dict:
+    """Soma dois cubos parciais (ex.: de blocos de um CSV lido em streaming)."""
+    if a is None:
+        return b
+    out, topk = {}, {}
+    pa, pb = a.get("_topk", {}), b.get("_topk", {})
+    for k in set(a) | set(b):
+        if k == "_topk":
+            continue
+        if k not in a or k not in b:
+            out[k] = a.get(k, b.get(k))
+        elif k in ("_hist_valor", "_diario"):
+            out[k] = {d: _soma_series(a[k][d], b[k][d]) if d in a[k] and d in b[k] else a[k].get(d, b[k].get(d))
+                      for d in set(a[k]) | set(b[k])}
+        elif k == "_dispersao":
+            out[k] = mesclar_comomentos(a[k], b[k])
+        elif k == "_dias_entrega":
+            out[k] = _soma_series(a[k], b[k])
+        elif k == "_distintos":
+            out[k] = {d: np.maximum(a[k][d], b[k][d]) if d in a[k] and d in b[k] else a[k].get(d, b[k].get(d))
+                      for d in set(a[k]) | set(b[k])}
+        elif k in DIM_TOPK:
+            out[k], pisos = _mesclar_topk(a[k], pa.get(k, {}), b[k], pb.get(k, {}))
+            if pisos:
+                topk[k] = pisos
+        else:
+            out[k] = _mesclar_tabela(a[k], b[k])
+    # dimensão presente num lado só mantém o resumo (e o piso) que tinha
+    topk.update({k: p for k, p in {**pb, **pa}.items() if k not in a or k not in b})
+    if topk:
+        out["_topk"] = topk
+    return out
+
+
+def _mesclar_topk(ta, pa, tb, pb) -> tuple:
+    """Mescla duas tabelas de dimensão de cardinalidade alta (exatas ou resumos top-K) e poda de novo."""
+    if not pa and not pb:
+        return podar(_mesclar_tabela(ta, tb), {})
+    idx = ta.index.append(tb.index).unique().rename(ta.index.name)
+    tab = _mesclar_tabela(preencher(ta, pa, idx), preencher(tb, pb, idx))
+    return podar(tab, {c: pa.get(c, 0.0) + pb.get(c, 0.0) for c in set(pa) | set(pb)})
+
+
+def _mesclar_tabela(ta: pd.DataFrame, tb: pd.DataFrame) -> pd.DataFrame:
+    """Soma as colunas aditivas de uma dimensão e combina os M2 (fórmula de Chan)."""
+    aditivas = [c for c in ta.columns if not c.endswith(("_media", "_m2"))]
+    tab = pd.concat([ta[aditivas], tb[aditivas]]).groupby(level=0, sort=False).sum()
+    A, B = ta.reindex(tab.index), tb.reindex(tab.index)
+    for c in MEDIDAS:
+        if f"{c}_m2" not in ta.columns:
+            continue
+        na, nb = A[f"{c}_n"].fillna(0), B[f"{c}_n"].fillna(0)
+        delta = (B[f"{c}_soma"] / nb.replace(0, np.nan) - A[f"{c}_soma"] / na.replace(0, np.nan)).fillna(0.0)
+        tab[f"{c}_m2"] = (A[f"{c}_m2"].fillna(0) + B[f"{c}_m2"].fillna(0)
+                          + delta ** 2 * na * nb / (na + nb).replace(0, np.nan)).fillna(0.0)
+    tab.index.name = ta.index.name
+    return _com_medias(tab)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+@cache_disco
+def cubo_agregado(_dfx: pd.DataFrame, fingerprint: str, colmap: dict) -> dict:
+    """
+    Calcula, em uma passada por dimensão, somas/contagens/médias de todas as
+    medidas e as taxas de cancelamento/entrega. O cache é indexado pela
+    impressão digital da base e pelo mapeamento de colunas.
+    Retorna {dimensão: DataFrame indexado pelos valores da dimensão}.
+    """
+    return construir_cubo(_dfx, colmap)
+
+
+def top_n(cubo: dict, dim: str, coluna: str, n=None, ascending=False) -> pd.Series:
+    """Série `coluna` da dimensão `dim`, ordenada (e opcionalmente cortada em n)."""
+    s = cubo[dim][coluna].dropna().sort_values(ascending=ascending, kind="stable")
+    return s.head(n) if n else s
+
+
+def serie_temporal(cubo: dict, granularidade: str = "M", coluna: str = "pedidos",
+                   inicio=None, fim=None, dim: str = None, max_grupos: int = 8):
+    """
+    `coluna` por período (código de GRANULARIDADES) entre `inicio` e `fim`,
+    somando o rollup diário do cubo: trocar granularidade ou período não relê
+    linhas. Colunas `_media` são recalculadas das somas do período. Com `dim`
+    (só pedidos/valor_pedido_soma), um DataFrame com uma coluna por grupo
+    (os `max_grupos` maiores; o resto em "Outros").
+    """
+    tab = cubo["dia"] if dim is None else cubo["_diario"][dim]
+    dias = tab.index.get_level_values(0)
+    ok = np.ones(len(tab), dtype=bool)
+    if inicio is not None:
+        ok &= dias >= pd.Timestamp(inicio)
+    if fim is not None:
+        ok &= dias <= pd.Timestamp(fim)
+    tab, dias = tab[ok], dias[ok]
+    periodo = pd.DatetimeIndex(dias).to_period(granularidade).start_time.rename(None)
+    if dim is None:
+        aditivas = [c for c in tab.columns if not c.endswith(("_media", "_m2"))]
+        out = _com_medias(tab[aditivas].groupby(periodo).sum())
+        return out[coluna] if coluna in out.columns else pd.Series(dtype="float64")
+    grupos = tab.index.get_level_values(1)
+    out = tab[coluna].groupby([periodo, grupos]).sum().unstack(fill_value=0)
+    ordem = out.sum().sort_values(ascending=False, kind="stable").index
+    # reindex (e não out[...]): grupos booleanos seriam lidos como máscara
+    topo = out.reindex(columns=ordem[:max_grupos])
+    if len(ordem) > max_grupos:
+        topo = topo.assign(Outros=out.reindex(columns=ordem[max_grupos:]).sum(axis=1))
+    out = topo
+    out.columns = out.columns.astype(str)
+    return out
+
+
+def distintos(cubo: dict, dim: str) -> tuple:
+    """(nº de valores distintos de `dim`, exato?): tamanho da tabela ou estimativa HyperLogLog."""
+    if dim in cubo and dim not in cubo.get("_topk", {}):
+        return len(cubo[dim]), True
+    reg = cubo.get("_distintos", {}).get(dim)
+    return (None, False) if reg is None else (int(round(hll_estimativa(reg))), False)
+
+
+def nota_topk(cubo: dict, dim: str, coluna: str, itens) -> str:
+    """Legenda com os limites de erro quando `dim` está resumida (top-K); None se a tabela é exata."""
+    pisos = cubo.get("_topk", {}).get(dim)
+    if pisos is None:
+        return None
+    n, _ = distintos(cubo, dim)
+    total = f"≈{n:,} valores distintos (HyperLogLog)" if n is not None else "muitos valores distintos"
+    if coluna in pisos:
+        erro = float(cubo[dim].loc[list(itens), f"{coluna}_erro"].max()) if len(itens) else 0.0
+        return (f"{total}: ranking estimado (Space-Saving, {TOPK_CAPACIDADE:,} contadores). "
+                f"Cada barra pode estar superestimada em até {erro:,.0f}; nenhum item fora do resumo passa de "
+                f"{pisos[coluna]:,.0f}.")
+    return f"{total}: calculado sobre os {len(cubo[dim]):,} valores mais frequentes mantidos no resumo."
@@ -0,0 +1,79 @@
+# core/bootstrap.py
+# -*- coding: utf-8 -*-
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# ----------------------------
+# IC por bootstrap (média e mediana) por grupo, vetorizado e em paralelo
+# ----------------------------
+BOOT_LOTE_MB = float(os.environ.get("DASH_BOOT_LOTE_MB", "64"))
+BOOT_MAX_N = int(os.environ.get("DASH_BOOT_MAX_N", "200000"))
+_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+BOOT_PROCESSOS = int(os.environ.get("DASH_BOOT_PROCESSOS", str(_CPUS)))
+# abaixo disso (reamostras × linhas) o custo de subir processos não compensa
+_TRABALHO_MIN_PARALELO = 5e7
+
+
+def _bootstrap_grupo(args):
+    """
+    Reamostra um grupo em lotes de matrizes de índices (lote × m), respeitando
+    `lote_mb` por lote. Grupos com mais de `max_n` linhas usam m-de-n
+    (subamostra de tamanho m) e reescalam o intervalo por √(m/n).
+    """
+    v, n_reamostras, conf, semente, lote_mb, max_n = args
+    rng = np.random.default_rng(semente)
+    n = len(v)
+    m = min(n, max_n)
+    base = v if m == n else rng.choice(v, size=m, replace=False)
+    # índices int64 + valores float64 reamostrados: 16 bytes por célula
+    lote = max(1, int(lote_mb * 1024 * 1024 // (16 * m)))
+    medias = np.empty(n_reamostras); medianas = np.empty(n_reamostras)
+    for ini in range(0, n_reamostras, lote):
+        b = min(lote, n_reamostras - ini)
+        amostras = base[rng.integers(0, m, size=(b, m))]
+        medias[ini:ini + b] = amostras.mean(axis=1)
+        medianas[ini:ini + b] = np.median(amostras, axis=1)
+
+    alfa = 1 - conf
+    escala = np.sqrt(m / n)
+    out = {"n": n, "media": float(v.mean()), "mediana": float(np.median(v))}
+    # m-de-n: o pivô é a estatística da subamostra (as reamostras giram em torno
+    # dela), e o desvio reescalado é somado à estatística da base inteira
+    pivos = {"media": float(base.mean()), "mediana": float(np.median(base))}
+    for nome, dist in (("media", medias), ("mediana", medianas)):
+        li, ls = np.quantile(dist, [alfa / 2, 1 - alfa / 2])
+        centro, pivo = out[nome], pivos[nome]
+        out[f"{nome}_li"] = float(centro + (li - pivo) * escala) if m < n else float(li)
+        out[f"{nome}_ls"] = float(centro + (ls - pivo) * escala) if m < n else float(ls)
+    return out
+
+
+def bootstrap_grupos(valores, grupos, n_reamostras=10_000, conf=0.95, seed=0,
+                     processos=None, min_n=2) -> pd.DataFrame:
+    """
+    IC percentil bootstrap da média e da mediana de `valores` em cada grupo.
+    Determinístico para um `seed` (cada grupo recebe sua própria semente
+    derivada via SeedSequence, independente de qual processo o executa).
+    Retorna DataFrame indexado pelo grupo: n, media, media_li, media_ls,
+    mediana, mediana_li, mediana_ls.
+    """
+    v = pd.to_numeric(pd.Series(valores), errors="coerce").to_numpy(dtype="float64")
+    cod, rotulos = pd.factorize(pd.Series(grupos))
+    ok = (cod >= 0) & ~np.isnan(v)
+    v, cod = v[ok], cod[ok]
+    ordem = np.argsort(cod, kind="stable")
+    partes = np.split(v[ordem], np.cumsum(np.bincount(cod, minlength=len(rotulos)))[:-1])
+    sel = [i for i, p in enumerate(partes) if len(p) >= min_n]
+    sementes = np.random.SeedSequence(seed).spawn(len(rotulos))
+    tarefas = [(partes[i], n_reamostras, conf, sementes[i], BOOT_LOTE_MB, BOOT_MAX_N) for i in sel]
+
+    processos = BOOT_PROCESSOS if processos is None else processos
+    trabalho = n_reamostras * sum(min(len(partes[i]), BOOT_MAX_N) for i in sel)
+    if processos > 1 and len(tarefas) > 1 and trabalho >= _TRABALHO_MIN_PARALELO:
+        with ProcessPoolExecutor(max_workers=min(processos, len(tarefas))) as ex:
+            res = list(ex.map(_bootstrap_grupo, tarefas))
+    else:
+        res = [_bootstrap_grupo(t) for t in tarefas]
+    return pd.DataFrame(res, index=pd.Index([rotulos[i] for i in sel], name="grupo"))
@@ -1,8 +1,13 @@
 # core/charts.py
 # -*- coding: utf-8 -*-
+import os
 import plotly.graph_objects as go
+import streamlit as st
 import textwrap
 
+from core.config import PLOTLY_CONFIG
+from core.spans import span
+
 def radar_plotly(
     titulo, dicionario, baseline_val=None,
     rmin=0, rmax=100, height=520, width=600, tema="dark"
@@ -56,3 +61,141 @@ def radar_plotly(
         )
     )
     return fig
+
+# ----------------------------
+# Gráficos a partir de dados já agregados (matplotlib no servidor ou Plotly no navegador)
+# ----------------------------
+# Cada função abaixo só monta uma especificação (dict) com o quadro pequeno
+# já agregado (top-N, contagens, resumos de boxplot) e os rótulos. O backend
+# decide como desenhar: "plotly" envia esses poucos números e o navegador
+# desenha; "matplotlib" rasteriza no servidor (PNG em cache, core.figuras).
+BACKENDS = {"plotly": "Navegador (Plotly)", "matplotlib": "Servidor (matplotlib)"}
+BACKEND_GRAFICOS = os.environ.get("DASH_GRAFICOS", "plotly")
+if BACKEND_GRAFICOS not in BACKENDS:
+    BACKEND_GRAFICOS = "plotly"
+
+
+def _spec(tipo, dados, titulo, rotulo_x, rotulo_y, figsize, **extra):
+    return {"tipo": tipo, "dados": dados, "titulo": titulo, "rotulo_x": rotulo_x,
+            "rotulo_y": rotulo_y, "figsize": figsize, **extra}
+
+
+def barras(dados, titulo="", rotulo_x=None, rotulo_y=None, horizontal=True, figsize=None):
+    """Série (uma barra por índice) ou DataFrame (barras agrupadas, uma série por coluna, verticais)."""
+    return _spec("barras", dados, titulo, rotulo_x, rotulo_y, figsize, horizontal=horizontal)
+
+
+def pizza(valores, titulo="", figsize=None):
+    """Série: índice = fatias, valores = tamanhos."""
+    return _spec("pizza", valores, titulo, None, None, figsize)
+
+
+def linha(valores, titulo="", rotulo_x=None, rotulo_y=None, figsize=None):
+    """Série (índice = eixo x ordenado, valores = eixo y) ou DataFrame (uma linha por coluna)."""
+    return _spec("linha", valores, titulo, rotulo_x, rotulo_y, figsize)
+
+
+def histograma(contagens, titulo="", rotulo_x=None, rotulo_y=None, kde=True, figsize=None):
+    """Série de contagens por valor (já agregada): índice = valor, valores = frequência."""
+    return _spec("histograma", contagens, titulo, rotulo_x, rotulo_y, figsize, kde=kde)
+
+
+def box_resumo(resumos, titulo="", rotulo_x=None, rotulo_y=None, figsize=None):
+    """Lista de resumos no formato de `Axes.bxp` (q1, med, q3, whislo, whishi, fliers, label)."""
+    return _spec("box", resumos, titulo, rotulo_x, rotulo_y, figsize)
+
+# --- matplotlib ---
+def figura_matplotlib(g: dict):
+    """Figure do matplotlib para a especificação `g`."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    fig, ax = plt.subplots(figsize=g["figsize"])
+    d, tipo = g["dados"], g["tipo"]
+    if tipo == "barras":
+        if hasattr(d, "columns"):
+            d.plot(kind="bar", ax=ax)
+        elif g["horizontal"]:
+            sns.barplot(x=d.values, y=d.index, ax=ax)
+        else:
+            sns.barplot(x=d.index, y=d.values, ax=ax)
+    elif tipo == "pizza":
+        ax.pie(d.values, labels=d.index, autopct="%1.1f%%", startangle=90)
+        ax.axis("equal")
+    elif tipo == "linha":
+        if hasattr(d, "columns"):
+            for c in d.columns:
+                ax.plot(d.index, d[c].to_numpy(), marker="o", label=str(c))
+            ax.legend()
+        else:
+            ax.plot(d.index, d.values, marker="o")
+    elif tipo == "histograma":
+        # contagens já agregadas (weights): bins "auto" não valem, um bin por valor inteiro
+        sns.histplot(x=d.index, weights=d.values, discrete=True, kde=g["kde"], ax=ax)
+    elif tipo == "box":
+        ax.bxp(d, patch_artist=True)
+    ax.set_title(g["titulo"])
+    # rótulo None = o que o matplotlib/seaborn/pandas já puseram
+    if g["rotulo_x"] is not None:
+        ax.set_xlabel(g["rotulo_x"])
+    if g["rotulo_y"] is not None:
+        ax.set_ylabel(g["rotulo_y"])
+    return fig
+
+# --- Plotly ---
+def _rotulos(idx):
+    return [str(v) for v in idx]
+
+
+def figura_plotly(g: dict) -> go.Figure:
+    """Figure do Plotly (desenhada no navegador) para a especificação `g`."""
+    d, tipo = g["dados"], g["tipo"]
+    fig = go.Figure()
+    if tipo == "barras":
+        if hasattr(d, "columns"):
+            for c in d.columns:
+                fig.add_trace(go.Bar(x=_rotulos(d.index), y=d[c].to_numpy(), name=str(c)))
+            fig.update_layout(barmode="group")
+        elif g["horizontal"]:
+            fig.add_trace(go.Bar(x=d.to_numpy(), y=_rotulos(d.index), orientation="h"))
+            fig.update_yaxes(autorange="reversed", type="category")
+        else:
+            fig.add_trace(go.Bar(x=_rotulos(d.index), y=d.to_numpy()))
+            fig.update_xaxes(type="category")
+    elif tipo == "pizza":
+        fig.add_trace(go.Pie(labels=_rotulos(d.index), values=d.to_numpy(), sort=False, textinfo="label+percent"))
+    elif tipo == "linha":
+        if hasattr(d, "columns"):
+            for c in d.columns:
+                fig.add_trace(go.Scatter(x=list(d.index), y=d[c].to_numpy(), mode="lines+markers", name=str(c)))
+        else:
+            fig.add_trace(go.Scatter(x=list(d.index), y=d.to_numpy(), mode="lines+markers"))
+    elif tipo == "histograma":
+        fig.add_trace(go.Bar(x=list(d.index), y=d.to_numpy()))
+        fig.update_layout(bargap=0)
+    elif tipo == "box":
+        rot = [r["label"] for r in d]
+        fig.add_trace(go.Box(x=rot, q1=[r["q1"] for r in d], median=[r["med"] for r in d],
+                             q3=[r["q3"] for r in d], lowerfence=[r["whislo"] for r in d],
+                             upperfence=[r["whishi"] for r in d], boxpoints=False, name=""))
+        xs = [r["label"] for r in d for _ in r["fliers"]]
+        ys = [float(v) for r in d for v in r["fliers"]]
+        if ys:
+            fig.add_trace(go.Scatter(x=xs, y=ys, mode="markers", marker=dict(size=4, opacity=0.5), name="outliers"))
+        fig.update_xaxes(type="category")
+    fig.update_layout(title=dict(text=g["titulo"]), xaxis_title=g["rotulo_x"], yaxis_title=g["rotulo_y"],
+                      showlegend=tipo == "pizza" or (tipo == "barras" and hasattr(d, "columns")),
+                      margin=dict(l=10, r=10, t=40, b=10))
+    return fig
+
+
+def exibir_grafico(g: dict, fingerprint: str, colmap: dict, nome: str, **chave):
+    """
+    Desenha `g` com o backend escolhido na sessão (`backend_graficos`, padrão
+    DASH_GRAFICOS). `fingerprint`/`colmap`/`nome`/`chave` identificam o gráfico
+    no cache de PNG do matplotlib e no estado do Streamlit.
+    """
+    if st.session_state.get("backend_graficos", BACKEND_GRAFICOS) == "matplotlib":
+        from core.figuras import pyplot_cache
+        return pyplot_cache(lambda: figura_matplotlib(g), fingerprint, colmap, nome, **chave)
+    with span(f"grafico:{nome}"):
+        st.plotly_chart(figura_plotly(g), config=PLOTLY_CONFIG, key=f"graf_{nome}")
@@ -0,0 +1,100 @@
+# core/colunar.py
+# -*- coding: utf-8 -*-
+import os, hashlib, glob
+import pandas as pd
+import pyarrow as pa
+
+# ----------------------------
+# Cache colunar em disco (CSV/XLSX -> Arrow IPC mapeado em memória)
+# ----------------------------
+CACHE_DIR = os.path.join(os.environ.get("DASH_CACHE_DIR", ".cache"), "colunar")
+CACHE_MAX_MB = float(os.environ.get("DASH_CACHE_MAX_MB", "2048"))
+EXT = ".arrow"
+
+
+def chave_arquivo(caminho: str) -> str:
+    """Chave do arquivo de origem: caminho absoluto + mtime + tamanho."""
+    st_ = os.stat(caminho)
+    bruto = f"{os.path.abspath(caminho)}|{st_.st_mtime_ns}|{st_.st_size}"
+    return hashlib.sha1(bruto.encode("utf-8")).hexdigest()
+
+
+def _caminho_cache(chave: str) -> str:
+    return os.path.join(CACHE_DIR, chave + EXT)
+
+
+def _ler_mmap(path: str) -> pd.DataFrame:
+    """
+    Lê o Arrow IPC via memory-map, sem reparse de texto e sem copiar: com
+    split_blocks cada coluna numérica sem nulos (e o texto, já Arrow no pandas)
+    aponta para as páginas do arquivo. Só bool e colunas com nulos são convertidas.
+    """
+    tabela = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return tabela.to_pandas(split_blocks=True)
+
+
+def _gravar(df: pd.DataFrame, path: str):
+    """Grava de forma atômica (tmp + replace): seguro com vários workers."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, tabela.schema) as w:
+            w.write_table(tabela)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def limitar_pasta(pasta: str, padrao: str, limite_mb: float):
+    """Remove de `pasta` os arquivos `padrao` menos usados (mtime mais antigo) até caber em `limite_mb`."""
+    limite = limite_mb * 1024 * 1024
+    itens = []
+    for p in glob.glob(os.path.join(pasta, padrao)):
+        try:
+            s = os.stat(p)
+            itens.append((s.st_mtime, s.st_size, p))
+        except OSError:
+            continue
+    total = sum(t for _, t, _ in itens)
+    for _, tam, p in sorted(itens):
+        if total <= limite:
+            break
+        try:
+            os.remove(p)
+            total -= tam
+        except OSError:
+            pass
+
+
+def _evict(limite_mb: float = None):
+    limitar_pasta(CACHE_DIR, "*" + EXT, CACHE_MAX_MB if limite_mb is None else limite_mb)
+
+
+def ler_colunar(caminho: str, leitor, colunas=None) -> pd.DataFrame:
+    """
+    Devolve o DataFrame de `caminho` a partir da cópia Arrow em cache.
+    Na primeira vez usa `leitor(caminho)` (ex.: pd.read_csv), grava a cópia
+    tipada e aplica o limite de tamanho (LRU). Falhas de cache não impedem a leitura.
+    `colunas` (projeção já aplicada pelo leitor) entra na chave da cópia.
+    """
+    chave = chave_arquivo(caminho)
+    if colunas is not None:
+        chave += "-" + hashlib.sha1("\x1f".join(map(str, colunas)).encode("utf-8")).hexdigest()[:16]
+    path = _caminho_cache(chave)
+    if os.path.exists(path):
+        try:
+            os.utime(path)  # marca uso recente (LRU)
+            return _ler_mmap(path)
+        except (OSError, pa.ArrowException):
+            pass
+
+    df = leitor(caminho)
+    try:
+        _gravar(df, path)
+        _evict()
+    except (OSError, pa.ArrowException, ValueError, TypeError):
+        # colunas com tipos mistos não convertem para Arrow: segue sem cache
+        pass
+    return df
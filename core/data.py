@@ -1,71 +1,328 @@
 # core/data.py
 # -*- coding: utf-8 -*-
-import os, io
+import os, hashlib, threading
 import numpy as np
 import pandas as pd
-from scipy import stats
+import pyarrow.parquet as pq
 import streamlit as st
 
+from core.colunar import ler_colunar, chave_arquivo, limitar_pasta
+from core.dataset import eh_dataset, existe_dataset, chave_dataset, amostra_dataset, ler_dataset
+from core.esquema import AMOSTRA_PERFIL
+from core.momentos import momentos, comomentos, ic_t, pearson
+
 # ----------------------------
 # Localização automática do arquivo padrão
 # ----------------------------
 def _candidatos_df_padrao():
-    """Gera caminhos candidatos para df_selecionado.*"""
+    """
+    Gera caminhos candidatos: `DASH_DATASET` (diretório ou glob de Parquet),
+    depois df_selecionado.* e o diretório particionado df_selecionado/.
+    """
+    if os.environ.get("DASH_DATASET"):
+        yield os.environ["DASH_DATASET"]
     base_name = "df_selecionado"
     pastas = ["data", ".", "/mnt/data"]
-    exts = [".csv", ".xlsx", ".parquet"]
+    exts = [".csv", ".xlsx", ".parquet", ""]
     for pasta in pastas:
         for ext in exts:
             yield os.path.join(pasta, f"{base_name}{ext}")
 
 def _primeiro_existente():
     for caminho in _candidatos_df_padrao():
-        if os.path.exists(caminho):
+        if eh_dataset(caminho):
+            if existe_dataset(caminho):
+                return caminho
+        elif os.path.splitext(caminho)[1] and os.path.exists(caminho):
             return caminho
     return None
 
+def fingerprint_df(df: pd.DataFrame) -> str:
+    """
+    Impressão digital da base (esquema + conteúdo), usada como chave de cache
+    dos agregados. Fica guardada em `df.attrs` para não ser recalculada.
+    """
+    fp = df.attrs.get("fingerprint")
+    if fp:
+        return fp
+    h = hashlib.sha1()
+    h.update(repr((df.shape, [str(c) for c in df.columns], [str(t) for t in df.dtypes])).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    fp = h.hexdigest()
+    df.attrs["fingerprint"] = fp
+    return fp
+
+# ----------------------------
+# Compactação de tipos na carga
+# ----------------------------
+COMPACTAR = os.environ.get("DASH_COMPACTAR", "1") != "0"
+CATEGORIA_MAX_FRACAO = 0.5  # texto vira `category` se distintos/linhas <= isto
+BOOL_TEXTO = {"true": True, "false": False, "sim": True, "não": False, "nao": False,
+              "yes": True, "no": False, "y": True, "n": False}
+
+def _texto_booleano(s: pd.Series, unicos):
+    """Série booleana (nullable) se todos os valores distintos forem booleanos/'sim'/'não'/..., senão None."""
+    if not 0 < len(unicos) <= len(BOOL_TEXTO):
+        return None
+    if all(isinstance(u, (bool, np.bool_)) for u in unicos):
+        return s.astype("boolean")
+    chaves = pd.Series(unicos).astype(str).str.strip().str.lower()
+    if not chaves.isin(list(BOOL_TEXTO)).all():
+        return None
+    mapa = dict(zip(unicos, chaves.map(BOOL_TEXTO)))
+    return s.map(mapa).astype("boolean")
+
+def _compactar_coluna(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_bool_dtype(s) or isinstance(s.dtype, pd.CategoricalDtype):
+        return s
+    if pd.api.types.is_integer_dtype(s):
+        return pd.to_numeric(s, downcast="integer")
+    if pd.api.types.is_float_dtype(s):
+        f32 = s.astype("float32")
+        # só rebaixa se não perder precisão (ex.: quantidades inteiras com NaN)
+        return f32 if (f32.astype("float64") == s)[s.notna()].all() else s
+    if pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s):
+        unicos = s.dropna().unique()
+        b = _texto_booleano(s, unicos)
+        if b is not None:
+            return b
+        if len(unicos) <= CATEGORIA_MAX_FRACAO * len(s):
+            return s.astype("category")
+    return s
+
+def compactar_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tipos compactos: texto de baixa cardinalidade -> `category`, texto booleano
+    -> `boolean`, inteiros rebaixados e floats para float32 quando sem perda.
+    Guarda em `attrs["memoria"]` o relatório {coluna: (tipo_antes, tipo_depois,
+    bytes_antes, bytes_depois)}.
+    """
+    out = df.copy(deep=False)
+    relatorio = {}
+    for col in df.columns:
+        antes = df[col]
+        depois = _compactar_coluna(antes)
+        if depois is not antes:
+            out[col] = depois
+        relatorio[str(col)] = (str(antes.dtype), str(depois.dtype),
+                               int(antes.memory_usage(deep=True, index=False)),
+                               int(depois.memory_usage(deep=True, index=False)))
+    out.attrs = {**df.attrs, "memoria": relatorio}
+    return out
+
+def relatorio_memoria(df: pd.DataFrame):
+    """Relatório de `compactar_df` como DataFrame (MB por coluna), ou None se a base não foi compactada."""
+    rel = df.attrs.get("memoria")
+    if not rel:
+        return None
+    tab = pd.DataFrame.from_dict(rel, orient="index", columns=["tipo_antes", "tipo_depois", "mb_antes", "mb_depois"])
+    tab[["mb_antes", "mb_depois"]] = tab[["mb_antes", "mb_depois"]] / 1e6
+    return tab.rename_axis("coluna")
+
+# ----------------------------
+# Leitura em duas fases: esquema/amostra -> só as colunas mapeadas
+# ----------------------------
+def _ler_parquet(f, colunas=None, nrows=None):
+    if nrows is None:
+        return pd.read_parquet(f, columns=colunas)
+    arq = pq.ParquetFile(f)
+    lote = next(arq.iter_batches(batch_size=max(nrows, 1), columns=colunas), None)
+    return (arq.schema_arrow.empty_table() if lote is None else lote).to_pandas().head(nrows)
+
+def _leitor(nome: str, colunas=None, nrows=None):
+    """Função fonte -> DataFrame para a extensão de `nome`, lendo só `colunas` (e até `nrows` linhas)."""
+    uc = None if colunas is None else list(colunas)
+    nome = nome.lower()
+    if nome.endswith(".csv"):
+        return lambda f: pd.read_csv(f, usecols=uc, nrows=nrows)
+    if nome.endswith(".xlsx"):
+        return lambda f: pd.read_excel(f, usecols=uc, nrows=nrows)
+    if nome.endswith(".parquet"):
+        return lambda f: _ler_parquet(f, uc, nrows)
+    return None
+
+def _rotulo(chave: str, compactar: bool, colunas, filtros=None) -> str:
+    """Fingerprint da leitura: fonte + projeção + filtros + compactação (linhas/colunas/tipos diferentes => outra chave)."""
+    if colunas is not None:
+        chave += ":" + hashlib.sha1("\x1f".join(map(str, colunas)).encode("utf-8")).hexdigest()[:16]
+    if filtros:
+        chave += ":f" + hashlib.sha1(repr(sorted(filtros.items())).encode("utf-8")).hexdigest()[:16]
+    return f"{chave}:compacto" if compactar else chave
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def ler_amostra(_fonte, chave: str, nrows: int = AMOSTRA_PERFIL) -> pd.DataFrame:
+    """
+    Fase 1: só o esquema e as primeiras `nrows` linhas (metadados do Parquet,
+    início do CSV/XLSX) — o bastante para o automap e o perfil de esquema.
+    """
+    if eh_dataset(_fonte):
+        return amostra_dataset(_fonte, nrows)
+    nome = _fonte if isinstance(_fonte, str) else _fonte.name
+    leitor = _leitor(nome, nrows=nrows)
+    if leitor is None:
+        raise ValueError(f"Extensão não suportada: {nome}")
+    if hasattr(_fonte, "seek"):
+        _fonte.seek(0)
+    try:
+        return leitor(_fonte)
+    finally:
+        if hasattr(_fonte, "seek"):
+            _fonte.seek(0)
+
 @st.cache_data(show_spinner=False)
-def _ler_df(caminho: str):
-    """Leitura com cache do Streamlit."""
-    if caminho.lower().endswith(".csv"):
-        return pd.read_csv(caminho)
-    if caminho.lower().endswith(".xlsx"):
-        return pd.read_excel(caminho)
-    if caminho.lower().endswith(".parquet"):
-        return pd.read_parquet(caminho)
-    raise ValueError(f"Extensão não suportada: {caminho}")
+def _ler_df(caminho: str, chave: str, compactar: bool = COMPACTAR, colunas: tuple = None, filtros: dict = None):
+    """
+    Leitura com cache do Streamlit. `chave` (caminho + mtime + tamanho)
+    invalida o cache quando o arquivo muda; CSV/XLSX passam pelo cache
+    colunar em disco (core.colunar). `colunas` limita a leitura às colunas
+    mapeadas; `filtros` (só em bases particionadas, core.dataset) descarta
+    partições/row groups na leitura; com `compactar`, aplica `compactar_df`.
+    """
+    leitor = _leitor(caminho, colunas)
+    if eh_dataset(caminho):
+        df = ler_dataset(caminho, colunas, filtros)
+    elif leitor is None:
+        raise ValueError(f"Extensão não suportada: {caminho}")
+    elif caminho.lower().endswith(".parquet"):
+        df = leitor(caminho)
+    else:
+        df = ler_colunar(caminho, leitor, colunas)
+    if compactar:
+        df = compactar_df(df)
+    df.attrs["fingerprint"] = _rotulo(chave, compactar, colunas, filtros)
+    return df
 
-def carregar_df(stmod=st):
+# ----------------------------
+# Uploads: gravados uma vez em disco, endereçados pelo conteúdo
+# ----------------------------
+# O arquivo enviado vira `.cache/uploads/<sha1><ext>` e dali em diante é uma
+# fonte em disco como outra qualquer (cache do _ler_df, cache colunar, streaming).
+# Mesmo conteúdo => mesmo caminho e mesma chave, em qualquer sessão.
+UPLOAD_DIR = os.path.join(os.environ.get("DASH_CACHE_DIR", ".cache"), "uploads")
+UPLOAD_MAX_MB = float(os.environ.get("DASH_UPLOAD_MAX_MB", "2048"))
+
+def chave_upload(up) -> str:
+    """Hash do conteúdo de um arquivo enviado (lido em blocos, sem cópia extra)."""
+    h = hashlib.sha1()
+    up.seek(0)
+    for bloco in iter(lambda: up.read(1 << 20), b""):
+        h.update(bloco)
+    up.seek(0)
+    return f"upload:{up.name}:{h.hexdigest()}"
+
+@st.cache_resource
+def _uploads_gravados():
+    """{file_id do upload: (caminho, chave)} — o hash é calculado uma vez por upload, não a cada rerun."""
+    return {}
+
+def _gravar_upload(up, ext: str):
+    """Hash + gravação numa passada. Usa o buffer do upload via memoryview (sem cópia) quando possível."""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    tmp = os.path.join(UPLOAD_DIR, f".{os.getpid()}.{threading.get_ident()}.tmp")
+    h = hashlib.sha1()
+    try:
+        buf = up.getbuffer()
+    except (AttributeError, BufferError):
+        buf = None
+    try:
+        if buf is not None:
+            with buf:
+                h.update(buf)
+                destino = os.path.join(UPLOAD_DIR, h.hexdigest() + ext)
+                if not os.path.exists(destino):
+                    with open(tmp, "wb") as f:
+                        f.write(buf)
+                    os.replace(tmp, destino)
+        else:
+            up.seek(0)
+            with open(tmp, "wb") as f:
+                for bloco in iter(lambda: up.read(1 << 20), b""):
+                    h.update(bloco)
+                    f.write(bloco)
+            up.seek(0)
+            destino = os.path.join(UPLOAD_DIR, h.hexdigest() + ext)
+            os.replace(tmp, destino)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return destino, f"upload:{h.hexdigest()}"
+
+def gravar_upload(up):
     """
-    Tenta carregar automaticamente `df_selecionado.*`. 
-    Caso não encontre, exibe uploader e lê o arquivo enviado.
-    Retorna um DataFrame ou None.
+    (caminho, chave) do upload gravado em UPLOAD_DIR; o conteúdo já gravado
+    (por esta ou outra sessão) não é regravado. Sem disco: (up, chave_upload(up)).
+    """
+    ext = os.path.splitext(up.name)[1].lower()
+    gravados = _uploads_gravados()
+    ident = getattr(up, "file_id", None)
+    if ident in gravados and os.path.exists(gravados[ident][0]):
+        return gravados[ident]
+    try:
+        limitar_pasta(UPLOAD_DIR, "*", UPLOAD_MAX_MB)  # antes de gravar: o upload atual nunca é removido
+        res = _gravar_upload(up, ext)
+        os.utime(res[0])  # uso recente (LRU)
+    except OSError:
+        return up, chave_upload(up)
+    if ident is not None:
+        gravados[ident] = res
+    return res
+
+def localizar_fonte(stmod=st):
+    """
+    Localiza a base sem lê-la: `df_selecionado.*` ou, se não houver, o uploader
+    (o arquivo enviado é gravado em disco, ver `gravar_upload`).
+    Retorna (fonte, chave) — fonte é o caminho (ou o arquivo enviado, se não
+    houver disco) — ou (None, None).
     """
     caminho = _primeiro_existente()
     if caminho:
         stmod.success(f"Base carregada automaticamente de `{caminho}`")
-        return _ler_df(caminho)
+        return caminho, chave_dataset(caminho) if eh_dataset(caminho) else chave_arquivo(caminho)
 
     stmod.info("Não encontrei `df_selecionado.*`. Faça upload (CSV, XLSX ou PARQUET):")
     up = stmod.file_uploader("Envie df_selecionado.*", type=["csv", "xlsx", "parquet"])
     if up is None:
-        return None
+        return None, None
+    return gravar_upload(up)
+
+def ler_fonte(fonte, chave, stmod=st, compactar=COMPACTAR, colunas=None, filtros=None):
+    """
+    Fase 2: lê a fonte devolvida por `localizar_fonte` — só `colunas`, se
+    informadas (ex.: `core.esquema.colunas_mapeadas`), e, em bases
+    particionadas, só as linhas que passam por `filtros`. Retorna DataFrame ou None.
+    """
+    colunas = None if colunas is None else tuple(colunas)
+    if isinstance(fonte, str):
+        return _ler_df(fonte, chave, compactar, colunas, filtros or None)
 
+    up = fonte
     try:
-        nome = up.name.lower()
-        if nome.endswith(".csv"):
-            return pd.read_csv(up)
-        if nome.endswith(".xlsx"):
-            return pd.read_excel(up)
-        if nome.endswith(".parquet"):
-            # alguns providers entregam BytesIO
-            data = up.read() if hasattr(up, "read") else up.getvalue()
-            return pd.read_parquet(io.BytesIO(data))
-        stmod.error("Formato não suportado.")
+        leitor = _leitor(up.name, colunas)
+        if leitor is None:
+            stmod.error("Formato não suportado.")
+            return None
+        # lê direto do objeto enviado (sem copiar o conteúdo para outro BytesIO)
+        up.seek(0)
+        df = leitor(up)
+        if compactar:
+            df = compactar_df(df)
+        df.attrs["fingerprint"] = _rotulo(chave, compactar, colunas)
+        return df
     except Exception as e:
         stmod.error(f"Erro ao ler o arquivo: {e}")
     return None
 
+def carregar_df(stmod=st):
+    """
+    Tenta carregar automaticamente `df_selecionado.*`. 
+    Caso não encontre, exibe uploader e lê o arquivo enviado.
+    Retorna um DataFrame ou None.
+    """
+    fonte, chave = localizar_fonte(stmod)
+    if fonte is None:
+        return None
+    return ler_fonte(fonte, chave, stmod)
+
 # ----------------------------
 # Tipagem simples
 # ----------------------------
@@ -83,17 +340,7 @@ def ic_media(serie, conf=0.95):
     Intervalo de confiança da média (t de Student).
     Retorna (li, ls, media, n) ou None se amostra insuficiente.
     """
-    x = pd.to_numeric(pd.Series(serie).dropna(), errors='coerce').dropna()
-    n = len(x)
-    if n < 2:
-        return None
-    media = x.mean()
-    sd = x.std(ddof=1)
-    se = sd / np.sqrt(n)
-    alfa = 1 - conf
-    tcrit = stats.t.ppf(1 - alfa/2, df=n-1)
-    li, ls = media - tcrit*se, media + tcrit*se
-    return li, ls, media, n
+    return ic_t(momentos(serie), conf)
 
 def correlacao_pearson(x, y):
     """
@@ -102,9 +349,4 @@ def correlacao_pearson(x, y):
     """
     xv = pd.to_numeric(pd.Series(x), errors="coerce")
     yv = pd.to_numeric(pd.Series(y), errors="coerce")
-    mask = xv.notna() & yv.notna()
-    xv = xv[mask]; yv = yv[mask]
-    if len(xv) < 3:
-        return None
-    r, p = stats.pearsonr(xv, yv)
-    return r, p
+    return pearson(comomentos(xv, yv))
@@ -0,0 +1,192 @@
+# core/dataset.py
+# -*- coding: utf-8 -*-
+import os, glob, hashlib
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from core.esquema import converter_data
+
+# ----------------------------
+# Bases particionadas (diretório ou glob de Parquet) via pyarrow.dataset
+# ----------------------------
+DATASET_THREADS = int(os.environ.get("DASH_DATASET_THREADS", str(min(8, os.cpu_count() or 1))))
+_CURINGAS = set("*?[")
+
+
+def eh_dataset(fonte) -> bool:
+    """Fonte é um diretório ou um glob (vários arquivos Parquet), e não um arquivo único."""
+    return isinstance(fonte, str) and (os.path.isdir(fonte) or bool(_CURINGAS & set(fonte)))
+
+
+def listar_arquivos(caminho: str) -> list:
+    if os.path.isdir(caminho):
+        return sorted(glob.glob(os.path.join(caminho, "**", "*.parquet"), recursive=True))
+    return sorted(glob.glob(caminho, recursive=True))
+
+
+def existe_dataset(caminho: str) -> bool:
+    return bool(listar_arquivos(caminho))
+
+
+def chave_dataset(caminho: str) -> str:
+    """Chave do conjunto: caminho, mtime e tamanho de cada arquivo (partição nova => chave nova)."""
+    h = hashlib.sha1(os.path.abspath(caminho).encode("utf-8"))
+    for p in listar_arquivos(caminho):
+        s = os.stat(p)
+        h.update(f"|{p}|{s.st_mtime_ns}|{s.st_size}".encode("utf-8"))
+    return "dataset:" + h.hexdigest()
+
+
+def abrir_dataset(caminho: str, arquivos=None) -> ds.Dataset:
+    """
+    Dataset Parquet; diretórios no estilo hive (`mes=2022-05/`) viram colunas de partição.
+    `arquivos` restringe o dataset a um subconjunto (ex.: partições novas).
+    """
+    if os.path.isdir(caminho):
+        if arquivos is None:
+            return ds.dataset(caminho, format="parquet", partitioning="hive")
+        return ds.dataset(list(arquivos), format="parquet", partitioning="hive", partition_base_dir=caminho)
+    return ds.dataset(listar_arquivos(caminho) if arquivos is None else list(arquivos), format="parquet")
+
+# ----------------------------
+# Filtros empurrados para as estatísticas dos row groups
+# ----------------------------
+def _fim_do_dia(d):
+    return pd.Timestamp(d) + pd.Timedelta(days=1)
+
+
+def _expr_periodo(schema: pa.Schema, coluna: str, ini, fim, formato=None):
+    """
+    Expressão `ini <= coluna <= fim` se o tipo permitir comparar nos metadados
+    (timestamp/date, ou texto ISO `%Y-%m-%d...`); None se precisar filtrar depois de ler.
+    """
+    tipo = schema.field(coluna).type
+    campo = ds.field(coluna)
+    if pa.types.is_timestamp(tipo) and tipo.tz is None:
+        lo, hi = pd.Timestamp(ini).to_pydatetime(), _fim_do_dia(fim).to_pydatetime()
+        return (campo >= pa.scalar(lo, type=tipo)) & (campo < pa.scalar(hi, type=tipo))
+    if pa.types.is_date(tipo):
+        return (campo >= pa.scalar(pd.Timestamp(ini).date(), type=tipo)) & \
+               (campo <= pa.scalar(pd.Timestamp(fim).date(), type=tipo))
+    if pa.types.is_string(tipo) or pa.types.is_large_string(tipo):
+        if formato and formato.startswith("%Y-%m-%d"):
+            # ISO ordena como texto
+            return (campo >= pd.Timestamp(ini).strftime("%Y-%m-%d")) & \
+                   (campo < _fim_do_dia(fim).strftime("%Y-%m-%d"))
+    return None
+
+
+def montar_filtro(schema: pa.Schema, filtros: dict):
+    """
+    `filtros` = {"periodo": (coluna, ini, fim, formato) | None, "valores": {coluna: [valores]}}.
+    Retorna (expressão para o scan ou None, período que ficou para depois da leitura ou None).
+    """
+    exprs, pendente = [], None
+    periodo = (filtros or {}).get("periodo")
+    if periodo:
+        e = _expr_periodo(schema, *periodo)
+        if e is None:
+            pendente = periodo
+        else:
+            exprs.append(e)
+    for col, vals in ((filtros or {}).get("valores") or {}).items():
+        if vals:
+            tipo = schema.field(col).type
+            exprs.append(ds.field(col).isin(pa.array(list(vals)).cast(tipo)))
+    expr = None
+    for e in exprs:
+        expr = e if expr is None else expr & e
+    return expr, pendente
+
+
+def _filtrar_periodo(df: pd.DataFrame, periodo) -> pd.DataFrame:
+    coluna, ini, fim, formato = periodo
+    datas = converter_data(df[coluna], formato)
+    return df[(datas >= pd.Timestamp(ini)) & (datas < _fim_do_dia(fim))].reset_index(drop=True)
+
+# ----------------------------
+# Leitura
+# ----------------------------
+def amostra_dataset(caminho: str, nrows: int) -> pd.DataFrame:
+    """Primeiras `nrows` linhas (só abre os primeiros arquivos)."""
+    return abrir_dataset(caminho).head(nrows).to_pandas()
+
+
+def ler_dataset(caminho: str, colunas=None, filtros: dict = None, threads: int = None, arquivos=None) -> pd.DataFrame:
+    """
+    Lê só as partições/row groups que passam pelos filtros e só `colunas`.
+    Partições cujo valor de partição já exclui o filtro nem são abertas; nas
+    demais, o scan descarta row groups pelas estatísticas (mín/máx). Os
+    fragmentos são lidos em paralelo num pool de threads e concatenados na ordem.
+    """
+    dset = abrir_dataset(caminho, arquivos)
+    expr, pendente = montar_filtro(dset.schema, filtros)
+    cols = None if colunas is None else list(colunas)
+    if cols is not None and pendente and pendente[0] not in cols:
+        cols.append(pendente[0])
+    fragmentos = list(dset.get_fragments(filter=expr))
+    if expr is not None:
+        # poda pelos metadados antes de agendar a leitura: só row groups cujo mín/máx admite o filtro
+        fragmentos = [f for f in (fr.subset(filter=expr) for fr in fragmentos) if f.num_row_groups]
+
+    def _ler(frag):
+        return frag.to_table(schema=dset.schema, columns=cols, filter=expr, use_threads=False)
+
+    n = max(1, min(threads or DATASET_THREADS, len(fragmentos)))
+    if n > 1:
+        with ThreadPoolExecutor(max_workers=n) as ex:
+            tabelas = list(ex.map(_ler, fragmentos))
+    else:
+        tabelas = [_ler(f) for f in fragmentos]
+    vazio = dset.schema if cols is None else pa.schema([dset.schema.field(c) for c in cols])
+    tabela = pa.concat_tables(tabelas) if tabelas else vazio.empty_table()
+    df = tabela.to_pandas()
+    if pendente:
+        df = _filtrar_periodo(df, pendente)
+        if colunas is not None and pendente[0] not in colunas:
+            df = df.drop(columns=pendente[0])
+    return df
+
+
+def _minmax_estatisticas(dset: ds.Dataset, coluna: str):
+    """(mín, máx) pelos metadados de todos os row groups, ou None se faltar estatística."""
+    lo = hi = None
+    for frag in dset.get_fragments():
+        j = frag.physical_schema.get_field_index(coluna)
+        if j < 0:
+            return None
+        for i in range(frag.metadata.num_row_groups):
+            est = frag.metadata.row_group(i).column(j).statistics
+            if est is None or not est.has_min_max:
+                return None
+            lo = est.min if lo is None else min(lo, est.min)
+            hi = est.max if hi is None else max(hi, est.max)
+    return None if lo is None else (lo, hi)
+
+
+def intervalo_datas(caminho: str, coluna: str, formato=None):
+    """
+    (mín, máx) de `coluna` como datas, lidos só dos metadados quando a coluna é
+    timestamp/date; senão lendo apenas essa coluna. None se não houver datas.
+    """
+    dset = abrir_dataset(caminho)
+    tipo = dset.schema.field(coluna).type
+    if pa.types.is_timestamp(tipo) or pa.types.is_date(tipo):
+        mm = _minmax_estatisticas(dset, coluna)
+        if mm:
+            return pd.Timestamp(mm[0]).date(), pd.Timestamp(mm[1]).date()
+    datas = converter_data(dset.to_table(columns=[coluna]).column(coluna).to_pandas(), formato).dropna()
+    if datas.empty:
+        return None
+    return datas.min().date(), datas.max().date()
+
+
+def valores_distintos(caminho: str, coluna: str) -> list:
+    """Valores distintos de uma coluna (lendo só ela)."""
+    dset = abrir_dataset(caminho)
+    vals = pc.unique(dset.to_table(columns=[coluna]).column(coluna)).drop_null()
+    return sorted(vals.to_pylist(), key=str)
+
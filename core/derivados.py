@@ -0,0 +1,82 @@
+# core/derivados.py
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from core.data import BOOL_TEXTO
+from core.esquema import converter_data, converter_numero
+from core.spans import instrumentado
+
+# ----------------------------
+# Colunas derivadas (calculadas uma vez, logo após o automap)
+# ----------------------------
+
+
+def _tem(colmap, key, df):
+    return colmap.get(key) is not None and colmap[key] in df.columns
+
+
+def por_valores_unicos(serie: pd.Series, predicado) -> np.ndarray:
+    """
+    Avalia `predicado` (Series -> máscara booleana) apenas sobre os valores
+    distintos da série e propaga o resultado para as linhas pelos códigos.
+    Valores ausentes resultam em False.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        cod, unicos = serie.cat.codes.to_numpy(), serie.cat.categories
+    else:
+        cod, unicos = pd.factorize(serie)
+    hit = np.asarray(predicado(pd.Series(unicos, dtype="object")), dtype=bool)
+    out = np.zeros(len(cod), dtype=bool)
+    ok = cod >= 0
+    out[ok] = hit[cod[ok]]
+    return out
+
+
+def _status_contem(termo):
+    return lambda u: u.astype(str).str.lower().str.contains(termo, na=False)
+
+
+def _promo_ativa(u):
+    # booleanos e texto booleano ('sim'/'não'...) pela tabela da compactação
+    # (core.data.BOOL_TEXTO): o mesmo resultado com ou sem ela. Qualquer outro
+    # valor não nulo (ex.: id da promoção) conta como promoção.
+    ativa = u.astype(str).str.strip().str.lower().map(BOOL_TEXTO)
+    return ativa.where(ativa.notna(), u.notna()).astype(bool)
+
+
+@instrumentado()
+def converter_tipos(dfx: pd.DataFrame, colmap: dict, perfil: dict = None) -> pd.DataFrame:
+    """
+    Conversões do automap (datas e numéricos), in-place. Vale para a base ou um bloco.
+    Com `perfil` (core.esquema.perfil_esquema) usa o formato de data e a regra numérica
+    detectados; sem formato, interpreta só os valores distintos.
+    """
+    formatos = (perfil or {}).get("formatos_data", {})
+    regras = (perfil or {}).get("numericos", {})
+    for key in ["data_pedido", "data_entrega"]:
+        if _tem(colmap, key, dfx):
+            dfx[colmap[key]] = converter_data(dfx[colmap[key]], formatos.get(colmap[key]))
+    for key in ["valor_pedido", "quantidade", "valor_unitario"]:
+        if _tem(colmap, key, dfx):
+            dfx[colmap[key]] = converter_numero(dfx[colmap[key]], regras.get(colmap[key], "to_numeric"))
+    return dfx
+
+
+@instrumentado()
+def derivar_colunas(dfx: pd.DataFrame, colmap: dict) -> pd.DataFrame:
+    """
+    Acrescenta em `dfx` (in-place) as colunas derivadas reutilizadas pelas abas:
+    `_cancel`/`_entregue` (int8), `_has_promo` (bool) e `_dias_entrega` (float32).
+    Espera datas/numéricos já convertidos.
+    """
+    if _tem(colmap, "status_pedido", dfx):
+        status = dfx[colmap["status_pedido"]]
+        dfx["_cancel"] = por_valores_unicos(status, _status_contem("cancel")).astype(np.int8)
+        dfx["_entregue"] = por_valores_unicos(status, _status_contem("entreg")).astype(np.int8)
+    if _tem(colmap, "tem_promocao", dfx):
+        dfx["_has_promo"] = por_valores_unicos(dfx[colmap["tem_promocao"]], _promo_ativa)
+    if _tem(colmap, "data_pedido", dfx) and _tem(colmap, "data_entrega", dfx):
+        dias = (dfx[colmap["data_entrega"]] - dfx[colmap["data_pedido"]]).dt.days
+        dfx["_dias_entrega"] = dias.astype("float32")
+    return dfx
@@ -0,0 +1,48 @@
+# core/dispersao.py
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+
+# ----------------------------
+# Dispersão em bases grandes: densidade 2D + reta pelos co-momentos
+# ----------------------------
+DISPERSAO_MAX_PONTOS = int(os.environ.get("DASH_SCATTER_MAX_PONTOS", "20000"))
+
+
+def reta_minimos_quadrados(c: dict):
+    """
+    (inclinação, intercepto) da regressão y ~ x a partir dos co-momentos do cubo
+    (core.momentos.comomentos), ou None se não houver variação em x.
+    """
+    if c["n"] < 2 or c["m2x"] <= 0:
+        return None
+    b1 = c["cxy"] / c["m2x"]
+    return b1, c["my"] - b1 * c["mx"]
+
+
+def densidade_2d(x, y, bins=60, corte=(0.5, 99.5)):
+    """
+    Histograma 2D vetorizado (np.histogram2d) no intervalo central dos dados.
+    Retorna (H, bordas_x, bordas_y, máscara_fora) — a máscara marca os pontos
+    fora do intervalo (candidatos a outlier).
+    """
+    x = np.asarray(x, dtype="float64"); y = np.asarray(y, dtype="float64")
+    (x0, x1), (y0, y1) = np.percentile(x, corte), np.percentile(y, corte)
+    if x1 <= x0: x1 = x0 + 1.0
+    if y1 <= y0: y1 = y0 + 1.0
+    # eixo x discreto (ex.: Qty) ganha um bin por inteiro, até `bins`
+    if np.all(np.mod(x, 1) == 0) and x1 - x0 + 1 <= bins:
+        bx = np.arange(x0 - 0.5, x1 + 1.0)
+    else:
+        bx = np.linspace(x0, x1, bins + 1)
+    H, ex, ey = np.histogram2d(x, y, bins=[bx, np.linspace(y0, y1, bins + 1)])
+    fora = (x < ex[0]) | (x > ex[-1]) | (y < ey[0]) | (y > ey[-1])
+    return H, ex, ey, fora
+
+
+def amostra_indices(mascara, k=1000, seed=0):
+    """Amostra uniforme (sem reposição) de até k posições onde `mascara` é True."""
+    idx = np.flatnonzero(mascara)
+    if len(idx) <= k:
+        return idx
+    return np.sort(np.random.default_rng(seed).choice(idx, size=k, replace=False))
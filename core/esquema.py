@@ -0,0 +1,207 @@
+# core/esquema.py
+# -*- coding: utf-8 -*-
+import os, re, json, hashlib, threading, warnings
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from core.colunar import limitar_pasta
+from core.spans import instrumentado
+
+# =========================
+# Auto‑mapeamento (sinônimos)
+# =========================
+def _norm(s: str) -> str:
+    return re.sub(r"[^a-z0-9_]+", " ", s.lower().strip())
+
+ROLE_SYNONYMS = {
+    # Vendas
+    "data_pedido":      [r"^date$", r"order[\s_]*date", r"data[\s_]*pedido"],
+    "valor_pedido":     [r"^amount$", r"valor[\s_]*pedido", r"order[\s_]*amount", r"total[\s_]*order"],
+    "categoria":        [r"^category$", r"categoria"],
+    "produto":          [r"^product$", r"product[\s_]*name", r"style", r"produto", r"descri[cç][aã]o", r"descricao"],
+    "tipo_cliente":     [r"^b2b$", r"tipo[\s_]*cliente", r"customer[\s_]*type"],
+    "regiao":           [r"ship[\s_]*state", r"ship[\s_]*city", r"estado", r"cidade", r"regi[aã]o", r"uf"],
+    "quantidade":       [r"^qty$", r"quantity", r"quantidade"],
+    # Cancel/Entregas
+    "status_pedido":    [r"^status$", r"order[\s_]*status", r"situa[cç][aã]o"],
+    "tipo_envio":       [r"^fulfil.*by$", r"^fulfilled[\s_]*by$", r"^fulfillment$", r"^fulfilment$", r"tipo[\s_]*envio"],
+    "courier_status":   [r"^courier[\s_]*status$", r"ship[\s_]*service[\s_]*level", r"nível[\s_]*servi[cç]o"],
+    # Produtos
+    "tamanho":          [r"^size$", r"tamanho"],
+    "valor_unitario":   [r"unit[\s_]*price", r"valor[\s_]*unit[aá]rio", r"pre[cç]o[\s_]*unit[aá]rio"],
+    # Promoção
+    "tem_promocao":     [r"promotion[\s_]*id", r"promo[cç][aã]o", r"has[\s_]*promo", r"applied[\s_]*promo"],
+    # Entrega real (se existir)
+    "data_entrega":     [r"deliv[\s_]*date", r"data[\s_]*entrega"]
+}
+
+# Uma regex combinada por papel (alternância = "qualquer padrão"), compilada uma vez.
+_PADROES = {role: re.compile("|".join(f"(?:{p})" for p in pats)) for role, pats in ROLE_SYNONYMS.items()}
+
+PAPEIS_DATA = ["data_pedido", "data_entrega"]
+PAPEIS_NUMERICOS = ["valor_pedido", "quantidade", "valor_unitario"]
+
+@instrumentado()
+def automap(df_local: pd.DataFrame) -> dict:
+    """Papel -> coluna: primeiro a coluna que casa inteira com algum sinônimo, depois a que o contém."""
+    norm = [(c, _norm(c)) for c in df_local.columns.tolist()]
+    m = {}
+    for role, rx in _PADROES.items():
+        m[role] = next((c for c, nc in norm if rx.fullmatch(nc)), None) \
+            or next((c for c, nc in norm if rx.search(nc)), None)
+    return m
+
+def has(colmap, key, df):
+    return key in colmap and colmap[key] in df.columns and colmap[key] is not None
+
+def colunas_mapeadas(colmap: dict) -> list:
+    """Colunas da base usadas por algum papel (sem repetição) — as únicas que precisam ser lidas."""
+    return [c for c in dict.fromkeys(colmap.values()) if c is not None]
+
+# =========================
+# Perfil de esquema (mapeamento + formatos de data + regras numéricas)
+# =========================
+PERFIL_DIR = os.path.join(os.environ.get("DASH_CACHE_DIR", ".cache"), "perfis")
+PERFIL_VERSAO = 1  # muda quando o formato/as regras do perfil mudam: JSONs antigos são refeitos
+PERFIS_MAX = 64  # perfis em memória (LRU); em disco, até PERFIS_MAX_MB
+PERFIS_MAX_MB = float(os.environ.get("DASH_PERFIS_MAX_MB", "8"))
+AMOSTRA_PERFIL = 2000
+# mês antes de dia nos formatos ambíguos: mesmo desempate do parser do pandas
+FORMATOS_DATA = ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y/%m/%d",
+                 "%m/%d/%Y", "%d/%m/%Y", "%m-%d-%Y", "%d-%m-%Y", "%m-%d-%y", "%d-%m-%y",
+                 "%m/%d/%y", "%d/%m/%y", "%d.%m.%Y"]
+_perfis = OrderedDict()
+_perfis_lock = threading.Lock()
+
+def fingerprint_colunas(colunas) -> str:
+    """Impressão digital do conjunto (ordenado) de colunas."""
+    return hashlib.sha1(json.dumps([str(c) for c in colunas]).encode("utf-8")).hexdigest()
+
+def _detecta_formato(serie: pd.Series):
+    """Formato strftime que interpreta a maior fração dos valores distintos (>= 95%), ou None."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return "nativo"
+    unicos = pd.Series(serie.dropna().astype(str).unique()[:AMOSTRA_PERFIL])
+    if unicos.empty:
+        return None
+    melhor, taxa = None, 0.0
+    for fmt in FORMATOS_DATA:
+        t = pd.to_datetime(unicos, format=fmt, errors="coerce").notna().mean()
+        if t > taxa:
+            melhor, taxa = fmt, t
+    return melhor if taxa >= 0.95 else None
+
+_RX_VIRGULA = re.compile(r"^-?\d{1,3}(\.\d{3})*(,\d+)?$|^-?\d+,\d+$")
+
+def _limpa_numero(s: pd.Series) -> pd.Series:
+    """'R$ 1.234,56' -> '1234.56' (remove símbolos, milhar com ponto, decimal com vírgula)."""
+    s = s.astype(str).str.replace(r"[^\d,.\-]", "", regex=True)
+    return s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+
+def _detecta_regra_numerica(serie: pd.Series) -> str:
+    """'nativo' (já numérica), 'decimal_virgula' (formato BR) ou 'to_numeric'."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return "nativo"
+    amostra = serie.dropna().astype(str).str.strip().head(AMOSTRA_PERFIL)
+    if len(amostra) and amostra.str.replace(r"[^\d,.\-]", "", regex=True).str.match(_RX_VIRGULA).mean() >= 0.95 \
+            and pd.to_numeric(amostra, errors="coerce").notna().mean() < 0.95:
+        return "decimal_virgula"
+    return "to_numeric"
+
+def perfil_esquema(df: pd.DataFrame) -> dict:
+    """
+    Perfil do esquema para o conjunto de colunas de `df`: mapeamento papel->coluna,
+    formato de cada coluna de data e regra de conversão de cada coluna numérica.
+    Construído uma vez (a partir de uma amostra) e reaproveitado por impressão
+    digital das colunas, em memória (LRU de PERFIS_MAX) e em `.cache/perfis/*.json`
+    (com PERFIL_VERSAO; limitados a PERFIS_MAX_MB).
+    """
+    fp = fingerprint_colunas(df.columns)
+    with _perfis_lock:
+        if fp in _perfis:
+            _perfis.move_to_end(fp)
+            return _perfis[fp]
+    path = os.path.join(PERFIL_DIR, fp + ".json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            perfil = json.load(f)
+        if perfil.get("versao") != PERFIL_VERSAO:
+            raise ValueError("perfil de outra versão")
+        os.utime(path)  # uso recente (LRU)
+    except (OSError, ValueError, AttributeError):
+        perfil = _construir_perfil(df, fp)
+        try:
+            os.makedirs(PERFIL_DIR, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(perfil, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            limitar_pasta(PERFIL_DIR, "*.json", PERFIS_MAX_MB)
+        except OSError:
+            pass
+    with _perfis_lock:
+        _perfis[fp] = perfil
+        _perfis.move_to_end(fp)
+        while len(_perfis) > PERFIS_MAX:
+            _perfis.popitem(last=False)
+    return perfil
+
+def _construir_perfil(df: pd.DataFrame, fp: str) -> dict:
+    colmap = automap(df)
+    amostra = df.head(AMOSTRA_PERFIL)
+    return {
+        "versao": PERFIL_VERSAO,
+        "fingerprint": fp,
+        "colmap": colmap,
+        "formatos_data": {colmap[k]: _detecta_formato(amostra[colmap[k]]) for k in PAPEIS_DATA if colmap[k]},
+        "numericos": {colmap[k]: _detecta_regra_numerica(amostra[colmap[k]]) for k in PAPEIS_NUMERICOS if colmap[k]},
+    }
+
+# ----------------------------
+# Conversões guiadas pelo perfil
+# ----------------------------
+def _codigos(serie: pd.Series):
+    """(códigos, valores distintos) — direto das categorias se a coluna for `category`."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), pd.Series(serie.cat.categories.to_numpy(), dtype="object")
+    cod, unicos = pd.factorize(serie)
+    return cod, pd.Series(unicos, dtype="object")
+
+def _expandir(cod, conv: pd.Series, serie: pd.Series, vazio) -> pd.Series:
+    """Propaga para as linhas o valor convertido de cada distinto (código -1 -> `vazio`)."""
+    out = conv.to_numpy()[np.where(cod >= 0, cod, 0)] if len(conv) else np.full(len(cod), vazio, dtype=conv.dtype)
+    out[cod < 0] = vazio
+    return pd.Series(out, index=serie.index, name=serie.name)
+
+def converter_data(serie: pd.Series, formato=None) -> pd.Series:
+    """
+    Data com o formato fixo do perfil, avaliada só nos valores distintos; se o
+    formato não servir para esta base (ou não houver), cai para o parser misto.
+    """
+    if formato == "nativo" or pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    cod, unicos = _codigos(serie)
+    conv = None
+    if formato:
+        conv = pd.to_datetime(unicos, format=formato, errors="coerce")
+        ok = np.bincount(cod[cod >= 0], minlength=len(unicos)) @ conv.notna().to_numpy()
+        if ok < 0.95 * (cod >= 0).sum():
+            conv = None
+    if conv is None:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            conv = pd.to_datetime(unicos, errors="coerce", format="mixed")
+    return _expandir(cod, conv, serie, np.datetime64("NaT"))
+
+def converter_numero(serie: pd.Series, regra="to_numeric") -> pd.Series:
+    """Numérico pela regra do perfil; 'decimal_virgula' só limpa se o parse direto falhar nesta base."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        cod, unicos = _codigos(serie)
+        return _expandir(cod, converter_numero(unicos, regra).astype("float64"), serie, np.nan)
+    conv = pd.to_numeric(serie, errors="coerce")
+    if regra == "decimal_virgula" and conv.notna().sum() < 0.95 * serie.notna().sum():
+        return pd.to_numeric(_limpa_numero(serie), errors="coerce").where(serie.notna())
+    return conv
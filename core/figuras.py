@@ -0,0 +1,89 @@
+# core/figuras.py
+# -*- coding: utf-8 -*-
+import os, io, hashlib, threading
+from collections import OrderedDict
+import matplotlib.pyplot as plt
+import streamlit as st
+
+from core.config import get_appearance
+from core.spans import span
+from core.resultados import obter, guardar
+
+# ----------------------------
+# Cache de figuras renderizadas (PNG), LRU limitado em bytes
+# ----------------------------
+FIG_CACHE_MB = float(os.environ.get("DASH_FIG_CACHE_MB", "64"))
+# Mesmos parâmetros que o st.pyplot usa ao rasterizar.
+SAVEFIG_KW = {"format": "png", "bbox_inches": "tight", "dpi": 200}
+
+
+class CacheFiguras:
+    """Dicionário LRU de PNGs com limite total em bytes (thread-safe)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            png = self._itens.get(chave)
+            if png is not None:
+                self._itens.move_to_end(chave)
+            return png
+
+    def put(self, chave, png: bytes):
+        if len(png) > self.max_bytes:
+            return
+        with self._lock:
+            antigo = self._itens.pop(chave, None)
+            if antigo is not None:
+                self.total -= len(antigo)
+            self._itens[chave] = png
+            self.total += len(png)
+            while self.total > self.max_bytes:
+                _, velho = self._itens.popitem(last=False)
+                self.total -= len(velho)
+
+
+@st.cache_resource(show_spinner=False)
+def _cache_processo() -> CacheFiguras:
+    """Uma instância por processo, compartilhada entre sessões."""
+    return CacheFiguras(int(FIG_CACHE_MB * 1024 * 1024))
+
+
+def chave_figura(fingerprint: str, colmap: dict, nome: str, **spec) -> str:
+    """Chave = base + mapeamento + especificação do gráfico (tipo, coluna, top-N...) + tema."""
+    tema = get_appearance()[0]
+    bruto = repr((fingerprint, sorted(colmap.items()), nome, sorted(spec.items()), tema))
+    return hashlib.sha1(bruto.encode("utf-8")).hexdigest()
+
+
+def pyplot_cache(desenhar, fingerprint: str, colmap: dict, nome: str, **spec):
+    """
+    Exibe a figura produzida por `desenhar()` (função sem argumentos que
+    devolve uma Figure). Se o PNG já estiver no cache (do processo ou o
+    compartilhado em disco, core.resultados), nem o matplotlib roda.
+    """
+    with span(f"grafico:{nome}"):
+        cache = _cache_processo()
+        chave = chave_figura(fingerprint, colmap, nome, **spec)
+        png = cache.get(chave)
+        if png is None:
+            # outro worker pode já ter rasterizado esta figura
+            png = obter("png:" + chave, None)
+            if png is not None:
+                cache.put(chave, png)
+        if png is None:
+            with span("desenhar"):
+                fig = desenhar()
+            with span("rasterizar"):
+                buf = io.BytesIO()
+                fig.savefig(buf, **SAVEFIG_KW)
+                plt.close(fig)
+            png = buf.getvalue()
+            cache.put(chave, png)
+            guardar("png:" + chave, png)
+        with span("st.image"):
+            st.image(png, width="stretch")
@@ -0,0 +1,100 @@
+# core/filtros.py
+# -*- coding: utf-8 -*-
+import hashlib, json
+import numpy as np
+import pandas as pd
+
+# ----------------------------
+# Filtros cruzados por índices de bitmap (um por valor de cada dimensão)
+# ----------------------------
+# Construído uma vez por base: para cada valor de cada dimensão filtrável, as
+# linhas onde ele aparece — bitmap compactado (np.packbits, n/8 bytes) se o
+# valor é frequente, lista de posições (int32) se é raro. Datas ficam como
+# permutação ordenada, então um período é uma fatia. Resolver uma combinação
+# de filtros = OR dos valores de cada dimensão + AND entre dimensões, sobre
+# bytes; nenhuma comparação linha a linha na base.
+FILTRAVEIS = ["categoria", "regiao", "tipo_envio", "tipo_cliente"]
+DENSO = 32  # valor com mais de n/DENSO linhas vira bitmap (ocupa menos que as posições)
+
+
+def construir_indice(dfx: pd.DataFrame, colmap: dict) -> dict:
+    """{"n", "dims": {papel: {"valores", "bitmaps", "posicoes"}}, "datas": (ordem, dias) ou None}."""
+    n = len(dfx)
+    idx = {"n": n, "dims": {}, "datas": None}
+    for papel in FILTRAVEIS:
+        col = colmap.get(papel)
+        if col is None or col not in dfx.columns:
+            continue
+        cod, valores = pd.factorize(dfx[col])
+        ordem = np.argsort(cod, kind="stable").astype(np.int32)
+        contagens = np.bincount(cod[cod >= 0], minlength=len(valores))
+        fim = np.cumsum(contagens) + int(np.count_nonzero(cod < 0))  # nulos (-1) vêm primeiro na ordem
+        bitmaps, posicoes = {}, {}
+        for c, (f, k) in enumerate(zip(fim, contagens)):
+            pos = ordem[f - k:f]
+            if k * DENSO > n:
+                bitmaps[c] = _de_posicoes(pos, n)
+            else:
+                posicoes[c] = pos
+        valores = pd.Index(valores)
+        if isinstance(valores, pd.CategoricalIndex):
+            valores = valores.astype(valores.categories.dtype)
+        idx["dims"][papel] = {"valores": valores, "bitmaps": bitmaps, "posicoes": posicoes}
+    col = colmap.get("data_pedido")
+    if col is not None and col in dfx.columns:
+        dias = pd.to_datetime(dfx[col], errors="coerce").dt.normalize().to_numpy()
+        ordem = np.argsort(dias, kind="stable").astype(np.int32)  # NaT vão para o fim
+        idx["datas"] = (ordem, dias[ordem])
+    return idx
+
+
+def _de_posicoes(pos, n) -> np.ndarray:
+    """Bitmap compactado com os bits de `pos` ligados."""
+    if len(pos) * DENSO > n:
+        b = np.zeros(n, dtype=bool)
+        b[pos] = True
+        return np.packbits(b)
+    bm = np.zeros((n + 7) // 8, dtype=np.uint8)
+    np.bitwise_or.at(bm, pos >> 3, (128 >> (pos & 7)).astype(np.uint8))
+    return bm
+
+
+def _uniao(d: dict, valores, n) -> np.ndarray:
+    """Bitmap das linhas com qualquer um de `valores` (OR dos bitmaps + posições dos raros)."""
+    bm = np.zeros((n + 7) // 8, dtype=np.uint8)
+    raros = []
+    for c in d["valores"].get_indexer(list(valores)):
+        if c in d["bitmaps"]:
+            np.bitwise_or(bm, d["bitmaps"][c], out=bm)
+        elif c in d["posicoes"]:
+            raros.append(d["posicoes"][c])
+    if raros:
+        np.bitwise_or(bm, _de_posicoes(np.concatenate(raros), n), out=bm)
+    return bm
+
+
+def selecionar(indice: dict, filtros: dict) -> np.ndarray:
+    """
+    Posições (ordenadas) das linhas que passam em `filtros`
+    ({"valores": {papel: [...]}, "periodo": (ini, fim)}); None = sem filtro.
+    """
+    n, bm = indice["n"], None
+    for papel, valores in filtros.get("valores", {}).items():
+        if valores and papel in indice["dims"]:
+            b = _uniao(indice["dims"][papel], valores, n)
+            bm = b if bm is None else np.bitwise_and(bm, b, out=bm)
+    if filtros.get("periodo") and indice["datas"] is not None:
+        ordem, dias = indice["datas"]
+        ini, fim = (pd.Timestamp(x).to_datetime64().astype(dias.dtype) for x in filtros["periodo"])
+        fatia = ordem[np.searchsorted(dias, ini, "left"):np.searchsorted(dias, fim, "right")]
+        b = _de_posicoes(fatia, n)
+        bm = b if bm is None else np.bitwise_and(bm, b, out=bm)
+    if bm is None:
+        return None
+    return np.flatnonzero(np.unpackbits(bm, count=n))
+
+
+def rotulo_filtros(filtros: dict) -> str:
+    """Sufixo estável da combinação de filtros (entra na impressão digital do recorte)."""
+    bruto = json.dumps(filtros, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(bruto.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,235 @@
+# core/incremental.py
+# -*- coding: utf-8 -*-
+import os, io, hashlib, threading
+import pandas as pd
+import streamlit as st
+
+from core.data import compactar_df
+from core.colunar import ler_colunar
+from core.dataset import eh_dataset, listar_arquivos, ler_dataset
+from core.derivados import converter_tipos, derivar_colunas
+from core.agregados import construir_cubo, mesclar_cubos
+from core.esquema import colunas_mapeadas
+
+# ----------------------------
+# Atualização incremental (linhas anexadas ao CSV / partições novas)
+# ----------------------------
+# Marca d'água por fonte: tamanho/mtime/hash do trecho já lido (CSV) ou
+# {arquivo: (mtime, tamanho)} (diretório de Parquet). Só o que entrou depois
+# dela é lido; o cubo parcial das linhas novas é mesclado ao cubo guardado.
+INCREMENTAL = os.environ.get("DASH_INCREMENTAL", "0") == "1"
+INCREMENTAL_SEG = float(os.environ.get("DASH_INCREMENTAL_SEG", "60"))
+_AMOSTRA_HASH = 64 * 1024
+
+
+@st.cache_resource
+def _estados():
+    """Estado por fonte, compartilhado entre sessões do processo (um lock por arquivo de origem)."""
+    return {"lock": threading.Lock(), "locks": {}, "fontes": {}}
+
+
+def _lock_fonte(estados, caminho) -> threading.Lock:
+    """Lock da fonte: a carga de um arquivo não bloqueia as sessões de outro."""
+    with estados["lock"]:
+        return estados["locks"].setdefault(os.path.abspath(caminho), threading.Lock())
+
+
+def _hash_trecho(caminho, fim) -> str:
+    """Hash do início e do fim do trecho [0, fim): detecta arquivo reescrito (não só anexado)."""
+    h = hashlib.sha1()
+    with open(caminho, "rb") as f:
+        h.update(f.read(min(fim, _AMOSTRA_HASH)))
+        f.seek(max(0, fim - _AMOSTRA_HASH))
+        h.update(f.read(min(fim, _AMOSTRA_HASH)))
+    return h.hexdigest()
+
+
+def marca_fonte(caminho: str) -> dict:
+    """Marca barata (só stat) do estado atual da fonte."""
+    if eh_dataset(caminho):
+        return {"arquivos": {p: (os.stat(p).st_mtime_ns, os.stat(p).st_size) for p in listar_arquivos(caminho)}}
+    s = os.stat(caminho)
+    return {"tamanho": s.st_size, "mtime": s.st_mtime_ns}
+
+# ----------------------------
+# Leitura do trecho novo
+# ----------------------------
+class _Trecho(io.RawIOBase):
+    """Arquivo aberto visto só até `tamanho` bytes adiante (o read_csv lê direto do disco)."""
+
+    def __init__(self, f, tamanho):
+        self.f, self.resta = f, tamanho
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self.f.readinto(memoryview(b)[:max(0, self.resta)]) or 0
+        self.resta -= n
+        return n
+
+
+def _fim_de_linha(caminho, ini, fim) -> int:
+    """Posição logo após o último '\\n' em [ini, fim) (ini se não houver), lendo de trás para frente."""
+    with open(caminho, "rb") as f:
+        pos = fim
+        while pos > ini:
+            passo = min(_AMOSTRA_HASH, pos - ini)
+            f.seek(pos - passo)
+            i = f.read(passo).rfind(b"\n")
+            if i >= 0:
+                return pos - passo + i + 1
+            pos -= passo
+    return ini
+
+
+def _ler_bytes_csv(caminho, ini, fim, cabecalho=None, colunas=None):
+    """
+    Linhas completas do CSV entre os bytes [ini, fim). Retorna (DataFrame, fim_consumido):
+    uma linha ainda sendo escrita (sem '\\n') fica para a próxima leitura.
+    """
+    corte = _fim_de_linha(caminho, ini, fim)
+    if cabecalho is not None and corte == ini:
+        return pd.DataFrame({c: pd.Series(dtype="object") for c in (colunas or cabecalho)}), ini
+    with open(caminho, "rb") as f:
+        f.seek(ini)
+        trecho = io.BufferedReader(_Trecho(f, corte - ini))
+        if cabecalho is None:
+            df = pd.read_csv(trecho, usecols=colunas)
+        else:
+            df = pd.read_csv(trecho, header=None, names=cabecalho, usecols=colunas)
+    return df, corte
+
+
+def _ler_csv_inteiro(caminho, marca, colunas):
+    """
+    Primeira leitura do CSV: pelo cache colunar (core.colunar), como a carga normal,
+    se o arquivo termina numa linha completa e não mudou durante a leitura; senão
+    pelo trecho [0, última linha completa). Retorna (DataFrame, fim_consumido).
+    """
+    fim = _fim_de_linha(caminho, 0, marca["tamanho"])
+    if fim == marca["tamanho"]:
+        df = ler_colunar(caminho, lambda p: pd.read_csv(p, usecols=colunas), colunas)
+        if marca_fonte(caminho) == marca:
+            return df, fim
+    return _ler_bytes_csv(caminho, 0, marca["tamanho"], colunas=colunas)
+
+
+def _alinhar(base: pd.DataFrame, novo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tipos das linhas novas iguais aos da base, para o concat não desfazer a
+    compactação: categorias ganham os valores novos (códigos antigos intactos) e
+    numéricos são convertidos ao tipo da base quando cabem sem perda.
+    """
+    for c in base.columns:
+        if c not in novo.columns:
+            continue
+        tb, s = base[c].dtype, novo[c]
+        if isinstance(tb, pd.CategoricalDtype):
+            extras = pd.Index(s.dropna().unique()).difference(tb.categories)
+            if len(extras):
+                base[c] = base[c].cat.add_categories(extras)
+            novo[c] = pd.Categorical(s, categories=base[c].cat.categories)
+        elif s.dtype != tb and pd.api.types.is_numeric_dtype(tb) and pd.api.types.is_numeric_dtype(s):
+            try:
+                conv = s.astype(tb)
+            except (TypeError, ValueError):
+                continue
+            if ((conv.astype("float64") == s.astype("float64")) | s.isna()).all():
+                novo[c] = conv
+    return novo
+
+
+def _preparar(df, colmap, perfil, compactar):
+    dfx = compactar_df(df) if compactar else df
+    dfx = dfx.copy(deep=False)
+    converter_tipos(dfx, colmap, perfil)
+    derivar_colunas(dfx, colmap)
+    dfx.attrs = {}
+    return dfx
+
+# ----------------------------
+# Carga completa / incremental
+# ----------------------------
+def _carga_completa(caminho, colmap, perfil, compactar, filtros):
+    colunas = colunas_mapeadas(colmap)
+    marca = marca_fonte(caminho)
+    if eh_dataset(caminho):
+        bruto = ler_dataset(caminho, colunas, filtros, arquivos=list(marca["arquivos"]))
+    else:
+        cab = list(pd.read_csv(caminho, nrows=0).columns)
+        bruto, fim = _ler_csv_inteiro(caminho, marca, colunas)
+        marca.update(consumido=fim, cabecalho=cab, hash=_hash_trecho(caminho, fim))
+    dfx = _preparar(bruto, colmap, perfil, compactar)
+    return {"marca": marca, "dfx": dfx, "cubo": construir_cubo(dfx, colmap), "versao": 0, "novas": len(dfx)}
+
+
+def _inalterada(antiga: dict, atual: dict) -> bool:
+    return all(antiga.get(k) == v for k, v in atual.items())
+
+
+def _novidades(caminho, antiga, atual, colunas, filtros):
+    """
+    Compara a marca guardada com a atual. Retorna (novas linhas ou None, marca nova);
+    (None, None) quando a fonte não foi só anexada (arquivo reescrito, partição alterada/removida).
+    """
+    if "arquivos" in antiga:
+        if any(atual["arquivos"].get(p) != v for p, v in antiga["arquivos"].items()):
+            return None, None
+        novos = [p for p in atual["arquivos"] if p not in antiga["arquivos"]]
+        return (ler_dataset(caminho, colunas, filtros, arquivos=novos) if novos else None), atual
+    ini = antiga["consumido"]
+    if atual["tamanho"] < ini or _hash_trecho(caminho, ini) != antiga["hash"]:
+        return None, None
+    bruto, fim = _ler_bytes_csv(caminho, ini, atual["tamanho"], antiga["cabecalho"], colunas)
+    atual.update(consumido=fim, cabecalho=antiga["cabecalho"], hash=_hash_trecho(caminho, fim))
+    return (bruto if len(bruto) else None), atual
+
+
+def carregar_incremental(caminho: str, colmap: dict, perfil: dict, compactar: bool = True, filtros: dict = None):
+    """
+    Base convertida + derivada e seu cubo, mantidos entre reruns/sessões.
+    Fonte inalterada: devolve o que está guardado. Só anexada (CSV crescendo
+    ou arquivos Parquet novos): lê apenas o trecho novo, mescla o cubo parcial
+    e concatena as linhas. Qualquer outra mudança: carga completa.
+    Retorna (dfx, cubo, info) — info = {"modo", "novas", "linhas", "marca"}.
+    """
+    ident = repr((os.path.abspath(caminho), tuple(colunas_mapeadas(colmap)), compactar,
+                  sorted((filtros or {}).items()), sorted((perfil.get("formatos_data") or {}).items())))
+    estados = _estados()
+    with _lock_fonte(estados, caminho):
+        est = estados["fontes"].get(ident)
+        atual = marca_fonte(caminho)
+        modo = "inalterado"
+        if est is None:
+            est, modo = _carga_completa(caminho, colmap, perfil, compactar, filtros), "completo"
+        elif not _inalterada(est["marca"], atual):
+            bruto, marca = _novidades(caminho, est["marca"], atual, colunas_mapeadas(colmap), filtros)
+            if marca is None:
+                est, modo = _carga_completa(caminho, colmap, perfil, compactar, filtros), "completo"
+            elif bruto is None:
+                est = {**est, "marca": marca}
+            else:
+                novo = _preparar(bruto, colmap, perfil, False)
+                base = est["dfx"].copy(deep=False)
+                novo = _alinhar(base, novo)
+                est = {"marca": marca, "dfx": pd.concat([base, novo], ignore_index=True),
+                       "cubo": mesclar_cubos(est["cubo"], construir_cubo(novo, colmap)),
+                       "versao": est["versao"] + 1, "novas": len(novo)}
+                modo = "incremental"
+        estados["fontes"][ident] = est
+
+    dfx = est["dfx"]
+    marca = {k: v for k, v in est["marca"].items() if k in ("tamanho", "mtime", "arquivos")}
+    # pela marca (estado da fonte já lido), não pela versão local: igual entre processos
+    chave = hashlib.sha1(repr((ident, est["marca"].get("consumido"), sorted(marca.items()))).encode("utf-8")).hexdigest()[:16]
+    dfx.attrs["fingerprint"] = f"inc:{chave}:{len(dfx)}"
+    return dfx, est["cubo"], {"modo": modo, "novas": est["novas"] if modo != "inalterado" else 0,
+                              "linhas": len(dfx), "marca": marca}
+
+
+@st.fragment(run_every=INCREMENTAL_SEG)
+def vigiar_fonte(caminho: str, marca: dict):
+    """Confere a fonte a cada INCREMENTAL_SEG (só stat) e reexecuta a página quando ela muda."""
+    if marca_fonte(caminho) != marca:
+        st.rerun()
@@ -0,0 +1,112 @@
+# core/momentos.py
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# ----------------------------
+# Momentos mescláveis (n, média, M2, co-momentos) e testes a partir deles
+# ----------------------------
+# M2 = Σ(x - média)²; a mesclagem usa a fórmula de Chan et al., estável
+# numericamente, então os momentos podem vir de blocos/partições.
+
+def momentos(x) -> dict:
+    """n, média e M2 de uma série (NaN/não numéricos ignorados)."""
+    v = pd.to_numeric(pd.Series(x), errors="coerce").dropna().to_numpy(dtype="float64")
+    n = len(v)
+    media = float(v.mean()) if n else 0.0
+    return {"n": n, "media": media, "m2": float(((v - media) ** 2).sum()) if n else 0.0}
+
+
+def momentos_cubo(cubo: dict, dim: str, medida: str = "valor_pedido") -> pd.DataFrame:
+    """Momentos (n, media, m2) de `medida` por grupo de `dim`, lidos do cubo de agregados."""
+    tab = cubo[dim]
+    return pd.DataFrame({"n": tab[f"{medida}_n"], "media": tab[f"{medida}_media"],
+                         "m2": tab[f"{medida}_m2"]}).dropna(subset=["media"])
+
+
+def mesclar_momentos(a: dict, b: dict) -> dict:
+    n = a["n"] + b["n"]
+    if not n:
+        return dict(a)
+    delta = b["media"] - a["media"]
+    return {"n": n, "media": a["media"] + delta * b["n"] / n,
+            "m2": a["m2"] + b["m2"] + delta ** 2 * a["n"] * b["n"] / n}
+
+
+def comomentos(x, y) -> dict:
+    """Momentos conjuntos de pares válidos: n, médias, M2 de x e y, co-momento C e mín/máx de x."""
+    x = np.asarray(x, dtype="float64"); y = np.asarray(y, dtype="float64")
+    ok = ~(np.isnan(x) | np.isnan(y))
+    x = x[ok]; y = y[ok]
+    n = len(x)
+    if not n:
+        return {"n": 0, "mx": 0.0, "my": 0.0, "m2x": 0.0, "m2y": 0.0, "cxy": 0.0, "xmin": np.inf, "xmax": -np.inf}
+    mx, my = float(x.mean()), float(y.mean())
+    dx, dy = x - mx, y - my
+    return {"n": n, "mx": mx, "my": my, "m2x": float(np.dot(dx, dx)), "m2y": float(np.dot(dy, dy)),
+            "cxy": float(np.dot(dx, dy)), "xmin": float(x.min()), "xmax": float(x.max())}
+
+
+def mesclar_comomentos(a: dict, b: dict) -> dict:
+    n = a["n"] + b["n"]
+    if not a["n"] or not b["n"]:
+        return dict(a if a["n"] else b)
+    dx, dy = b["mx"] - a["mx"], b["my"] - a["my"]
+    f = a["n"] * b["n"] / n
+    return {"n": n, "mx": a["mx"] + dx * b["n"] / n, "my": a["my"] + dy * b["n"] / n,
+            "m2x": a["m2x"] + b["m2x"] + dx * dx * f, "m2y": a["m2y"] + b["m2y"] + dy * dy * f,
+            "cxy": a["cxy"] + b["cxy"] + dx * dy * f,
+            "xmin": min(a["xmin"], b["xmin"]), "xmax": max(a["xmax"], b["xmax"])}
+
+# ----------------------------
+# Testes / intervalos (mesmas distribuições do scipy)
+# ----------------------------
+def welch_t(a: dict, b: dict):
+    """t de Welch e p-valor bicaudal (equivale a stats.ttest_ind(equal_var=False)). None se n < 2."""
+    if a["n"] < 2 or b["n"] < 2:
+        return None
+    va, vb = a["m2"] / (a["n"] - 1) / a["n"], b["m2"] / (b["n"] - 1) / b["n"]
+    se2 = va + vb
+    if se2 <= 0:
+        return None
+    t = (a["media"] - b["media"]) / np.sqrt(se2)
+    gl = se2 ** 2 / (va ** 2 / (a["n"] - 1) + vb ** 2 / (b["n"] - 1))
+    return float(t), float(2 * stats.t.sf(abs(t), gl))
+
+
+def anova_f(grupos: pd.DataFrame):
+    """ANOVA de um fator a partir de momentos por grupo (colunas n, media, m2). (F, p) ou None."""
+    g = grupos[grupos["n"] >= 2]
+    k, n = len(g), g["n"].sum()
+    if k < 2 or n <= k:
+        return None
+    media = (g["n"] * g["media"]).sum() / n
+    ssb = (g["n"] * (g["media"] - media) ** 2).sum()
+    ssw = g["m2"].sum()
+    if ssw <= 0:
+        return None
+    f = (ssb / (k - 1)) / (ssw / (n - k))
+    return float(f), float(stats.f.sf(f, k - 1, n - k))
+
+
+def pearson(c: dict):
+    """r de Pearson e p-valor bicaudal a partir dos co-momentos. None se n < 3."""
+    n = c["n"]
+    if n < 3 or c["m2x"] <= 0 or c["m2y"] <= 0:
+        return None
+    r = float(np.clip(c["cxy"] / np.sqrt(c["m2x"] * c["m2y"]), -1.0, 1.0))
+    if abs(r) == 1.0:
+        return r, 0.0
+    t = r * np.sqrt((n - 2) / (1 - r * r))
+    return r, float(2 * stats.t.sf(abs(t), n - 2))
+
+
+def ic_t(m: dict, conf=0.95):
+    """IC t de Student da média. (li, ls, media, n) ou None se n < 2."""
+    n = m["n"]
+    if n < 2:
+        return None
+    se = np.sqrt(m["m2"] / (n - 1)) / np.sqrt(n)
+    tcrit = stats.t.ppf(1 - (1 - conf) / 2, df=n - 1)
+    return m["media"] - tcrit * se, m["media"] + tcrit * se, m["media"], n
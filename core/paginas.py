@@ -0,0 +1,21 @@
+# core/paginas.py
+# -*- coding: utf-8 -*-
+import importlib
+
+# ----------------------------
+# Registro de páginas (import sob demanda)
+# ----------------------------
+# Rótulo do menu -> módulo com `render()`. O módulo (e o que ele importa:
+# matplotlib, seaborn, scipy, plotly...) só é carregado na primeira visita;
+# depois fica em sys.modules e as visitas seguintes não pagam nada.
+PAGINAS = {
+    "Home": "app_pages.home",
+    "Formação e Experiência": "app_pages.formacao",
+    "Skills": "app_pages.skills",
+    "Análise de Dados": "app_pages.analise",
+}
+
+
+def carregar_pagina(nome: str):
+    """Módulo da página `nome` (importado na primeira chamada)."""
+    return importlib.import_module(PAGINAS[nome])
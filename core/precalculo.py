@@ -0,0 +1,116 @@
+# core/precalculo.py
+# -*- coding: utf-8 -*-
+import os, sys, time, threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import streamlit as st
+
+# ----------------------------
+# Pré-cálculo em segundo plano (pool de threads por processo)
+# ----------------------------
+# Assim que a base carrega, o cubo e as análises que releem linhas (boxplots,
+# dispersão) vão para um pool; a página desenha o que já está pronto e, no lugar
+# do resto, um aviso que se confere a cada PRECALC_POLL_SEG e reexecuta a página quando chega.
+# Threads, não processos: a base já está na memória do processo e numpy/pandas
+# soltam o GIL nas ordenações e agrupamentos (um processo teria de serializá-la).
+PRECALC = os.environ.get("DASH_PRECALC", "1") != "0"
+PRECALC_THREADS = int(os.environ.get("DASH_PRECALC_THREADS", str(min(16, os.cpu_count() or 1))))
+PRECALC_POLL_SEG = float(os.environ.get("DASH_PRECALC_POLL_SEG", "0.5"))
+# Resultados guardados até PRECALC_MAX_MB (estimado); saem os menos usados, mas
+# nunca um usado há menos de PRECALC_RETER_SEG (a página ainda vai lê-lo).
+PRECALC_MAX_MB = float(os.environ.get("DASH_PRECALC_MAX_MB", "512"))
+PRECALC_RETER_SEG = float(os.environ.get("DASH_PRECALC_RETER_SEG", "30"))
+
+
+@st.cache_resource(show_spinner=False)
+def _agenda() -> dict:
+    """Pool + tarefas ({chave: Future}, bytes e último uso) compartilhados por todas as sessões do processo."""
+    return {"pool": ThreadPoolExecutor(max_workers=max(1, PRECALC_THREADS), thread_name_prefix="precalculo"),
+            "tarefas": OrderedDict(), "bytes": {}, "uso": {}, "lock": threading.Lock()}
+
+
+def _bytes(valor) -> int:
+    """Tamanho aproximado de um resultado (arrays, DataFrames e contêineres deles)."""
+    if hasattr(valor, "memory_usage"):  # DataFrame, Series e Index (índice incluído por padrão)
+        uso = valor.memory_usage()
+        return int(uso.sum() if hasattr(uso, "sum") else uso)
+    if hasattr(valor, "nbytes"):
+        return int(valor.nbytes)
+    if isinstance(valor, dict):
+        return sum(_bytes(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sum(_bytes(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+def _liberar(ag):
+    """Tira os resultados concluídos menos usados até caber em PRECALC_MAX_MB (chamar com o lock)."""
+    total = sum(ag["bytes"].values())
+    limite, agora = PRECALC_MAX_MB * 1024 * 1024, time.monotonic()
+    for chave in list(ag["tarefas"]):
+        if total <= limite:
+            break
+        if chave in ag["bytes"] and agora - ag["uso"][chave] > PRECALC_RETER_SEG:
+            total -= ag["bytes"].pop(chave)
+            del ag["tarefas"][chave], ag["uso"][chave]
+
+
+def _concluida(ag, chave, fut):
+    try:
+        tam = _bytes(fut.result()) if fut.exception() is None else 0
+    except Exception:
+        tam = 0
+    with ag["lock"]:
+        if ag["tarefas"].get(chave) is fut:
+            ag["bytes"][chave] = tam
+            _liberar(ag)
+
+
+def _imediato(fn, *args, **kwargs) -> Future:
+    fut = Future()
+    try:
+        fut.set_result(fn(*args, **kwargs))
+    except Exception as e:
+        fut.set_exception(e)
+    return fut
+
+
+def agendar(chave, fn, *args, **kwargs) -> Future:
+    """
+    Future de `fn(*args, **kwargs)` identificado por `chave` (hashable, com a
+    impressão digital da base). Repetir a chave devolve a mesma tarefa; uma
+    tarefa que falhou é reagendada. Com DASH_PRECALC=0 roda na hora.
+    """
+    ag = _agenda()
+    with ag["lock"]:
+        ag["uso"][chave] = time.monotonic()
+        fut = ag["tarefas"].get(chave)
+        if fut is not None and not (fut.done() and fut.exception() is not None):
+            ag["tarefas"].move_to_end(chave)
+            return fut
+        ag["bytes"].pop(chave, None)
+        fut = ag["pool"].submit(fn, *args, **kwargs) if PRECALC else _imediato(fn, *args, **kwargs)
+        ag["tarefas"][chave] = fut
+        ag["tarefas"].move_to_end(chave)
+    # fora do lock: um Future já concluído chama o callback na hora
+    fut.add_done_callback(lambda f: _concluida(ag, chave, f))
+    return fut
+
+
+def esperar(*futuros, texto: str = "Calculando em segundo plano") -> bool:
+    """
+    True se todos os `futuros` terminaram (use `.result()` em seguida). Senão
+    desenha um aviso no lugar do conteúdo, que reexecuta a página ao concluir.
+    """
+    if all(f.done() for f in futuros):
+        return True
+    _aguardando(futuros, texto)
+    return False
+
+
+@st.fragment(run_every=PRECALC_POLL_SEG)
+def _aguardando(futuros, texto):
+    prontos = sum(f.done() for f in futuros)
+    if prontos == len(futuros):
+        st.rerun()
+    st.info(f"⏳ {texto}… ({prontos}/{len(futuros)})")
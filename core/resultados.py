@@ -0,0 +1,166 @@
+# core/resultados.py
+# -*- coding: utf-8 -*-
+import os, glob, json, time, pickle, sqlite3, hashlib, inspect, threading, functools
+
+# ----------------------------
+# Cache de resultados em disco, compartilhado entre processos (SQLite)
+# ----------------------------
+# Agregados, estatísticas e PNGs ficam numa tabela SQLite (modo WAL: vários
+# workers do mesmo host leem e gravam ao mesmo tempo). Chave = nome da função
+# + argumentos (os de nome iniciado por "_" ficam de fora, como no
+# st.cache_data) — onde entra a impressão digital da base. Limite em bytes
+# (LRU pelo último uso) e validade (TTL). Qualquer falha vira "não achei".
+# Toda chave leva a versão do código (hash das fontes de core/ e app_pages/):
+# mudar qualquer função que produz os valores invalida o que foi gravado antes.
+RESULTADOS = os.environ.get("DASH_RESULTADOS", "1") != "0"
+RESULTADOS_DB = os.environ.get("DASH_RESULTADOS_DB",
+                               os.path.join(os.environ.get("DASH_CACHE_DIR", ".cache"), "resultados.sqlite"))
+RESULTADOS_MAX_MB = float(os.environ.get("DASH_RESULTADOS_MAX_MB", "1024"))
+RESULTADOS_TTL_H = float(os.environ.get("DASH_RESULTADOS_TTL_H", "168"))
+VERSAO = 2  # entra na versão do código; mudar invalida tudo mesmo sem mudar as fontes
+_TOQUE_SEG = 60  # "usado" só é regravado se a marca for mais velha que isto
+_AUSENTE = object()
+_local = threading.local()
+_gravacoes = [0]
+
+
+def _versao_codigo() -> str:
+    """Hash de VERSAO + fontes .py de core/ e app_pages/ (o código que produz os valores guardados)."""
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    h = hashlib.sha1(str(VERSAO).encode("utf-8"))
+    for pasta in ("core", "app_pages"):
+        for p in sorted(glob.glob(os.path.join(raiz, pasta, "*.py"))):
+            try:
+                with open(p, "rb") as f:
+                    h.update(os.path.basename(p).encode("utf-8"))
+                    h.update(f.read())
+            except OSError:
+                continue
+    return h.hexdigest()[:16]
+
+
+VERSAO_CODIGO = _versao_codigo()
+
+
+def _chave_db(chave: str) -> str:
+    return f"{VERSAO_CODIGO}:{chave}"
+
+
+def _conexao():
+    """Uma conexão por thread (sqlite3 não compartilha conexões entre threads)."""
+    con = getattr(_local, "con", None)
+    if con is None:
+        os.makedirs(os.path.dirname(RESULTADOS_DB) or ".", exist_ok=True)
+        con = sqlite3.connect(RESULTADOS_DB, timeout=30, isolation_level=None)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("CREATE TABLE IF NOT EXISTS resultados (chave TEXT PRIMARY KEY, valor BLOB NOT NULL, "
+                    "bytes INTEGER NOT NULL, criado REAL NOT NULL, usado REAL NOT NULL)")
+        con.execute("CREATE INDEX IF NOT EXISTS resultados_usado ON resultados(usado)")
+        _local.con = con
+    return con
+
+
+def chave_resultado(nome: str, *partes) -> str:
+    bruto = json.dumps([nome, *partes], sort_keys=True, default=repr, ensure_ascii=False)
+    return hashlib.sha1(bruto.encode("utf-8")).hexdigest()
+
+
+def obter(chave: str, padrao=_AUSENTE):
+    """Valor guardado em `chave` (ou `padrao`); vencidos pelo TTL contam como ausentes."""
+    if not RESULTADOS:
+        return padrao
+    chave = _chave_db(chave)
+    try:
+        con = _conexao()
+        linha = con.execute("SELECT valor, criado, usado FROM resultados WHERE chave = ?", (chave,)).fetchone()
+        if linha is None:
+            return padrao
+        agora = time.time()
+        if agora - linha[1] > RESULTADOS_TTL_H * 3600:
+            con.execute("DELETE FROM resultados WHERE chave = ?", (chave,))
+            return padrao
+        if agora - linha[2] > _TOQUE_SEG:
+            con.execute("UPDATE resultados SET usado = ? WHERE chave = ?", (agora, chave))
+        return pickle.loads(linha[0])
+    except (sqlite3.Error, OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return padrao
+
+
+def guardar(chave: str, valor):
+    """Grava `valor` (pickle) e, a cada algumas gravações, aplica TTL e limite de tamanho."""
+    if not RESULTADOS:
+        return
+    try:
+        blob = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return
+    if len(blob) > RESULTADOS_MAX_MB * 1024 * 1024:
+        return
+    chave = _chave_db(chave)
+    try:
+        agora = time.time()
+        _conexao().execute("INSERT OR REPLACE INTO resultados VALUES (?, ?, ?, ?, ?)",
+                           (chave, sqlite3.Binary(blob), len(blob), agora, agora))
+        _gravacoes[0] += 1
+        if _gravacoes[0] % 16 == 1:
+            limpar()
+    except (sqlite3.Error, OSError):
+        pass
+
+
+def limpar(limite_mb: float = None):
+    """Remove vencidos (TTL) e os menos usados até caber em `limite_mb`."""
+    limite = (RESULTADOS_MAX_MB if limite_mb is None else limite_mb) * 1024 * 1024
+    con = _conexao()
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        con.execute("DELETE FROM resultados WHERE criado < ?", (time.time() - RESULTADOS_TTL_H * 3600,))
+        total = con.execute("SELECT COALESCE(SUM(bytes), 0) FROM resultados").fetchone()[0]
+        if total > limite:
+            fora = []
+            for chave, tam in con.execute("SELECT chave, bytes FROM resultados ORDER BY usado"):
+                if total <= limite:
+                    break
+                fora.append((chave,))
+                total -= tam
+            con.executemany("DELETE FROM resultados WHERE chave = ?", fora)
+        con.execute("COMMIT")
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+
+
+def resumo() -> dict:
+    """{"itens", "mb"} do cache em disco (para diagnóstico)."""
+    try:
+        n, b = _conexao().execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM resultados").fetchone()
+        return {"itens": n, "mb": b / 1e6}
+    except (sqlite3.Error, OSError):
+        return {"itens": 0, "mb": 0.0}
+
+
+def cache_disco(fn=None, *, nome: str = None):
+    """
+    Decorador: resultado guardado no cache em disco, por nome + argumentos.
+    Usar por baixo do @st.cache_data (memória do processo primeiro, disco
+    depois, cálculo por último). Argumentos com "_" no início não entram na chave.
+    """
+    def deco(f):
+        sig = inspect.signature(f)
+        rotulo = nome or f"{f.__module__}.{f.__qualname__}"
+
+        @functools.wraps(f)
+        def envolvida(*args, **kwargs):
+            if not RESULTADOS:
+                return f(*args, **kwargs)
+            b = sig.bind(*args, **kwargs)
+            b.apply_defaults()
+            chave = chave_resultado(rotulo, [(k, v) for k, v in b.arguments.items() if not k.startswith("_")])
+            valor = obter(chave)
+            if valor is _AUSENTE:
+                valor = f(*args, **kwargs)
+                guardar(chave, valor)
+            return valor
+        return envolvida
+    return deco if fn is None else deco(fn)
@@ -0,0 +1,142 @@
+# core/resumos.py
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+import pandas as pd
+
+from core.agregados import BORDAS_VALOR
+
+# ----------------------------
+# Resumos de boxplot (5 números + outliers) sem passar linhas ao seaborn
+# ----------------------------
+BOX_EXATO_MAX = int(os.environ.get("DASH_BOX_EXATO_MAX", "1000000"))
+MAX_OUTLIERS = 200
+
+
+def _quantis_ordenados(vs, starts, counts, q):
+    """Quantil q (interpolação linear, como np.percentile) de cada grupo já ordenado."""
+    pos = starts + q * (counts - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, starts + counts - 1)
+    return vs[lo] + (pos - lo) * (vs[hi] - vs[lo])
+
+
+def _amostra_por_grupo(cod, k, rng):
+    """Posições de até k elementos por grupo, escolhidos ao acaso."""
+    perm = rng.permutation(len(cod))
+    rank = pd.Series(cod[perm]).groupby(cod[perm]).cumcount().to_numpy()
+    return np.sort(perm[rank < k])
+
+
+def resumo_boxplot(valores, grupos, max_outliers=MAX_OUTLIERS, seed=0) -> dict:
+    """
+    Quartis, bigodes (1,5·IQR) e amostra limitada de outliers de cada grupo,
+    numa única ordenação (lexsort por grupo, valor). Retorna
+    {grupo: dict no formato de `Axes.bxp`} com `n` por grupo.
+    """
+    v = pd.to_numeric(pd.Series(valores), errors="coerce").to_numpy(dtype="float64")
+    cod, rotulos = pd.factorize(pd.Series(grupos), sort=True)
+    ok = (cod >= 0) & ~np.isnan(v)
+    v, cod = v[ok], cod[ok]
+    if not len(v):
+        return {}
+    ordem = np.lexsort((v, cod))
+    vs, cs = v[ordem], cod[ordem]
+    counts = np.bincount(cs, minlength=len(rotulos))
+    presentes = np.flatnonzero(counts)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[presentes]
+    n = counts[presentes]
+    q1, med, q3 = (_quantis_ordenados(vs, starts, n, q) for q in (0.25, 0.5, 0.75))
+
+    # bigodes: extremos dentro de [Q1 - 1,5·IQR, Q3 + 1,5·IQR] do próprio grupo
+    mapa = np.full(len(rotulos), -1); mapa[presentes] = np.arange(len(presentes))
+    gi = mapa[cs]
+    iqr = q3 - q1
+    dentro = (vs >= (q1 - 1.5 * iqr)[gi]) & (vs <= (q3 + 1.5 * iqr)[gi])
+    lim = pd.Series(vs[dentro]).groupby(gi[dentro]).agg(["min", "max"])
+    fora = np.flatnonzero(~dentro)
+    fora = fora[_amostra_por_grupo(gi[fora], max_outliers, np.random.default_rng(seed))]
+    # os extremos de cada grupo sempre entram (a escala do eixo não muda com a amostra)
+    extremos = np.concatenate((starts, starts + n - 1))
+    fora = np.union1d(fora, extremos[~dentro[extremos]])
+
+    out = {}
+    for j, g in enumerate(presentes):
+        out[rotulos[g]] = {
+            "label": str(rotulos[g]), "n": int(n[j]),
+            "q1": q1[j], "med": med[j], "q3": q3[j],
+            "whislo": lim["min"].get(j, q1[j]), "whishi": lim["max"].get(j, q3[j]),
+            "fliers": vs[fora[gi[fora] == j]],
+        }
+    return out
+
+
+def _valor_no_hist(contagens, alvo):
+    """Valor aproximado onde a contagem acumulada atinge `alvo` (linear dentro do bin)."""
+    acum = np.cumsum(contagens)
+    i = min(int(np.searchsorted(acum, alvo)), len(contagens) - 1)
+    antes = acum[i - 1] if i else 0
+    frac = (alvo - antes) / contagens[i] if contagens[i] else 0.0
+    lo, hi = np.clip(BORDAS_VALOR[i:i + 2], BORDAS_VALOR[1], BORDAS_VALOR[-2])
+    return lo + frac * (hi - lo)
+
+
+def _amostra_fliers(f, k, rng):
+    """Até k outliers ao acaso, mais o mínimo e o máximo (como em `resumo_boxplot`)."""
+    if len(f) <= k:
+        return f
+    manter = _amostra_por_grupo(np.zeros(len(f), dtype=np.intp), k, rng)
+    return f[np.union1d(manter, [np.argmin(f), np.argmax(f)])]
+
+
+def resumo_por_hist(hist: pd.Series, grupo, fliers=None, seed=0) -> dict:
+    """
+    Resumo aproximado de um grupo a partir do histograma do cubo
+    (`cubo["_hist_valor"][dim]`), para grupos enormes ou dados lidos em streaming.
+    `fliers` (opcional) são valores observados do grupo; ficam os que caem fora
+    dos bigodes, amostrados como em `resumo_boxplot`.
+    """
+    h = hist.xs(grupo, level=0).reindex(range(len(BORDAS_VALOR) - 1), fill_value=0).to_numpy()
+    total = h.sum()
+    q1, med, q3 = (_valor_no_hist(h, q * total) for q in (0.25, 0.5, 0.75))
+    nz = np.flatnonzero(h)
+    minimo = max(BORDAS_VALOR[nz[0]], BORDAS_VALOR[1])
+    maximo = min(BORDAS_VALOR[nz[-1] + 1], BORDAS_VALOR[-2])
+    iqr = q3 - q1
+    whislo, whishi = max(q1 - 1.5 * iqr, minimo), min(q3 + 1.5 * iqr, maximo)
+    f = np.asarray([] if fliers is None else fliers, dtype="float64")
+    f = _amostra_fliers(f[(f < whislo) | (f > whishi)], MAX_OUTLIERS, np.random.default_rng(seed))
+    return {"label": str(grupo), "n": int(total), "q1": q1, "med": med, "q3": q3,
+            "whislo": whislo, "whishi": whishi, "fliers": f}
+
+
+def resumos_boxplot(dfx, colmap, cubo, dim, grupos=None) -> list:
+    """
+    Resumos de `valor_pedido` por grupo de `dim`, prontos para `Axes.bxp`.
+    Exatos quando `dfx` tem todas as linhas e o grupo é pequeno; aproximados
+    pelo histograma do cubo para grupos acima de BOX_EXATO_MAX ou quando
+    `dfx` é só uma amostra (modo streaming).
+    """
+    v = dfx[colmap["valor_pedido"]]
+    g = dfx[colmap[dim]]
+    if grupos is not None:
+        sel = g.isin(grupos)
+        v, g = v[sel], g[sel]
+    completo = len(dfx) == int(cubo["_total"]["pedidos"].iloc[0])
+    n_grupo = cubo[dim]["valor_pedido_n"]
+    hist = cubo.get("_hist_valor", {}).get(dim)
+    grandes = set() if hist is None else set(n_grupo.index[n_grupo > BOX_EXATO_MAX] if completo else n_grupo.index)
+    if hist is not None:
+        grandes &= set(hist.index.get_level_values(0))
+    if grupos is not None:
+        grandes &= set(grupos)
+
+    eh_grande = g.isin(list(grandes))
+    out = resumo_boxplot(v[~eh_grande], g[~eh_grande])
+    for grp in grandes:
+        # bigodes primeiro (só o histograma); das linhas do grupo saem apenas os outliers
+        r = resumo_por_hist(hist, grp)
+        fora = (g == grp) & ((v < r["whislo"]) | (v > r["whishi"]))
+        out[grp] = resumo_por_hist(hist, grp, fliers=v[fora].to_numpy(dtype="float64"))
+    ordem = list(grupos) if grupos is not None else sorted(out, key=str)
+    return [out[k] for k in ordem if k in out]
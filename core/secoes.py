@@ -0,0 +1,20 @@
+# core/secoes.py
+# -*- coding: utf-8 -*-
+import streamlit as st
+
+from core.spans import span
+
+# ----------------------------
+# Seções sob demanda (alternativa lazy ao st.tabs)
+# ----------------------------
+def secao_lazy(secoes: dict, *args, key: str = "secao_ativa", **kwargs):
+    """
+    Mostra um seletor com os nomes de `secoes` ({nome: função}) e executa só a
+    função da seção escolhida, repassando *args/**kwargs. Ao contrário de
+    st.tabs, as seções não visíveis não calculam nem desenham nada; o que
+    elas calculam fica no cache (st.cache_data) para a próxima visita.
+    """
+    nomes = list(secoes)
+    escolha = st.radio("Seção", nomes, horizontal=True, key=key, label_visibility="collapsed")
+    with span(f"secao:{escolha}"):
+        return secoes[escolha](*args, **kwargs)
@@ -0,0 +1,95 @@
+# core/sketches.py
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+import pandas as pd
+
+# ----------------------------
+# Resumos de memória limitada: top-K (Space-Saving) e distintos (HyperLogLog)
+# ----------------------------
+# Dimensões de cardinalidade alta (produto/SKU, região) podem ter centenas de
+# milhares de valores. Ao mesclar cubos (streaming, partições, incremental),
+# acima de TOPK_MAX_EXATO linhas a tabela da dimensão vira um resumo
+# Space-Saving: só os TOPK_CAPACIDADE maiores de cada coluna de ranking ficam,
+# cada um com `<coluna>_erro` (superestimativa máxima), e o "piso" limita o
+# valor de qualquer item fora da lista. Resumos de blocos e partições se
+# mesclam sem perder as garantias. O cubo de uma base inteira em memória
+# (construir_cubo) fica sempre exato. Modo exato: DASH_TOPK=0.
+TOPK = os.environ.get("DASH_TOPK", "auto")  # auto | 1 (sempre resume ao mesclar) | 0 (sempre exato)
+TOPK_MAX_EXATO = int(os.environ.get("DASH_TOPK_MAX_EXATO", "50000"))
+TOPK_CAPACIDADE = int(os.environ.get("DASH_TOPK_CAPACIDADE", "2000"))
+RANKING = ["pedidos", "valor_pedido_soma"]  # colunas com garantia de top-K (contagem e soma não negativa)
+HLL_P = 14  # 2^14 registradores (16 KB): erro padrão ≈ 1,04/√m ≈ 0,8%
+
+
+def podar(tab: pd.DataFrame, pisos: dict) -> tuple:
+    """
+    (tabela, pisos) depois de manter só os TOPK_CAPACIDADE maiores de cada
+    coluna de RANKING. `pisos` vazio = tabela exata; ela só é resumida quando
+    passa de TOPK_MAX_EXATO linhas (ou sempre, com DASH_TOPK=1).
+    """
+    if TOPK == "0" or (not pisos and TOPK != "1" and len(tab) <= TOPK_MAX_EXATO):
+        return tab, pisos
+    cols = [c for c in RANKING if c in tab.columns]
+    manter = np.zeros(len(tab), dtype=bool)
+    for c in cols:
+        v = tab[c].fillna(0).to_numpy()
+        manter[np.argsort(-v, kind="stable")[:TOPK_CAPACIDADE]] = True
+    if manter.all() and not pisos:
+        return tab, pisos
+    fora = tab[~manter]
+    novos = {c: max(float(pisos.get(c, 0.0)), float(fora[c].max()) if len(fora) else 0.0) for c in cols}
+    tab = tab[manter].copy()
+    for c in cols:
+        if f"{c}_erro" not in tab.columns:
+            tab[f"{c}_erro"] = 0.0
+    return tab, novos
+
+
+def preencher(tab: pd.DataFrame, pisos: dict, indice: pd.Index) -> pd.DataFrame:
+    """
+    Estende um resumo a `indice` para a mesclagem: itens ausentes recebem o
+    piso como valor e como erro (o máximo que podem ter tido neste lado).
+    """
+    out = tab.reindex(indice)
+    for c in RANKING:
+        if c in out.columns and f"{c}_erro" not in out.columns:
+            out[f"{c}_erro"] = 0.0
+    for c, piso in pisos.items():
+        faltam = out[c].isna()
+        out[c] = out[c].fillna(piso)
+        out[f"{c}_erro"] = out[f"{c}_erro"].where(~faltam, piso)
+    return out
+
+
+def _hashes(serie: pd.Series) -> np.ndarray:
+    """Hash de 64 bits (determinístico entre processos) dos valores não nulos."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        cod = serie.cat.codes.to_numpy()
+        return pd.util.hash_array(serie.cat.categories.to_numpy())[cod[cod >= 0]]
+    v = serie.dropna().to_numpy()
+    return pd.util.hash_array(v) if len(v) else np.empty(0, dtype="uint64")
+
+
+def hll_registros(serie: pd.Series) -> np.ndarray:
+    """Registradores HyperLogLog (uint8, 2^HLL_P) dos valores de `serie`; mesclar = np.maximum."""
+    h = _hashes(serie)
+    reg = np.zeros(1 << HLL_P, dtype=np.uint8)
+    if len(h):
+        idx = (h >> np.uint64(64 - HLL_P)).astype(np.intp)
+        # posição do primeiro bit 1 nos 32 bits seguintes (exato em float64)
+        w = ((h << np.uint64(HLL_P)) >> np.uint64(32)).astype("float64")
+        rank = np.where(w > 0, 32 - np.floor(np.log2(np.maximum(w, 1.0))), 33).astype(np.uint8)
+        np.maximum.at(reg, idx, rank)
+    return reg
+
+
+def hll_estimativa(reg: np.ndarray) -> float:
+    """Nº estimado de distintos (HyperLogLog com correção por contagem linear em cardinalidades baixas)."""
+    m = len(reg)
+    alfa = 0.7213 / (1 + 1.079 / m)
+    est = alfa * m * m / np.sum(np.exp2(-reg.astype("float64")))
+    zeros = int(np.count_nonzero(reg == 0))
+    if est <= 2.5 * m and zeros:
+        est = m * np.log(m / zeros)
+    return float(est)
@@ -0,0 +1,167 @@
+# core/spans.py
+# -*- coding: utf-8 -*-
+import os, json, time, threading, functools
+import streamlit as st
+
+# ----------------------------
+# Instrumentação dos trechos quentes (spans por rerun)
+# ----------------------------
+# pandas/matplotlib só são importados ao montar o painel (instrumentação ligada).
+# Desligada, `span()` devolve sempre o mesmo objeto vazio: custo de uma
+# consulta a um thread-local por trecho. Ligada (toggle na sidebar ou
+# DASH_SPANS=1), cada rerun guarda nome, profundidade, início, duração e
+# variação de RSS de cada trecho.
+SPANS = os.environ.get("DASH_SPANS", "0") == "1"
+SPANS_ARQUIVO = os.environ.get("DASH_SPANS_ARQUIVO",
+                               os.path.join(os.environ.get("DASH_CACHE_DIR", ".cache"), "spans", "spans.jsonl"))
+_PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_atual = threading.local()
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGINA / 1e6
+    except (OSError, ValueError, IndexError):
+        return float("nan")
+
+
+class _Nulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULO = _Nulo()
+
+
+class _Span:
+    __slots__ = ("rastro", "nome", "attrs", "t0", "rss0", "prof")
+
+    def __init__(self, rastro, nome, attrs):
+        self.rastro, self.nome, self.attrs = rastro, nome, attrs
+
+    def __enter__(self):
+        self.prof = len(self.rastro["pilha"])
+        self.rastro["pilha"].append(self.nome)
+        self.rss0 = _rss_mb()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, *exc):
+        t1 = time.perf_counter()
+        r = self.rastro
+        r["pilha"].pop()
+        r["spans"].append({"nome": self.nome, "prof": self.prof, "pai": r["pilha"][-1] if r["pilha"] else None,
+                           "inicio_ms": round((self.t0 - r["t0"]) * 1e3, 3), "ms": round((t1 - self.t0) * 1e3, 3),
+                           "rss_delta_mb": round(_rss_mb() - self.rss0, 2), "erro": tipo is not None and tipo.__name__,
+                           **self.attrs})
+        return False
+
+
+def span(nome: str, **attrs):
+    """`with span("leitura"): ...` — mede o trecho se houver rastro ativo nesta execução."""
+    rastro = getattr(_atual, "rastro", None)
+    return _NULO if rastro is None else _Span(rastro, nome, attrs)
+
+
+def instrumentado(nome: str = None):
+    """Decorador: a função inteira vira um span (nome padrão = nome da função)."""
+    def deco(fn):
+        rotulo = nome or fn.__name__
+
+        @functools.wraps(fn)
+        def envolvida(*args, **kwargs):
+            with span(rotulo):
+                return fn(*args, **kwargs)
+        return envolvida
+    return deco
+
+
+def iniciar_rastro(ativo: bool, **meta):
+    """Começa (ou desliga) o rastro da execução corrente do script."""
+    _atual.rastro = {"t0": time.perf_counter(), "quando": time.time(), "pilha": [], "spans": [], **meta} \
+        if ativo else None
+
+
+def encerrar_rastro():
+    """Fecha o rastro da execução corrente; devolve-o (ou None se desligado)."""
+    rastro = getattr(_atual, "rastro", None)
+    _atual.rastro = None
+    if rastro is not None:
+        rastro["total_ms"] = round((time.perf_counter() - rastro["t0"]) * 1e3, 3)
+    return rastro
+
+
+def exportar_jsonl(rastro: dict, caminho: str = SPANS_ARQUIVO) -> str:
+    """Acrescenta o rastro como uma linha JSON em `caminho`."""
+    registro = {k: v for k, v in rastro.items() if k not in ("t0", "pilha")}
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+    return caminho
+
+# ----------------------------
+# Painel
+# ----------------------------
+def tabela_spans(rastro: dict):
+    """Spans na ordem de início, com tempo próprio (descontados os filhos diretos)."""
+    import pandas as pd
+    df = pd.DataFrame(rastro["spans"])
+    if df.empty:
+        return df
+    df = df.sort_values(["inicio_ms", "prof"], kind="stable").reset_index(drop=True)
+    filhos = [0.0] * len(df)
+    abertos = []  # índices dos ancestrais do span corrente
+    for i, (ms, prof) in enumerate(zip(df["ms"], df["prof"])):
+        abertos = [a for a in abertos if df.at[a, "prof"] < prof]
+        if abertos:
+            filhos[abertos[-1]] += ms
+        abertos.append(i)
+    df["proprio_ms"] = (df["ms"] - pd.Series(filhos)).clip(lower=0).round(3)
+    df["trecho"] = ["  " * p + n for p, n in zip(df["prof"], df["nome"])]
+    return df
+
+
+def _chama(df, total_ms: float):
+    """Flame chart: uma faixa por profundidade, barras posicionadas pelo início."""
+    import matplotlib.pyplot as plt
+    prof = int(df["prof"].max()) + 1
+    fig, ax = plt.subplots(figsize=(10, 0.45 * prof + 1))
+    cores = plt.get_cmap("tab20")
+    familias = {f: i for i, f in enumerate(dict.fromkeys(n.split(":")[0] for n in df["nome"]))}
+    for _, r in df.iterrows():
+        ax.broken_barh([(r["inicio_ms"], max(r["ms"], total_ms * 1e-4))], (r["prof"] - 0.45, 0.9),
+                       facecolors=cores(familias[r["nome"].split(":")[0]] % 20), edgecolor="white", linewidth=0.5)
+        if r["ms"] >= total_ms * 0.04:
+            ax.text(r["inicio_ms"] + r["ms"] / 2, r["prof"], r["nome"], ha="center", va="center", fontsize=7, clip_on=True)
+    ax.set_ylim(prof - 0.5, -0.5)
+    ax.set_xlim(0, total_ms)
+    ax.set_yticks(range(prof)); ax.set_ylabel("profundidade"); ax.set_xlabel("ms desde o início do rerun")
+    ax.grid(axis="y", visible=False)
+    return fig
+
+
+def painel_spans(rastro: dict, exportar: bool = True):
+    """Tabela + flame chart do rerun que acabou de rodar; opcionalmente grava o rastro em JSONL."""
+    if rastro is None:
+        return
+    import matplotlib.pyplot as plt
+    df = tabela_spans(rastro)
+    with st.expander(f"⏱️ Instrumentação: {rastro['total_ms']:,.0f} ms neste rerun, {len(df)} trechos", expanded=False):
+        if df.empty:
+            st.caption("Nenhum trecho instrumentado nesta página.")
+        else:
+            fig = _chama(df, rastro["total_ms"])
+            st.pyplot(fig)
+            plt.close(fig)
+            st.dataframe(df[["trecho", "ms", "proprio_ms", "rss_delta_mb", "inicio_ms"]], hide_index=True)
+        if exportar:
+            try:
+                st.caption(f"Rastro acrescentado a `{exportar_jsonl(rastro)}`.")
+            except OSError as e:
+                st.caption(f"Não foi possível gravar o rastro: {e}")
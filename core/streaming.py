@@ -0,0 +1,88 @@
+# core/streaming.py
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from core.derivados import converter_tipos, derivar_colunas
+from core.esquema import colunas_mapeadas
+from core.agregados import construir_cubo, mesclar_cubos
+from core.resultados import cache_disco
+
+# ----------------------------
+# Leitura em blocos (CSV maior que a memória)
+# ----------------------------
+TAMANHO_BLOCO = int(os.environ.get("DASH_CHUNK_ROWS", "200000"))
+STREAM_MIN_MB = float(os.environ.get("DASH_STREAM_MIN_MB", "500"))
+AMOSTRA_MAX = 50_000
+
+
+def tamanho_mb(fonte) -> float:
+    """Tamanho da fonte (caminho ou arquivo enviado) em MB."""
+    if isinstance(fonte, str):
+        return os.path.getsize(fonte) / 1e6
+    return getattr(fonte, "size", 0) / 1e6
+
+
+def eh_csv(fonte) -> bool:
+    nome = fonte if isinstance(fonte, str) else fonte.name
+    return nome.lower().endswith(".csv")
+
+
+def ler_cabecalho(fonte) -> pd.DataFrame:
+    """Só o cabeçalho do CSV (DataFrame vazio)."""
+    if hasattr(fonte, "seek"):
+        fonte.seek(0)
+    return pd.read_csv(fonte, nrows=0)
+
+
+def ler_blocos(fonte, tamanho=TAMANHO_BLOCO, colunas=None):
+    """Gera os blocos brutos do CSV (caminho ou arquivo enviado), só com `colunas` se informadas."""
+    if hasattr(fonte, "seek"):
+        fonte.seek(0)
+    with pd.read_csv(fonte, chunksize=tamanho, usecols=colunas) as leitor:
+        yield from leitor
+
+
+def blocos_convertidos(blocos, colmap, perfil=None):
+    """Aplica as conversões do automap (mesmos formatos do perfil em todo bloco) e as colunas derivadas."""
+    for bloco in blocos:
+        converter_tipos(bloco, colmap, perfil)
+        derivar_colunas(bloco, colmap)
+        yield bloco
+
+
+def _amostra(atual, bloco, k, rng):
+    """Amostra uniforme de tamanho fixo (bottom-k por chave aleatória), mesclável entre blocos."""
+    cand = bloco.assign(_chave=rng.random(len(bloco))).nsmallest(k, "_chave")
+    if atual is None:
+        return cand
+    return pd.concat([atual, cand]).nsmallest(k, "_chave")
+
+
+def agregar_em_blocos(fonte, colmap, tamanho=TAMANHO_BLOCO, amostra=AMOSTRA_MAX, seed=0, perfil=None):
+    """
+    Dobra cada bloco em agregados parciais (contagens, somas, somas de quadrados,
+    histogramas por grupo) e mantém uma amostra de tamanho fixo para os gráficos
+    que precisam de linhas. O pico de memória fica limitado a ~1 bloco.
+    Retorna (cubo, amostra_df).
+    """
+    rng = np.random.default_rng(seed)
+    cubo, am = None, None
+    for bloco in blocos_convertidos(ler_blocos(fonte, tamanho, colunas_mapeadas(colmap)), colmap, perfil):
+        cubo = mesclar_cubos(cubo, construir_cubo(bloco, colmap))
+        am = _amostra(am, bloco, amostra, rng)
+    if am is None:  # CSV sem linhas
+        vazio = next(blocos_convertidos([ler_cabecalho(fonte)], colmap, perfil))
+        return construir_cubo(vazio, colmap), vazio
+    return cubo, am.drop(columns="_chave").reset_index(drop=True)
+
+
+@st.cache_data(show_spinner="Lendo a base em blocos...", max_entries=4)
+@cache_disco
+def cubo_streaming(_fonte, chave: str, colmap: dict, perfil: dict = None):
+    """`agregar_em_blocos` com cache pela chave da fonte, pelo mapeamento e pelo perfil."""
+    cubo, am = agregar_em_blocos(_fonte, colmap, perfil=perfil)
+    am.attrs["fingerprint"] = f"{chave}:amostra"  # linhas da amostra != base completa
+    return cubo, am
@@ -0,0 +1,41 @@
+# tests/test_agregados.py
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+import core.sketches as sketches
+from core.agregados import construir_cubo, mesclar_cubos, top_n
+
+COLMAP = {"produto": "SKU", "valor_pedido": "Amount", "valor_unitario": "Amount"}
+
+
+def _base(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"SKU": "S" + pd.Series(rng.integers(0, 400, n)).astype(str),
+                       "Amount": rng.gamma(2, 100, n)})
+    # SKU raro e caro: 1 pedido, maior valor unitário da base
+    return pd.concat([df, pd.DataFrame({"SKU": ["RARO"], "Amount": [1e6]})], ignore_index=True)
+
+
+def test_cubo_em_memoria_fica_exato(monkeypatch):
+    """Mesmo acima de TOPK_MAX_EXATO, o cubo de uma base inteira não é podado."""
+    monkeypatch.setattr(sketches, "TOPK_MAX_EXATO", 10)
+    monkeypatch.setattr(sketches, "TOPK_CAPACIDADE", 5)
+    df = _base()
+    cubo = construir_cubo(df, COLMAP)
+    assert "_topk" not in cubo
+    assert len(cubo["produto"]) == df["SKU"].nunique()
+    assert top_n(cubo, "produto", "valor_unitario_media", 1).index[0] == "RARO"
+
+
+def test_mesclagem_resume_dimensao_grande(monkeypatch):
+    monkeypatch.setattr(sketches, "TOPK_MAX_EXATO", 10)
+    monkeypatch.setattr(sketches, "TOPK_CAPACIDADE", 5)
+    df = _base()
+    cubo = mesclar_cubos(construir_cubo(df.iloc[:2500], COLMAP), construir_cubo(df.iloc[2500:], COLMAP))
+    assert "produto" in cubo["_topk"]
+    verdade = df.groupby("SKU").size()
+    tab, piso = cubo["produto"], cubo["_topk"]["produto"]["pedidos"]
+    real = verdade.reindex(tab.index)
+    assert (real <= tab["pedidos"]).all() and (real >= tab["pedidos"] - tab["pedidos_erro"]).all()
+    assert verdade.drop(tab.index).max() <= piso
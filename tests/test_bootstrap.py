@@ -0,0 +1,23 @@
+# tests/test_bootstrap.py
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from core.bootstrap import _bootstrap_grupo
+
+
+def test_m_de_n_centrado_na_estatistica_da_base():
+    """Grupo maior que max_n: o IC reescalado fica centrado na estatística da base inteira."""
+    v = np.random.default_rng(42).lognormal(5, 1, 1_000_000)
+    ep = v.std() / np.sqrt(len(v))
+    for semente in range(5):
+        r = _bootstrap_grupo((v, 500, 0.95, np.random.SeedSequence(semente), 64, 20_000))
+        meio = (r["media_li"] + r["media_ls"]) / 2
+        assert abs(meio - r["media"]) < 0.2 * ep
+        assert r["media_li"] < r["media"] < r["media_ls"]
+        assert r["mediana_li"] < r["mediana"] < r["mediana_ls"]
+
+
+def test_grupo_pequeno_sem_reescala():
+    v = np.random.default_rng(0).normal(10, 2, 500)
+    r = _bootstrap_grupo((v, 1000, 0.95, np.random.SeedSequence(0), 64, 20_000))
+    assert r["media_li"] < v.mean() < r["media_ls"]
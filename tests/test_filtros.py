@@ -0,0 +1,86 @@
+# tests/test_filtros.py
+# -*- coding: utf-8 -*-
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.filtros import construir_indice, selecionar
+
+COLMAP = {"categoria": "Category", "regiao": "ship-state", "data_pedido": "Date"}
+N = 1003  # não múltiplo de 8: o último byte do bitmap tem bits de preenchimento
+
+
+def _base(n=N, seed=0):
+    rng = np.random.default_rng(seed)
+    cat = rng.choice(["A", "B", "C"], n, p=[0.6, 0.3, 0.1]).astype(object)
+    cat[rng.choice(n, 12, replace=False)] = "Z"  # raro: lista de posições
+    cat[rng.choice(n, 5, replace=False)] = None
+    cat[-1] = "Z"  # última linha, no byte incompleto
+    datas = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 90, n), unit="D") \
+        + pd.to_timedelta(rng.integers(0, 86400, n), unit="s")
+    datas = pd.Series(datas)
+    datas[rng.choice(n, 7, replace=False)] = pd.NaT
+    return pd.DataFrame({"Category": pd.Series(cat).astype("category"),
+                         "ship-state": rng.choice(["SP", "RJ", "MG", "BA"], n),
+                         "Date": datas})
+
+
+@pytest.fixture(scope="module")
+def base():
+    df = _base()
+    return df, construir_indice(df, COLMAP)
+
+
+def _mascara(df, valores=None, periodo=None):
+    m = np.ones(len(df), dtype=bool)
+    for papel, vals in (valores or {}).items():
+        m &= df[COLMAP[papel]].isin(vals).to_numpy()
+    if periodo:
+        dias = df["Date"].dt.normalize()
+        m &= ((dias >= pd.Timestamp(periodo[0])) & (dias <= pd.Timestamp(periodo[1]))).to_numpy()
+    return np.flatnonzero(m)
+
+
+def test_indice_tem_bitmaps_e_posicoes(base):
+    _, idx = base
+    d = idx["dims"]["categoria"]
+    assert d["valores"].get_loc("A") in d["bitmaps"]
+    assert d["valores"].get_loc("Z") in d["posicoes"]
+
+
+@pytest.mark.parametrize("valores", [
+    {"categoria": ["A"]},                       # denso
+    {"categoria": ["Z"]},                       # raro, inclui a última linha
+    {"categoria": ["A", "Z"]},                  # bitmap OR posições
+    {"categoria": ["C", "inexistente"]},
+    {"categoria": ["B"], "regiao": ["SP", "BA"]},
+])
+def test_selecionar_igual_a_mascara(base, valores):
+    df, idx = base
+    np.testing.assert_array_equal(selecionar(idx, {"valores": valores}), _mascara(df, valores))
+
+
+@pytest.mark.parametrize("periodo", [
+    (datetime.date(2024, 1, 1), datetime.date(2024, 3, 30)),    # base inteira (sem NaT)
+    (datetime.date(2024, 2, 10), datetime.date(2024, 2, 10)),   # um dia: fronteiras inclusivas
+    (datetime.date(2024, 1, 15), datetime.date(2024, 2, 20)),   # fatia densa
+    (datetime.date(2023, 12, 1), datetime.date(2023, 12, 31)),  # fora da base
+])
+def test_periodo_igual_a_mascara(base, periodo):
+    df, idx = base
+    np.testing.assert_array_equal(selecionar(idx, {"periodo": periodo}), _mascara(df, periodo=periodo))
+
+
+def test_valores_e_periodo_combinados(base):
+    df, idx = base
+    valores = {"categoria": ["Z", "C"], "regiao": ["RJ"]}
+    periodo = (datetime.date(2024, 1, 20), datetime.date(2024, 3, 1))
+    np.testing.assert_array_equal(selecionar(idx, {"valores": valores, "periodo": periodo}),
+                                  _mascara(df, valores, periodo))
+
+
+def test_sem_filtro(base):
+    _, idx = base
+    assert selecionar(idx, {}) is None